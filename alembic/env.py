@@ -4,6 +4,7 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
+from app.models import api_key_model, refresh_token_model, revoked_token_model  # noqa: F401 registers the tables for autogenerate
 from app.models.user_model import Base  # adjust "myapp.models" to the actual location of your Base
 
 
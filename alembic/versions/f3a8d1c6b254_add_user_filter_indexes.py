@@ -0,0 +1,43 @@
+"""add user filter indexes
+
+Revision ID: f3a8d1c6b254
+Revises: e7b2c9f4a130
+Create Date: 2026-10-17 16:58:03.517290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8d1c6b254'
+down_revision: Union[str, None] = 'e7b2c9f4a130'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so the users table stays writable while the indexes are created
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_role_created_at_id', 'users', ['role', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_users_locked_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                        postgresql_where=sa.text('is_locked = true'), postgresql_concurrently=True)
+        op.create_index('ix_users_unverified_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                        postgresql_where=sa.text('email_verified = false'), postgresql_concurrently=True)
+        op.create_index('ix_users_professional_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                        postgresql_where=sa.text('is_professional = true'), postgresql_concurrently=True)
+        op.create_index('ix_users_last_login_at', 'users', ['last_login_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_users_nickname_prefix', 'users', ['nickname'], unique=False,
+                        postgresql_ops={'nickname': 'varchar_pattern_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_users_email_prefix', 'users', ['email'], unique=False,
+                        postgresql_ops={'email': 'varchar_pattern_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in ('ix_users_email_prefix', 'ix_users_nickname_prefix', 'ix_users_last_login_at',
+                     'ix_users_professional_created_at_id', 'ix_users_unverified_created_at_id',
+                     'ix_users_locked_created_at_id', 'ix_users_role_created_at_id'):
+            op.drop_index(name, table_name='users', postgresql_concurrently=True)
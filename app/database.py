@@ -1,22 +1,214 @@
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.utils.metrics import metrics
+from app.utils.periodic import PeriodicTask
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# The authenticated user of the current request; their writes pin their reads to the primary
+_request_user: ContextVar[Optional[str]] = ContextVar("db_request_user", default=None)
+
+class InstrumentedSession(Session):
+    """
+    Session that records in ``info['connection_hold_seconds']`` how long its transactions held a connection.
+
+    A transaction takes a pool connection when it begins and returns it when it ends, so
+    the time between the two is the time this session kept the connection from others.
+    """
+
+@event.listens_for(InstrumentedSession, "after_begin")
+def _connection_acquired(session, transaction, connection):
+    session.info.setdefault("connection_acquired_at", time.perf_counter())
+
+@event.listens_for(InstrumentedSession, "after_transaction_end")
+def _connection_released(session, transaction):
+    if transaction.parent is None and "connection_acquired_at" in session.info:
+        held = time.perf_counter() - session.info.pop("connection_acquired_at")
+        session.info["connection_hold_seconds"] = session.info.get("connection_hold_seconds", 0.0) + held
+
+class RoutingSession(InstrumentedSession):
+    """
+    Session that sends reads marked ``replica=True`` to a read replica.
+
+    Only SELECTs executed with the ``replica`` execution option may go to a replica, and
+    only while neither this session nor, within ``db_replica_pin_seconds``, the current
+    user has written anything. Everything else uses the primary, so a request, or the
+    user's next requests, always read their own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, replica=False, **kw):
+        if replica and not self.info.get("wrote") and not Database.is_pinned(_request_user.get()):
+            engine = Database.next_replica()
+            if engine is not None:
+                return engine.sync_engine
+        elif self._flushing or not getattr(clause, "is_select", False):
+            self.info["wrote"] = True
+        return super().get_bind(mapper, clause=clause, **kw)
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _route_reads(orm_execute_state):
+    if orm_execute_state.is_select and orm_execute_state.execution_options.get("replica"):
+        orm_execute_state.bind_arguments["replica"] = True
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_writer(session):
+    if session.info.get("wrote"):
+        Database.pin_primary(_request_user.get())
+
+class LazySession:
+    """
+    Stands in for an AsyncSession and only creates it on first use.
+
+    Handlers that return before touching the database (auth failures, validation errors,
+    cache hits) never create a session or check out a connection. ``close()`` ends the
+    session and reports how long the request held a connection; the proxy cannot be used
+    after that, so work left behind the request cannot open a session nobody closes.
+    """
+
+    def __init__(self, session_factory):
+        self._session_factory = session_factory
+        self._session = None
+        self._closed = False
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name):
+        if self._closed:
+            raise RuntimeError("The request's database session is closed")
+        if self._session is None:
+            self._session = self._session_factory()
+        return getattr(self._session, name)
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._session is None:
+            metrics.counter("db_sessions_unused_total", "Requests that declared a database session but never used it").inc()
+            return
+        session, self._session = self._session, None
+        await session.close()
+        metrics.histogram(
+            "db_request_connection_hold_seconds", "Time each request held a pooled database connection"
+        ).observe(session.sync_session.info.get("connection_hold_seconds", 0.0))
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that records how long each checkout waited and publishes its occupancy.
+
+    The wait includes queueing for a free connection, opening a new one and the pre-ping,
+    i.e. everything a request spends before it can send its first statement.
+    """
+
+    @property
+    def _label(self) -> str:
+        return self.logging_name or "primary"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.counter(
+                "db_pool_checkout_timeouts_total", "Checkouts that gave up after db_pool_timeout", pool=self._label
+            ).inc()
+            raise
+        finally:
+            metrics.histogram(
+                "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection", pool=self._label
+            ).observe(time.perf_counter() - started)
+            self._publish()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._publish()
+
+    def _publish(self):
+        metrics.gauge("db_pool_checked_out", "Pooled connections in use", pool=self._label).set(self.checkedout())
+        metrics.gauge("db_pool_idle", "Pooled connections open and idle", pool=self._label).set(self.checkedin())
+        metrics.gauge("db_pool_overflow", "Connections open beyond the pool size", pool=self._label).set(max(self.overflow(), 0))
+
+def engine_options(database_url: str, name: str = "primary") -> dict:
+    """
+    Engine keyword arguments for ``database_url`` from the ``db_*`` settings.
+
+    ``name`` labels the pool's metrics, to tell the primary and replica pools apart.
+
+    Pool sizing only applies to server databases; SQLite keeps SQLAlchemy's default pool.
+    In pgbouncer mode the asyncpg statement caches are disabled and prepared statements
+    get unique names, because a transaction-mode pooler may run consecutive statements of
+    one client on different server connections.
+    """
+    options = {"pool_pre_ping": settings.db_pool_pre_ping, "pool_recycle": settings.db_pool_recycle}
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_logging_name=name,
+    )
+    if url.get_driver_name() == "asyncpg":
+        cache_size = 0 if settings.db_pgbouncer_mode else settings.db_statement_cache_size
+        connect_args = {"statement_cache_size": cache_size, "prepared_statement_cache_size": cache_size}
+        if settings.db_pgbouncer_mode:
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+        options["connect_args"] = connect_args
+    return options
+
 class Database:
-    """Handles database connections and sessions."""
+    """
+    Handles database connections and sessions.
+
+    Besides the primary, ``database_replica_urls`` may name read replicas. Reads marked
+    with the ``replica`` execution option are spread over the replicas that passed their
+    last health check, round-robin; with none available they use the primary.
+    """
     _engine: AsyncEngine = None
     _session_factory = None
+    _replicas: List[AsyncEngine] = []
+    _healthy: List[AsyncEngine] = []
+    _round_robin = itertools.count()
+    _pins: "OrderedDict[str, float]" = OrderedDict()
+    _health_task: Optional[PeriodicTask] = None
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
-        """Initialize the async engine and sessionmaker."""
+    def initialize(cls, database_url: str, echo: bool = False, replica_urls: Optional[List[str]] = None):
+        """Initialize the async engines, configured from the ``db_*`` settings, and sessionmaker."""
         if cls._engine is None:
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
+            cls._engine = create_async_engine(database_url, echo=echo, future=True, **engine_options(database_url))
+            if replica_urls is None:
+                replica_urls = settings.database_replica_urls
+            cls._replicas = [
+                create_async_engine(url, echo=echo, future=True, **engine_options(url, name=f"replica{index}"))
+                for index, url in enumerate(replica_urls)
+            ]
+            for replica in cls._replicas:
+                event.listen(replica.sync_engine, "handle_error", cls._replica_error)
+            cls._healthy = list(cls._replicas)
             cls._session_factory = sessionmaker(
                 bind=cls._engine,
                 class_=AsyncSession,
+                sync_session_class=RoutingSession,
                 expire_on_commit=False,
                 future=True
             )
@@ -28,6 +220,111 @@ class Database:
             raise ValueError("Database not initialized. Call `initialize()` first.")
         return cls._session_factory
 
+    @classmethod
+    def bind_user(cls, user_id: str):
+        """Attribute the current request's writes to ``user_id``, so they pin that user's reads."""
+        _request_user.set(user_id)
+
+    @classmethod
+    def pin_primary(cls, user_id: Optional[str]):
+        """Send ``user_id``'s reads to the primary for the next ``db_replica_pin_seconds``."""
+        if user_id is None or not cls._replicas:
+            return
+        now = time.monotonic()
+        cls._pins[user_id] = now + settings.db_replica_pin_seconds
+        cls._pins.move_to_end(user_id)
+        # Pins share one lifetime, so the oldest are the first to expire
+        while cls._pins and next(iter(cls._pins.values())) <= now:
+            cls._pins.popitem(last=False)
+
+    @classmethod
+    def is_pinned(cls, user_id: Optional[str]) -> bool:
+        return user_id is not None and cls._pins.get(user_id, 0.0) > time.monotonic()
+
+    @classmethod
+    def next_replica(cls) -> Optional[AsyncEngine]:
+        """Return the next healthy replica, or None to use the primary."""
+        healthy = cls._healthy
+        if not healthy:
+            return None
+        return healthy[next(cls._round_robin) % len(healthy)]
+
+    @classmethod
+    def _replica_error(cls, context):
+        if context.is_disconnect or context.connection is None:
+            # Lost or could not open a connection; skip the replica until it passes a health check
+            cls._healthy = [replica for replica in cls._healthy if replica.sync_engine is not context.engine]
+
+    @classmethod
+    async def _ping(cls, replica: AsyncEngine) -> bool:
+        try:
+            async with replica.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), settings.db_replica_check_interval_seconds)
+            return True
+        except Exception as e:
+            logger.warning("Read replica %s failed its health check: %s", replica.url.render_as_string(), e)
+            return False
+
+    @classmethod
+    async def check_replicas(cls):
+        """Health-check every replica and route reads to those that answered."""
+        results = await asyncio.gather(*(cls._ping(replica) for replica in cls._replicas))
+        cls._healthy = [replica for replica, ok in zip(cls._replicas, results) if ok]
+        metrics.gauge("db_replicas_healthy", "Read replicas receiving reads").set(len(cls._healthy))
+
+    @classmethod
+    async def start(cls):
+        """Check the replicas now and every ``db_replica_check_interval_seconds``."""
+        if cls._replicas and cls._health_task is None:
+            await cls.check_replicas()
+            cls._health_task = PeriodicTask("db-replica-health", settings.db_replica_check_interval_seconds, cls.check_replicas)
+            cls._health_task.start()
+
+    @classmethod
+    async def stop(cls):
+        if cls._health_task is not None:
+            await cls._health_task.stop()
+            cls._health_task = None
+
+    @classmethod
+    def _pool_status(cls, engine: AsyncEngine, name: str) -> dict:
+        pool = engine.sync_engine.pool
+        wait = metrics.histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection", pool=name)
+        status = {"pool": type(pool).__name__}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            status.update(
+                size=pool.size(),
+                max_overflow=pool._max_overflow,
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        status.update(
+            checkouts=wait.count,
+            checkout_wait_seconds_avg=wait.sum / wait.count if wait.count else 0.0,
+            checkout_timeouts=metrics.counter(
+                "db_pool_checkout_timeouts_total", "Checkouts that gave up after db_pool_timeout", pool=name
+            ).value,
+        )
+        return status
+
+    @classmethod
+    def pool_status(cls) -> dict:
+        """
+        Report this worker's pool: configured size, connections checked out, idle and in
+        overflow, and the checkout wait times so far. Used to size pools per worker.
+        Replica pools, if any, are listed under ``replicas``.
+        """
+        if cls._engine is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        status = cls._pool_status(cls._engine, "primary")
+        if cls._replicas:
+            status["replicas"] = [
+                dict(cls._pool_status(replica, f"replica{index}"), healthy=replica in cls._healthy)
+                for index, replica in enumerate(cls._replicas)
+            ]
+        return status
+
     @classmethod
     async def create_tables(cls):
         """Create all tables defined with Base.metadata."""
@@ -35,7 +332,7 @@ class Database:
             raise ValueError("Database not initialized. Call `initialize()` first.")
 
         # ✅ Important: Dynamically import models so Base knows about them
-        from app.models import user_model  # <-- This line ensures models are registered
+        from app.models import api_key_model, refresh_token_model, revoked_token_model, user_model  # <-- This line ensures models are registered
 
         async with cls._engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
@@ -1,12 +1,23 @@
-from builtins import Exception, dict, str
-from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
+from builtins import Exception, ValueError, dict, getattr, str
+import hashlib
+import math
+import uuid
+from typing import Optional
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import Database
+from app.database import Database, LazySession
+from app.models.user_model import User
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
-from app.services.jwt_service import decode_token
-from settings.config import Settings
+from app.services.api_key_service import ApiKeyService, is_api_key
+from app.services.jwt_service import TOKEN_VERSION, decode_token
+from app.services.revocation_service import RevocationService
+from app.utils.admission import Overloaded
+from app.utils.rate_limit import RateLimiter
+from app.utils.token_cache import token_cache
+from settings.config import Settings, settings
 
 def get_settings() -> Settings:
     """Return application settings."""
@@ -17,34 +28,147 @@ def get_email_service() -> EmailService:
     return EmailService(template_manager=template_manager)
 
 async def get_db() -> AsyncSession:
-    """Dependency that provides a database session for each request."""
-    async_session_factory = Database.get_session_factory()
-    async with async_session_factory() as session:
-        try:
-            yield session
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    """
+    Dependency that provides a database session for each request.
+
+    The session is a LazySession: it is created, and takes a pooled connection, only
+    when the handler first uses it, and is closed as soon as the handler returns.
+    """
+    session = LazySession(Database.get_session_factory())
+    try:
+        yield session
+    except (HTTPException, Overloaded):
+        # Raised by the route, an auth dependency or admission control; keep their own handling
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await session.close()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """Verify a bearer JWT or API key and return its claims; 401 if it is invalid or revoked."""
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    payload = decode_token(token)
+    if is_api_key(token):
+        # Machine clients send an API key as the bearer token instead of a JWT
+        payload = await ApiKeyService.verify(token)
+        if payload is None:
+            raise credentials_exception
+        return payload
+    payload = token_cache.get(token)
     if payload is None:
+        payload = decode_token(token)
+        if payload is None:
+            raise credentials_exception
+        token_cache.put(token, payload)
+    if await RevocationService.is_revoked(payload):
         raise credentials_exception
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    credentials_exception = HTTPException(
+        status_code=401,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = await get_token_claims(token)
     user_id: str = payload.get("sub") or payload.get("user_id")
     user_role: str = payload.get("role")
     if user_id is None or user_role is None:
         raise credentials_exception
+    if payload.get("ver", 1) < TOKEN_VERSION and not settings.jwt_accept_legacy_subject:
+        # Version 1 tokens may name the user by email; they are only honoured during the upgrade window
+        raise credentials_exception
+    Database.bind_user(str(user_id))
     return {"user_id": user_id, "role": user_role}
 
+def _parse_uuid(value: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+async def _load_principal(request: Request, db: AsyncSession, current_user: dict, replica: bool) -> User:
+    principal = getattr(request.state, "principal", None)
+    if principal is not None and (replica or not request.state.principal_from_replica):
+        return principal
+    subject = str(current_user["user_id"])
+    user_id = _parse_uuid(subject)
+    # Re-reading from the primary must replace a replica copy already in the session
+    options = {"populate_existing": principal is not None}
+    if user_id is not None:
+        principal = await db.get(User, user_id, execution_options={"replica": replica}, **options)
+    else:
+        query = select(User).where(User.email == subject).execution_options(replica=replica, **options)
+        principal = (await db.execute(query)).scalars().first()
+    if principal is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    request.state.principal = principal
+    request.state.principal_from_replica = replica
+    return principal
+
+async def get_current_principal(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+) -> User:
+    """
+    Load the authenticated user once per request and memoize it on ``request.state``.
+
+    The token subject is the user id, so this is a primary key lookup. Legacy tokens
+    naming the user by email are resolved by email while they are still accepted.
+    Either may be answered by a read replica unless the user wrote recently.
+    """
+    return await _load_principal(request, db, current_user, replica=True)
+
+async def get_current_principal_for_update(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+) -> User:
+    """As get_current_principal, but read from the primary, for routes that modify the user and return it."""
+    return await _load_principal(request, db, current_user, replica=False)
+
 def require_role(role: str):
     def role_checker(current_user: dict = Depends(get_current_user)):
         if current_user["role"] not in role:
             raise HTTPException(status_code=403, detail="Operation not permitted")
         return current_user
     return role_checker
+
+def client_ip(request: Request) -> Optional[str]:
+    """Return the client address, from the reverse proxy headers if they are trusted."""
+    if settings.rate_limit_trust_forwarded:
+        forwarded = request.headers.get("x-real-ip") or request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+        if forwarded:
+            return forwarded
+    return request.client.host if request.client else None
+
+def _bearer_digest(request: Request) -> Optional[str]:
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not credentials:
+        return None
+    return hashlib.sha256(credentials.encode()).hexdigest()[:32]
+
+def _throttle(retry_after: float):
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please retry later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+def rate_limit(scope: str):
+    """Throttle a route scope per client IP and, when present, per bearer token."""
+    async def limiter(request: Request):
+        _throttle(await RateLimiter.check(scope, ip=client_ip(request), token=_bearer_digest(request)))
+    return limiter
+
+async def rate_limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """Throttle login attempts per client IP and per submitted email."""
+    _throttle(await RateLimiter.check("login", ip=client_ip(request), email=form_data.username.strip().lower()))
@@ -1,12 +1,18 @@
 from builtins import Exception
-from fastapi import FastAPI
+import asyncio
+from fastapi import Depends, FastAPI
 from starlette.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 
 from app.database import Database
-from app.dependencies import get_settings
-from app.routers import user_routes
+from app.dependencies import get_settings, rate_limit
+from app.routers import api_key_routes, metrics_routes, user_routes, well_known_routes
+from app.services.key_ring import KeyRing
+from app.services.revocation_service import RevocationService
+from app.utils.admission import Overloaded
 from app.utils.api_description import getDescription
+from app.utils.hashers import HashingPolicy
+from app.utils.hashing_pool import HashingPool
 
 from fastapi.staticfiles import StaticFiles
 import os
@@ -36,14 +42,35 @@ app.add_middleware(
 async def startup_event():
     settings = get_settings()
     Database.initialize(settings.database_url, settings.debug)
+    HashingPolicy.initialize()
+    HashingPool.initialize()
+    KeyRing.start()
 
     # ✅ Ensure models are loaded before creating tables
-    from app.models import user_model  # Import model to register with Base
+    from app.models import api_key_model, refresh_token_model, revoked_token_model, user_model  # Import models to register with Base
     await Database.create_tables()
+    await Database.start()
+    await RevocationService.start()
 
     # Create directory for profile pictures if not exists
     os.makedirs("profile_pictures", exist_ok=True)
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Waiting for in-flight hashes blocks, so keep it off the event loop
+    await asyncio.to_thread(HashingPool.shutdown)
+    await KeyRing.stop()
+    await RevocationService.stop()
+    await Database.stop()
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service is busy, please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 @app.exception_handler(Exception)
 async def exception_handler(request, exc):
     return JSONResponse(
@@ -52,7 +79,10 @@ async def exception_handler(request, exc):
     )
 
 # Register all API routes
-app.include_router(user_routes.router)
+app.include_router(user_routes.router, dependencies=[Depends(rate_limit("api"))])
+app.include_router(api_key_routes.router, dependencies=[Depends(rate_limit("api"))])
+app.include_router(metrics_routes.router)
+app.include_router(well_known_routes.router)
 
 # Mount static files for profile pictures
 app.mount("/profile_pictures", StaticFiles(directory="profile_pictures"), name="profile_pics")
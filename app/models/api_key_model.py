@@ -0,0 +1,31 @@
+from datetime import datetime
+import uuid
+
+from sqlalchemy import Column, DateTime, ForeignKey, String, func, Enum as SQLAlchemyEnum
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.user_model import UserRole
+
+class ApiKey(Base):
+    """
+    A long-lived credential for a machine client, acting as ``user_id`` with ``role``.
+
+    The key is ``um_<prefix>_<secret>``. Only the prefix (to find the row) and an HMAC
+    of the whole key are stored.
+    """
+    __tablename__ = "api_keys"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name: Mapped[str] = Column(String(100), nullable=False)
+    prefix: Mapped[str] = Column(String(16), unique=True, nullable=False, index=True)
+    key_hash: Mapped[str] = Column(String(64), nullable=False)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    role: Mapped[UserRole] = Column(SQLAlchemyEnum(UserRole, name="UserRole", create_constraint=True), nullable=False)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    revoked_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<ApiKey {self.name} ({self.prefix})>"
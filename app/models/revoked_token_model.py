@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+from sqlalchemy.orm import Mapped
+
+from app.database import Base
+
+class RevokedToken(Base):
+    """
+    A revoked access token, or every token of a subject issued up to ``revoked_at``.
+
+    ``key`` is either a token's ``jti`` or ``'sub:<subject>'``. Rows are pruned once
+    ``expires_at`` has passed, since every token they cover has expired by then.
+    """
+    __tablename__ = "revoked_tokens"
+
+    key: Mapped[str] = Column(String(300), primary_key=True)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken {self.key}>"
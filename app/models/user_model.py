@@ -4,7 +4,7 @@ from enum import Enum
 import uuid
 
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, func, Enum as SQLAlchemyEnum
+    Column, String, Integer, DateTime, Boolean, Index, func, text, Enum as SQLAlchemyEnum
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
@@ -21,6 +21,19 @@ class UserRole(Enum):
 class User(Base):
     __tablename__ = "users"
     __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Backs keyset pagination, which orders users by (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Back the GET /users/ filters; the partial indexes cover the rare flag values admins look for
+        Index("ix_users_role_created_at_id", "role", "created_at", "id"),
+        Index("ix_users_locked_created_at_id", "created_at", "id", postgresql_where=text("is_locked = true")),
+        Index("ix_users_unverified_created_at_id", "created_at", "id", postgresql_where=text("email_verified = false")),
+        Index("ix_users_professional_created_at_id", "created_at", "id", postgresql_where=text("is_professional = true")),
+        Index("ix_users_last_login_at", "last_login_at"),
+        # LIKE 'prefix%' can only use an index with pattern operators under non-C collations
+        Index("ix_users_nickname_prefix", "nickname", postgresql_ops={"nickname": "varchar_pattern_ops"}),
+        Index("ix_users_email_prefix", "email", postgresql_ops={"email": "varchar_pattern_ops"}),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nickname: Mapped[str] = Column(String(50), unique=True, nullable=False, index=True)
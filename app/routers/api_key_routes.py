@@ -0,0 +1,39 @@
+from builtins import ValueError, dict, str
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_db, require_role
+from app.schemas.api_key_schemas import ApiKeyCreate, ApiKeyCreatedResponse, ApiKeyResponse
+from app.services.api_key_service import ApiKeyService
+
+router = APIRouter()
+
+@router.post("/api-keys/", response_model=ApiKeyCreatedResponse, status_code=status.HTTP_201_CREATED, name="create_api_key", tags=["API Keys (Requires Admin Role)"])
+async def create_api_key(key_data: ApiKeyCreate, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Issue an API key that acts as `user_id` with `role`. Send it as `Authorization: Bearer <key>`.
+
+    The key is returned only in this response; store it securely.
+    """
+    try:
+        issued = await ApiKeyService.issue(db, key_data.user_id, key_data.name, key_data.role, key_data.expires_at)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ApiKeyCreatedResponse(**ApiKeyResponse.model_validate(issued.api_key).model_dump(), key=issued.key)
+
+@router.get("/api-keys/", response_model=List[ApiKeyResponse], name="list_api_keys", tags=["API Keys (Requires Admin Role)"])
+async def list_api_keys(user_id: Optional[UUID] = None, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    List API keys, optionally for one user. Secrets are never returned.
+    """
+    return [ApiKeyResponse.model_validate(api_key) for api_key in await ApiKeyService.list_keys(db, user_id)]
+
+@router.delete("/api-keys/{key_id}", status_code=status.HTTP_204_NO_CONTENT, name="revoke_api_key", tags=["API Keys (Requires Admin Role)"])
+async def revoke_api_key(key_id: UUID, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Revoke an API key. Other workers may accept it for up to `api_key_cache_ttl_seconds` more.
+    """
+    if not await ApiKeyService.revoke(db, key_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="API key not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.database import Database
+from app.dependencies import require_role
+from app.utils.metrics import metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse, name="metrics", tags=["Monitoring (Requires Admin Role)"])
+async def get_metrics(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Expose process metrics (queue depths, wait-time histograms, counters) in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/metrics/db-pool", name="db_pool_status", tags=["Monitoring (Requires Admin Role)"])
+async def get_db_pool_status(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Report this worker's database pool: size, checked-out, idle and overflow connections,
+    and checkout wait times.
+    """
+    return Database.pool_status()
@@ -18,64 +18,52 @@ Key Highlights:
 - Utilizes OAuth2PasswordBearer for securing API endpoints, requiring valid access tokens for operations.
 """
 
-from builtins import dict, int, len, str
+from builtins import ValueError, dict, int, len, str
+import json
 from datetime import timedelta
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Response, status, Request, UploadFile, File
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from app.dependencies import get_current_user, get_db, get_email_service, require_role
+from app.dependencies import get_current_principal, get_current_principal_for_update, get_db, get_email_service, get_token_claims, rate_limit, rate_limit_login, require_role
 from app.schemas.pagination_schema import EnhancedPagination
-from app.schemas.token_schema import TokenResponse
-from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserResponse, UserUpdate
-from app.services.user_service import UserService
+from app.schemas.token_schema import RefreshTokenRequest, TokenResponse
+from app.schemas.user_schemas import BulkUserRequest, BulkUserResponse, LoginRequest, UserBase, UserCreate, UserExportFormat, UserFilter, UserListResponse, UserResponse, UserSort, UserUpdate
+from app.models.user_model import User
+from app.services.user_count_service import UserCount, UserCountService
+from app.services.user_bulk_service import UserBulkService
+from app.services.user_export_service import UserExportService
+from app.services.user_import_service import UserImportService
+from app.services.user_lookup_service import UserLookupService
+from app.services.user_service import USER_RESPONSE_COLUMNS, UserService
 from app.services.jwt_service import create_access_token
+from app.services.refresh_token_service import RefreshTokenService
+from app.utils.cursor import Cursor, PageCursors, decode_cursor, encode_cursor
 from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.utils.record_stream import RECORD_FORMATS, DuplexStreamingResponse, parse_records
 from app.dependencies import get_settings
 from app.services.email_service import EmailService
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 settings = get_settings()
 import os
 
 @router.get("/users/me", response_model=UserResponse, name="get_current_user_profile", tags=["User Profile"])
-async def get_current_user_profile(request: Request, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+async def get_current_user_profile(user: User = Depends(get_current_principal)):
     """
     Retrieve the profile of the currently authenticated user.
     """
-    user_identifier = current_user.get("user_id")
-    user = None
-    if user_identifier:
-        try:
-            user_uuid = UUID(str(user_identifier))
-            user = await UserService.get_by_id(db, user_uuid)
-        except Exception:
-            # If not a valid UUID, treat as email
-            user = await UserService.get_by_email(db, str(user_identifier))
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return UserResponse.model_validate(user)
 
 @router.put("/users/me", response_model=UserResponse, name="update_current_user_profile", tags=["User Profile"])
 async def update_current_user_profile(
     user_update: UserUpdate,
-    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    user: User = Depends(get_current_principal_for_update),
 ):
-    try:
-        # Try parsing user_id as UUID and lookup by ID
-        user_uuid = UUID(current_user["user_id"])
-        target_user = await UserService.get_by_id(db, user_uuid)
-    except (ValueError, TypeError):
-        # Fall back to lookup by email if user_id is not a valid UUID
-        target_user = await UserService.get_by_email(db, current_user["user_id"])
-
-    if not target_user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
     update_data = user_update.model_dump(exclude_unset=True)
 
     # Prevent self role changes
@@ -89,7 +77,7 @@ async def update_current_user_profile(
         )
 
     try:
-        updated_user = await UserService.update(db, target_user.id, update_data)
+        updated_user = await UserService.update_user(db, user, update_data)
     except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -102,20 +90,10 @@ async def update_current_user_profile(
     return UserResponse.model_validate(updated_user)
 
 @router.patch("/users/me/profile-picture", response_model=UserResponse, name="update_profile_picture", tags=["User Profile"])
-async def update_profile_picture(profile_picture: UploadFile = File(...), request: Request = None, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+async def update_profile_picture(request: Request, profile_picture: UploadFile = File(...), db: AsyncSession = Depends(get_db), user: User = Depends(get_current_principal_for_update)):
     """
     Upload or update the profile picture of the current user.
     """
-    user_identifier = current_user.get("user_id")
-    user = None
-    if user_identifier:
-        try:
-            uid = UUID(str(user_identifier))
-            user = await UserService.get_by_id(db, uid)
-        except Exception:
-            user = await UserService.get_by_email(db, str(user_identifier))
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     # Validate file type
     if not profile_picture.content_type.startswith("image/"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported file type. Please upload an image.")
@@ -146,13 +124,27 @@ async def update_profile_picture(profile_picture: UploadFile = File(...), reques
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save profile picture")
     # Update user's profile_picture_url in database
     new_url = request.url_for("profile_pics", path=filename)
-    updated_user = await UserService.update(db, user.id, {"profile_picture_url": str(new_url)})
+    updated_user = await UserService.update_user(db, user, {"profile_picture_url": str(new_url)})
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return UserResponse.model_validate(updated_user)
 
+# Registered before /users/{user_id}, which would otherwise take "export" for a user id
+@router.get("/users/export", name="export_users", tags=["User Management Requires (Admin or Manager Roles)"],
+            responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}, "description": "Every matching user"}})
+async def export_users(format: UserExportFormat = UserExportFormat.NDJSON, filters: UserFilter = Depends(),
+                       current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Stream every user matching the GET /users/ filters, in creation order, as NDJSON
+    or CSV, without password hashes, verification tokens or login attempt counters.
+    """
+    if format == UserExportFormat.CSV:
+        return StreamingResponse(UserExportService.export(format, filters), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="users.csv"'})
+    return StreamingResponse(UserExportService.export(format, filters), media_type="application/x-ndjson")
+
 @router.get("/users/{user_id}", response_model=UserResponse, name="get_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Endpoint to fetch a user by their unique identifier (UUID).
 
@@ -163,31 +155,16 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
         user_id: UUID of the user to fetch.
         request: The request object, used to generate full URLs in the response.
         db: Dependency that provides an AsyncSession for database access.
-        token: The OAuth2 access token obtained through OAuth2PasswordBearer dependency.
+        current_user: Claims of the caller, resolved from the bearer token by require_role.
     """
-    user = await UserService.get_by_id(db, user_id)
+    user = await UserLookupService.get_by_id(db, user_id, columns=USER_RESPONSE_COLUMNS)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=user.id,
-        nickname=user.nickname,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        bio=user.bio,
-        profile_picture_url=user.profile_picture_url,
-        github_profile_url=user.github_profile_url,
-        linkedin_profile_url=user.linkedin_profile_url,
-        role=user.role,
-        email=user.email,
-        last_login_at=user.last_login_at,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        links=create_user_links(user.id, request)
-    )
+    return UserResponse.model_construct(**user._mapping, links=create_user_links(user.id, request))
 
 @router.put("/users/{user_id}", response_model=UserResponse, name="update_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Update user information.
 
@@ -217,7 +194,7 @@ async def update_user(user_id: UUID, user_update: UserUpdate, request: Request,
     )
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, name="delete_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Delete a user by their ID.
 
@@ -229,7 +206,7 @@ async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token:
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.post("/users/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["User Management Requires (Admin or Manager Roles)"], name="create_user")
-async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Create a new user.
 
@@ -245,7 +222,7 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
     Returns:
     - UserResponse: The newly created user's information along with navigation links.
     """
-    existing_user = await UserService.get_by_email(db, user.email)
+    existing_user = await UserLookupService.get_by_email(db, user.email, columns=(User.id,))
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
 
@@ -268,56 +245,180 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
         links=create_user_links(created_user.id, request)
     )
 
+@router.post("/users/import", tags=["User Management Requires (Admin or Manager Roles)"], name="import_users",
+             responses={200: {"content": {"application/x-ndjson": {}}, "description": "One JSON result per input record"}})
+async def import_users(request: Request, background_tasks: BackgroundTasks, email_service: EmailService = Depends(get_email_service),
+                       current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Create users in bulk from a CSV (``text/csv``, with a header row) or NDJSON
+    (``application/x-ndjson``) request body, read as it arrives.
+
+    Streams back one NDJSON line per record, in order, with its ``status``: ``created``
+    (with the new ``id``), ``duplicate`` (the email exists or came earlier in the body),
+    ``conflict`` (taken while importing) or ``invalid`` (with ``errors``), then a summary
+    line of counts per status. Results are sent while the body is still arriving, so
+    read them as you upload. Lines over 64 KiB are reported as ``invalid``. Verification
+    emails are sent as each batch is committed.
+    """
+    fmt = RECORD_FORMATS.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if fmt is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail=f"Expected one of: {', '.join(RECORD_FORMATS)}")
+
+    async def results():
+        summary = {}
+        async for result in UserImportService.import_users(parse_records(request.stream(), fmt), email_service, background_tasks):
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"summary": summary}) + "\n"
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.post("/users/bulk", response_model=BulkUserResponse, name="bulk_update_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def bulk_update_users(body: BulkUserRequest, db: AsyncSession = Depends(get_db),
+                            current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Change the role or professional status of, unlock, or delete many users in one
+    statement, named by ``ids`` or by a GET /users/ ``filter``.
+
+    Each user's outcome is reported: ``updated``/``deleted``, ``unchanged`` (already
+    in that state), ``not_found``, or ``not_allowed`` (your own role or account). A
+    filter for set_role or delete needs at least one condition. With a filter, at most
+    ``user_bulk_max_users`` users change per request; ``more`` says to repeat it for
+    the rest.
+    """
+    try:
+        results, more = await UserBulkService.apply(db, body, UUID(current_user["user_id"]))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return BulkUserResponse(action=body.action, results=results, more=more)
+
 @router.get("/users/", response_model=UserListResponse, tags=["User Management Requires (Admin or Manager Roles)"])
 async def list_users(
     request: Request,
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = None,
+    filters: UserFilter = Depends(),
+    sort: UserSort = UserSort.CREATED_AT,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
 ):
-    total_users = await UserService.count(db)
-    users = await UserService.list_users(db, skip, limit)
+    """
+    List users, optionally filtered, ordered by ``sort`` (creation time by default).
 
+    Pages are addressed by ``skip`` and ``limit``, or, for deep pages, by ``cursor``:
+    pass an empty cursor for the first page, then follow the ``next`` and ``prev`` links.
+    Cursor pages are always in creation order. Pagination links keep the filters.
+    """
+    if cursor is not None:
+        if sort != UserSort.CREATED_AT:
+            raise HTTPException(status_code=400, detail="Cursor pagination is only available in created_at order")
+        return await list_users_by_cursor(request, cursor, limit, filters, db)
+    if settings.user_list_total_query != "separate" and settings.user_count_mode == "exact":
+        users, total = await UserService.list_users_with_total(
+            db, skip, limit, method=settings.user_list_total_query, filters=filters, sort=sort,
+            columns=USER_RESPONSE_COLUMNS
+        )
+        total_users = UserCount(total)
+    else:
+        total_users = await UserCountService.get(db, UserService.filter_conditions(filters))
+        users = await UserService.list_users(db, skip, limit, filters=filters, sort=sort, columns=USER_RESPONSE_COLUMNS)
+
+    # Rows of stored users need no validating here; FastAPI validates the response model on the way out
     user_responses = [
-        UserResponse.model_validate(user) for user in users
+        UserResponse.model_construct(**user._mapping) for user in users
     ]
 
-    pagination_links = generate_pagination_links(request, skip, limit, total_users)
+    pagination_links = generate_pagination_links(request, skip, limit, total_users.value)
 
     # Construct the final response with pagination details
     return UserListResponse(
         items=user_responses,
-        total=total_users,
+        total=total_users.value,
+        total_estimated=not total_users.exact,
         page=skip // limit + 1,
         size=len(user_responses),
         links=pagination_links  # Ensure you have appropriate logic to create these links
     )
 
-@router.post("/register/", response_model=UserResponse, tags=["Login and Registration"])
+async def list_users_by_cursor(request: Request, cursor: str, limit: int, filters: UserFilter,
+                               db: AsyncSession) -> UserListResponse:
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    users, has_more = await UserService.list_users_after(db, position, limit, filters=filters, columns=USER_RESPONSE_COLUMNS)
+    backwards = position is not None and position.backwards
+    next_cursor = prev_cursor = None
+    if users:
+        # Coming back from a later page, or with more ahead, there is a next page; likewise for prev
+        if has_more or backwards:
+            next_cursor = encode_cursor(Cursor(users[-1].created_at, users[-1].id))
+        if position is not None and (has_more or not backwards):
+            prev_cursor = encode_cursor(Cursor(users[0].created_at, users[0].id, backwards=True))
+    # Count once per walk: in exact mode every count is a full scan, and later pages reuse the first total
+    total_users = await UserCountService.get(db, UserService.filter_conditions(filters)) if position is None else None
+    return UserListResponse(
+        items=[UserResponse.model_construct(**user._mapping) for user in users],
+        total=total_users.value if total_users is not None else None,
+        total_estimated=total_users is not None and not total_users.exact,
+        size=len(users),
+        links=generate_pagination_links(request, 0, limit, 0, cursors=PageCursors(next_cursor, prev_cursor)),
+    )
+
+@router.post("/register/", response_model=UserResponse, tags=["Login and Registration"], dependencies=[Depends(rate_limit("register"))])
 async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service)):
     user = await UserService.register_user(session, user_data.model_dump(), email_service)
     if user:
         return user
     raise HTTPException(status_code=400, detail="Email already exists")
 
-@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"])
+@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"], dependencies=[Depends(rate_limit_login)])
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
-    if await UserService.is_account_locked(session, form_data.username):
+    result = await UserService.authenticate(session, form_data.username, form_data.password)
+    if result.locked:
         raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
 
-    user = await UserService.login_user(session, form_data.username, form_data.password)
+    user = result.user
     if user:
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
 
         access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
+            data={"sub": str(user.id), "role": str(user.role.name)},
             expires_delta=access_token_expires
         )
+        refresh_token = await RefreshTokenService.issue(session, user.id)
 
-        return {"access_token": access_token, "token_type": "bearer"}
+        return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
     raise HTTPException(status_code=401, detail="Incorrect email or password.")
 
+@router.post("/token/refresh", response_model=TokenResponse, tags=["Login and Registration"], dependencies=[Depends(rate_limit("refresh"))])
+async def refresh_access_token(body: RefreshTokenRequest, session: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+
+    Each refresh token works once. Replaying a used one revokes every token issued
+    from the same login.
+    """
+    result = await RefreshTokenService.rotate(session, body.refresh_token)
+    if result is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token.", headers={"WWW-Authenticate": "Bearer"})
+    user = result.user
+    access_token = create_access_token(
+        data={"sub": str(user.id), "role": str(user.role.name)},
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": result.refresh_token}
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, tags=["Login and Registration"])
+async def logout(body: Optional[RefreshTokenRequest] = None, session: AsyncSession = Depends(get_db), claims: dict = Depends(get_token_claims)):
+    """
+    Revoke the current access token and, if its refresh token is sent, the refresh tokens of this login.
+    """
+    await UserService.logout(session, claims, body.refresh_token if body else None)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 @router.get("/verify-email/{user_id}/{token}", status_code=status.HTTP_200_OK, name="verify_email", tags=["Login and Registration"])
 async def verify_email(user_id: UUID, token: str, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service)):
     """
@@ -325,45 +426,3 @@ async def verify_email(user_id: UUID, token: str, db: AsyncSession = Depends(get
     """
     # Implementation for email verification (not fully shown here)
     return {"message": "Email verified successfully."}
-
-@router.put("/users/me", response_model=UserResponse, tags=["User Self Management"])
-async def update_current_user_profile(
-    request: Request,
-    user_update: UserUpdate,
-    db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    user = await UserService.get_by_id(db, current_user["user_id"])
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user_data = user_update.model_dump(exclude_unset=True)
-
-    # Prevent role changes
-    if "role" in user_data:
-        user_data.pop("role")
-
-    if not user_data:
-        raise HTTPException(status_code=422, detail=[{"msg": "At least one field must be provided for update"}])
-
-    # Check for email conflict
-    if "email" in user_data:
-        existing = await UserService.get_by_email(db, user_data["email"])
-        if existing and existing.id != user.id:
-            raise HTTPException(status_code=409, detail="Email already exists")
-
-    updated = await UserService.update(db, user.id, user_data)
-    return UserResponse.model_construct(
-        id=updated.id,
-        bio=updated.bio,
-        first_name=updated.first_name,
-        last_name=updated.last_name,
-        profile_picture_url=updated.profile_picture_url,
-        nickname=updated.nickname,
-        email=updated.email,
-        role=updated.role,
-        last_login_at=updated.last_login_at,
-        created_at=updated.created_at,
-        updated_at=updated.updated_at,
-        links=create_user_links(updated.id, request)
-    )
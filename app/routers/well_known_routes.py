@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.key_ring import KeyRing, is_asymmetric
+from settings.config import settings
+
+router = APIRouter()
+
+@router.get("/.well-known/jwks.json", name="jwks", tags=["Login and Registration"])
+async def get_jwks():
+    """
+    Public keys for verifying access tokens, matched by the token's `kid` header.
+
+    Safe to cache for `max-age`; keys are published at least that long before they sign.
+    Empty while tokens are signed with a shared secret (HS256).
+    """
+    keys = KeyRing.jwks() if is_asymmetric(settings.jwt_algorithm) else {"keys": []}
+    return JSONResponse(keys, headers={"Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}"})
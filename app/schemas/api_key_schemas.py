@@ -0,0 +1,28 @@
+from builtins import str
+from datetime import datetime
+from typing import Optional
+import uuid
+from pydantic import BaseModel, Field
+from app.models.user_model import UserRole
+
+class ApiKeyCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100, example="billing-service")
+    user_id: uuid.UUID = Field(..., example=uuid.uuid4())
+    role: UserRole = Field(..., example="AUTHENTICATED")
+    expires_at: Optional[datetime] = Field(None, example="2030-01-01T00:00:00Z")
+
+class ApiKeyResponse(BaseModel):
+    id: uuid.UUID = Field(..., example=uuid.uuid4())
+    name: str = Field(..., example="billing-service")
+    prefix: str = Field(..., example="3f9a2c7d1e0b")
+    user_id: uuid.UUID = Field(..., example=uuid.uuid4())
+    role: UserRole = Field(..., example="AUTHENTICATED")
+    expires_at: Optional[datetime] = Field(None, example="2030-01-01T00:00:00Z")
+    revoked_at: Optional[datetime] = Field(None, example=None)
+    created_at: Optional[datetime] = Field(None, example="2026-01-01T00:00:00Z")
+
+    class Config:
+        from_attributes = True
+
+class ApiKeyCreatedResponse(ApiKeyResponse):
+    key: str = Field(..., description="The secret key; it is only shown once", example="um_3f9a2c7d1e0b_Xq2v...")
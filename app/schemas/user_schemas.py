@@ -6,6 +6,7 @@ from enum import Enum
 import uuid
 import re
 from app.models.user_model import UserRole
+from app.schemas.pagination_schema import PaginationLink
 from app.utils.nickname_gen import generate_nickname
 
 
@@ -78,6 +79,76 @@ class UserListResponse(BaseModel):
         "linkedin_profile_url": "https://linkedin.com/in/johndoe", 
         "github_profile_url": "https://github.com/johndoe"
     }])
-    total: int = Field(..., example=100)
-    page: int = Field(..., example=1)
+    total: Optional[int] = Field(..., example=100, description="Matching users; when paging by cursor, only on the first page")
+    total_estimated: bool = Field(False, example=False, description="Whether total is an estimate rather than an exact count")
+    page: Optional[int] = Field(None, example=1, description="Page number; not known when paging by cursor")
     size: int = Field(..., example=10)
+    links: List[PaginationLink] = []
+
+class UserFilter(BaseModel):
+    """Query parameters narrowing GET /users/; unset parameters do not filter."""
+    role: Optional[UserRole] = Field(None, description="Only users with this role")
+    email_verified: Optional[bool] = Field(None, description="Only users whose email is, or is not, verified")
+    is_locked: Optional[bool] = Field(None, description="Only locked, or unlocked, accounts")
+    is_professional: Optional[bool] = Field(None, description="Only professional, or non-professional, users")
+    created_after: Optional[datetime] = Field(None, description="Created at or after this time")
+    created_before: Optional[datetime] = Field(None, description="Created before this time")
+    last_login_after: Optional[datetime] = Field(None, description="Last logged in at or after this time")
+    last_login_before: Optional[datetime] = Field(None, description="Last logged in before this time")
+    nickname_prefix: Optional[str] = Field(None, min_length=1, description="Nickname starts with this")
+    email_prefix: Optional[str] = Field(None, min_length=1, description="Email starts with this")
+
+class UserSort(str, Enum):
+    """Sort keys for GET /users/; a leading '-' sorts descending. Ties are broken by id."""
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    LAST_LOGIN_AT = "last_login_at"
+    LAST_LOGIN_AT_DESC = "-last_login_at"
+    NICKNAME = "nickname"
+    NICKNAME_DESC = "-nickname"
+    EMAIL = "email"
+    EMAIL_DESC = "-email"
+
+class UserExportFormat(str, Enum):
+    """Formats of GET /users/export."""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class BulkUserAction(str, Enum):
+    """Operations of POST /users/bulk."""
+    SET_ROLE = "set_role"
+    UNLOCK = "unlock"
+    SET_PROFESSIONAL = "set_professional"
+    DELETE = "delete"
+
+class BulkUserRequest(BaseModel):
+    """An operation applied to the users named by ``ids``, or to those matching ``filter``."""
+    action: BulkUserAction = Field(..., example="unlock")
+    ids: Optional[List[uuid.UUID]] = Field(None, min_length=1, description="Users to apply the action to")
+    filter: Optional[UserFilter] = Field(None, description="Apply the action to users matching these GET /users/ filters instead; at least one for set_role and delete")
+    role: Optional[UserRole] = Field(None, description="New role, for set_role")
+    is_professional: Optional[bool] = Field(None, description="New professional status, for set_professional")
+
+    @root_validator(skip_on_failure=True)
+    def check_targets_and_values(cls, values):
+        if (values.get("ids") is None) == (values.get("filter") is None):
+            raise ValueError("Give either ids or filter")
+        # An empty filter matches every user, too easy to send by mistake for the irreversible actions
+        if values.get("action") in (BulkUserAction.SET_ROLE, BulkUserAction.DELETE) and values.get("filter") is not None \
+                and not values["filter"].model_dump(exclude_none=True):
+            raise ValueError(f"{values['action'].value} needs a filter with at least one condition")
+        if values.get("action") == BulkUserAction.SET_ROLE and values.get("role") is None:
+            raise ValueError("set_role needs a role")
+        if values.get("action") == BulkUserAction.SET_PROFESSIONAL and values.get("is_professional") is None:
+            raise ValueError("set_professional needs is_professional")
+        return values
+
+class BulkUserResult(BaseModel):
+    """What happened to one user: 'updated', 'deleted', 'unchanged', 'not_found' or 'not_allowed'."""
+    id: uuid.UUID
+    status: str = Field(..., example="updated")
+
+class BulkUserResponse(BaseModel):
+    action: BulkUserAction
+    results: List[BulkUserResult]
+    more: bool = Field(False, description="With a filter: the batch was full, so more users may match; repeat the request")
@@ -0,0 +1,122 @@
+from builtins import ValueError, bool, classmethod, dict, len, list, staticmethod, str
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Database
+from app.models.api_key_model import ApiKey
+from app.models.user_model import User, UserRole
+from app.services.jwt_service import TOKEN_VERSION
+from app.utils.token_cache import TokenCache
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+API_KEY_PREFIX = "um_"
+ROLE_RANK = {UserRole.ANONYMOUS: 0, UserRole.AUTHENTICATED: 1, UserRole.MANAGER: 2, UserRole.ADMIN: 3}
+
+def is_api_key(token: str) -> bool:
+    return token.startswith(API_KEY_PREFIX)
+
+class IssuedApiKey(NamedTuple):
+    """A new key row and its secret value, which is only available at issue time."""
+    api_key: ApiKey
+    key: str
+
+# Claims of recently verified keys, with a short artificial exp so revocations spread within the TTL
+api_key_cache = TokenCache(settings.api_key_cache_max_entries, name="api_key_cache")
+
+class ApiKeyService:
+    """Issues, verifies and revokes API keys."""
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hmac.new(settings.api_key_hmac_secret.encode(), key.encode(), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _split(key: str) -> Optional[str]:
+        """Return the prefix of a well-formed key."""
+        prefix, _, secret = key[len(API_KEY_PREFIX):].partition("_")
+        return prefix if prefix and secret else None
+
+    @classmethod
+    async def issue(cls, session: AsyncSession, user_id: uuid.UUID, name: str, role: UserRole,
+                    expires_at: Optional[datetime] = None) -> IssuedApiKey:
+        """Create a key for ``user_id``. The key's role may not exceed the owner's."""
+        owner_role = (await session.execute(select(User.role).where(User.id == user_id))).scalar()
+        if owner_role is None:
+            raise ValueError("User not found")
+        if ROLE_RANK[role] > ROLE_RANK[owner_role]:
+            raise ValueError(f"An API key for a {owner_role.name} user cannot have the {role.name} role")
+        prefix = secrets.token_hex(6)
+        key = f"{API_KEY_PREFIX}{prefix}_{secrets.token_urlsafe(32)}"
+        api_key = ApiKey(name=name, prefix=prefix, key_hash=cls._digest(key), user_id=user_id, role=role, expires_at=expires_at)
+        session.add(api_key)
+        await session.commit()
+        await session.refresh(api_key)
+        return IssuedApiKey(api_key, key)
+
+    @classmethod
+    async def list_keys(cls, session: AsyncSession, user_id: Optional[uuid.UUID] = None) -> List[ApiKey]:
+        query = select(ApiKey).order_by(ApiKey.created_at)
+        if user_id is not None:
+            query = query.where(ApiKey.user_id == user_id)
+        return list((await session.execute(query)).scalars().all())
+
+    @classmethod
+    async def revoke(cls, session: AsyncSession, key_id: uuid.UUID) -> bool:
+        result = await session.execute(
+            update(ApiKey).where(ApiKey.id == key_id, ApiKey.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc)).execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        # Other workers stop accepting it when their cached entry expires
+        api_key_cache.discard_where(lambda claims: claims.get("api_key_id") == str(key_id))
+        return result.rowcount > 0
+
+    @classmethod
+    async def verify(cls, key: str) -> Optional[dict]:
+        """
+        Return token-style claims (sub, role) for a valid key, or None. The role is the
+        lower of the key's and its owner's current role, so demoting a user also limits
+        their keys.
+
+        Served from the cache when possible; otherwise one lookup by the indexed prefix,
+        followed by a constant-time comparison of the HMAC digests.
+        """
+        claims = api_key_cache.get(key)
+        if claims is not None:
+            return claims
+        prefix = cls._split(key)
+        if prefix is None:
+            return None
+        query = select(
+            ApiKey.id, ApiKey.key_hash, ApiKey.role, ApiKey.expires_at, ApiKey.revoked_at, ApiKey.user_id,
+            User.is_locked, User.role.label("owner_role"),
+        ).join(User, User.id == ApiKey.user_id).where(ApiKey.prefix == prefix)
+        async with Database.get_session_factory()() as session:
+            row = (await session.execute(query)).first()
+        if row is None or not hmac.compare_digest(row.key_hash, cls._digest(key)):
+            return None
+        if row.revoked_at is not None or row.is_locked:
+            return None
+        if row.expires_at is not None and row.expires_at <= datetime.now(timezone.utc):
+            return None
+        claims = {
+            "sub": str(row.user_id),
+            "role": min(row.role, row.owner_role, key=ROLE_RANK.__getitem__).name,
+            "api_key_id": str(row.id),
+            # Keys name their owner by id, like current tokens, so they are not legacy tokens
+            "ver": TOKEN_VERSION,
+            "exp": time.time() + settings.api_key_cache_ttl_seconds,
+        }
+        api_key_cache.put(key, claims)
+        return claims
@@ -1,4 +1,6 @@
 from builtins import ValueError, dict, str
+import asyncio
+from typing import List, Tuple
 from settings.config import settings
 from app.utils.smtp_connection import SMTPClient
 from app.utils.template_manager import TemplateManager
@@ -14,7 +16,7 @@ class EmailService:
         )
         self.template_manager = template_manager
 
-    async def send_user_email(self, user_data: dict, email_type: str):
+    def _render(self, user_data: dict, email_type: str) -> Tuple[str, str]:
         subject_map = {
             'email_verification': "Verify Your Account",
             'password_reset': "Password Reset Instructions",
@@ -24,13 +26,27 @@ class EmailService:
         if email_type not in subject_map:
             raise ValueError("Invalid email type")
 
-        html_content = self.template_manager.render_template(email_type, **user_data)
-        self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
+        return subject_map[email_type], self.template_manager.render_template(email_type, **user_data)
 
-    async def send_verification_email(self, user: User):
+    async def send_user_email(self, user_data: dict, email_type: str):
+        subject, html_content = self._render(user_data, email_type)
+        self.smtp_client.send_email(subject, html_content, user_data['email'])
+
+    def _verification_data(self, user: User) -> dict:
         verification_url = f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}"
-        await self.send_user_email({
+        return {
             "name": user.first_name,
             "verification_url": verification_url,
             "email": user.email
-        }, 'email_verification')
+        }
+
+    async def send_verification_email(self, user: User):
+        await self.send_user_email(self._verification_data(user), 'email_verification')
+
+    async def send_verification_emails(self, users: List[User]) -> List[str]:
+        """
+        Send each user's verification email over one SMTP connection, in a worker thread so
+        the event loop keeps serving requests; return the addresses that were refused.
+        """
+        messages = [self._render(self._verification_data(user), 'email_verification') + (user.email,) for user in users]
+        return await asyncio.to_thread(self.smtp_client.send_emails, messages)
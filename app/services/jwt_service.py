@@ -1,21 +1,40 @@
 # app/services/jwt_service.py
 from builtins import dict, str
 import jwt
+import time
+import uuid
 from datetime import datetime, timedelta
+from app.services.key_ring import KeyRing, is_asymmetric
 from settings.config import settings
 
+# Version 2 tokens carry the user id as ``sub``; version 1 carried the email
+TOKEN_VERSION = 2
+
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     # Convert role to uppercase before encoding the JWT
     if 'role' in to_encode:
         to_encode['role'] = to_encode['role'].upper()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
-    to_encode.update({"exp": expire})
+    # jti identifies the token for revocation; a sub-second iat orders it against subject-wide revocations
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    to_encode.setdefault("ver", TOKEN_VERSION)
+    to_encode.update({"exp": expire, "iat": time.time()})
+    if is_asymmetric(settings.jwt_algorithm):
+        # Signed with the ring's active key; other services verify it against /.well-known/jwks.json
+        key = KeyRing.signing_key()
+        return jwt.encode(to_encode, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 def decode_token(token: str):
     try:
+        if is_asymmetric(settings.jwt_algorithm):
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = KeyRing.verification_key(kid) if kid else None
+            if key is None:
+                return None
+            return jwt.decode(token, key, algorithms=[settings.jwt_algorithm])
         decoded = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         return decoded
     except jwt.PyJWTError:
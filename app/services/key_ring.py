@@ -0,0 +1,192 @@
+from builtins import RuntimeError, ValueError, classmethod, int, list, sorted, str, zip
+import asyncio
+import fcntl
+import os
+import secrets
+import time
+from contextlib import contextmanager, suppress
+from logging import getLogger
+from typing import Dict, List, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+from app.utils.periodic import PeriodicTask
+from settings.config import settings
+
+logger = getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "ES256")
+
+def is_asymmetric(algorithm: str) -> bool:
+    return algorithm in ASYMMETRIC_ALGORITHMS
+
+class SigningKey:
+    """A private key in the ring. The kid starts with its creation time, so kids sort by age."""
+
+    def __init__(self, kid: str, private_key, algorithm: str):
+        self.kid = kid
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.algorithm = algorithm
+        self.created_at = int(kid.split("-")[0])
+
+    @classmethod
+    def generate(cls, algorithm: str) -> "SigningKey":
+        if algorithm == "EdDSA":
+            private_key = ed25519.Ed25519PrivateKey.generate()
+        elif algorithm == "ES256":
+            private_key = ec.generate_private_key(ec.SECP256R1())
+        else:
+            raise ValueError(f"Unsupported signing algorithm '{algorithm}'")
+        return cls(f"{int(time.time())}-{secrets.token_hex(4)}", private_key, algorithm)
+
+    def to_pem(self) -> bytes:
+        return self.private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+
+    def public_jwk(self) -> Dict[str, str]:
+        algorithm = OKPAlgorithm if self.algorithm == "EdDSA" else ECAlgorithm
+        jwk = algorithm.to_jwk(self.public_key, as_dict=True)
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+class KeyRing:
+    """
+    Asymmetric JWT signing keys stored as PEM files in ``settings.jwt_keys_dir``.
+
+    Keys are rotated on a schedule:
+
+    - a new key is created ``jwks_max_age_seconds`` before it is due to start signing,
+      so JWKS caches have picked it up by the time tokens carry its kid;
+    - the previous key stops signing when the new one activates, and is still published
+      and accepted for ``jwt_key_overlap_minutes`` so tokens it signed can expire.
+
+    Every worker reloads the directory on each check, so a key written by one worker is
+    picked up by the others well before it starts signing, as long as checks run more
+    often than ``jwks_max_age_seconds``. Checks hold an exclusive lock on the directory,
+    so only one worker at a time creates or deletes keys. Only ``start()`` and the
+    periodic check touch the disk; signing, verification and the JWKS read the ring in
+    memory.
+    """
+    _keys: List[SigningKey] = []
+    _rotation: Optional[PeriodicTask] = None
+
+    @classmethod
+    def _publish_ahead(cls) -> int:
+        return settings.jwks_max_age_seconds
+
+    @classmethod
+    def _activates_at(cls, key: SigningKey) -> int:
+        return key.created_at + cls._publish_ahead()
+
+    @classmethod
+    def load(cls):
+        """Read every key from the keys directory."""
+        os.makedirs(settings.jwt_keys_dir, exist_ok=True)
+        keys = []
+        for filename in os.listdir(settings.jwt_keys_dir):
+            if not filename.endswith(".pem"):
+                continue
+            # Another worker may have deleted a retired key since the listing
+            with suppress(FileNotFoundError), open(os.path.join(settings.jwt_keys_dir, filename), "rb") as key_file:
+                private_key = serialization.load_pem_private_key(key_file.read(), password=None)
+                keys.append(SigningKey(filename[:-4], private_key, settings.jwt_algorithm))
+        cls._keys = sorted(keys, key=lambda key: key.kid)
+
+    @classmethod
+    def _write(cls, key: SigningKey):
+        path = os.path.join(settings.jwt_keys_dir, f"{key.kid}.pem")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as key_file:
+            key_file.write(key.to_pem())
+
+    @classmethod
+    @contextmanager
+    def _locked(cls):
+        os.makedirs(settings.jwt_keys_dir, exist_ok=True)
+        with open(os.path.join(settings.jwt_keys_dir, ".rotation.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def rotate(cls, now: Optional[int] = None):
+        """Reload the ring, add a key if rotation is due and delete keys past their overlap window."""
+        with cls._locked():
+            cls._rotate(int(time.time()) if now is None else now)
+
+    @classmethod
+    def _rotate(cls, now: int):
+        cls.load()
+        rotation_seconds = settings.jwt_key_rotation_days * 86400
+        if not cls._keys or cls._keys[-1].created_at + rotation_seconds - cls._publish_ahead() <= now:
+            key = SigningKey.generate(settings.jwt_algorithm)
+            cls._write(key)
+            # Replace the list rather than change it: requests read it while this runs in a thread
+            cls._keys = cls._keys + [key]
+            logger.info("Generated JWT signing key %s", key.kid)
+        for key in cls._expired_keys(now):
+            with suppress(FileNotFoundError):
+                os.remove(os.path.join(settings.jwt_keys_dir, f"{key.kid}.pem"))
+            cls._keys = [other for other in cls._keys if other is not key]
+            logger.info("Removed retired JWT signing key %s", key.kid)
+
+    @classmethod
+    def _expired_keys(cls, now: int) -> List[SigningKey]:
+        overlap_seconds = settings.jwt_key_overlap_minutes * 60
+        expired = []
+        signing_index = cls._keys.index(cls.signing_key(now))
+        # A key retires when its successor activates; it stays verifiable for the overlap
+        for older, newer in zip(cls._keys[:signing_index], cls._keys[1:signing_index + 1]):
+            if cls._activates_at(newer) + overlap_seconds <= now:
+                expired.append(older)
+        return expired
+
+    @classmethod
+    def signing_key(cls, now: Optional[int] = None) -> SigningKey:
+        """The newest key that has been published long enough; the oldest key while bootstrapping."""
+        if not cls._keys:
+            raise RuntimeError("No JWT signing keys are loaded; KeyRing.start() has not run")
+        now = int(time.time()) if now is None else now
+        active = [key for key in cls._keys if cls._activates_at(key) <= now]
+        return active[-1] if active else cls._keys[0]
+
+    @classmethod
+    def verification_key(cls, kid: str):
+        """Return the public key for ``kid``, or None if it is not in the ring."""
+        for key in cls._keys:
+            if key.kid == kid:
+                return key.public_key
+        return None
+
+    @classmethod
+    def jwks(cls) -> Dict[str, list]:
+        """All published public keys, as a JWK Set."""
+        return {"keys": [key.public_jwk() for key in cls._keys]}
+
+    @classmethod
+    async def _rotate_periodically(cls):
+        # The lock may wait on another worker, and the keys are files: keep both off the event loop
+        await asyncio.to_thread(cls.rotate)
+
+    @classmethod
+    def start(cls):
+        """Load or create keys and schedule rotation checks; a no-op with a shared-secret algorithm."""
+        if not is_asymmetric(settings.jwt_algorithm):
+            return
+        cls.rotate()
+        cls._rotation = PeriodicTask("jwt-key-rotation", settings.jwt_key_check_interval_seconds, cls._rotate_periodically)
+        cls._rotation.start()
+
+    @classmethod
+    async def stop(cls):
+        if cls._rotation is not None:
+            await cls._rotation.stop()
+            cls._rotation = None
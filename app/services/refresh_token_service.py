@@ -0,0 +1,133 @@
+from builtins import classmethod, str
+from datetime import datetime, timedelta, timezone
+import hashlib
+import logging
+import secrets
+import uuid
+from typing import NamedTuple, Optional
+
+from sqlalchemy import Row, delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.refresh_token_model import RefreshToken
+from app.models.user_model import User
+from app.utils.metrics import metrics
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+class RefreshResult(NamedTuple):
+    """A rotated refresh token and the id, email and role of its user."""
+    refresh_token: str
+    user: Row
+
+class RefreshTokenService:
+    """Issues and rotates opaque refresh tokens; only their SHA-256 is stored."""
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def _new_token(cls, user_id: uuid.UUID, family_id: uuid.UUID, now: datetime):
+        token = secrets.token_urlsafe(32)
+        row = RefreshToken(
+            token_hash=cls._hash(token),
+            user_id=user_id,
+            family_id=family_id,
+            expires_at=now + timedelta(minutes=settings.refresh_token_expire_minutes),
+        )
+        return token, row
+
+    @classmethod
+    async def issue(cls, session: AsyncSession, user_id: uuid.UUID) -> Optional[str]:
+        """Start a new token family for a fresh login, dropping the user's expired tokens."""
+        now = datetime.now(timezone.utc)
+        token, row = cls._new_token(user_id, uuid.uuid4(), now)
+        try:
+            await session.execute(
+                delete(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.expires_at <= now)
+            )
+            session.add(row)
+            await session.commit()
+            return token
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            await session.rollback()
+            return None
+
+    @classmethod
+    async def rotate(cls, session: AsyncSession, token: str) -> Optional[RefreshResult]:
+        """
+        Exchange a refresh token for its successor without touching the password hash.
+
+        The presented token is claimed with one indexed UPDATE ... RETURNING, so two
+        concurrent refreshes cannot both succeed; the user row is then read by primary key. A token that was already used revokes
+        its whole family, logging out whoever holds the stolen copy.
+        """
+        now = datetime.now(timezone.utc)
+        token_hash = cls._hash(token)
+        claim = update(RefreshToken).where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        ).values(used_at=now).returning(
+            RefreshToken.user_id, RefreshToken.family_id
+        ).execution_options(synchronize_session=False)
+        try:
+            claimed = (await session.execute(claim)).first()
+            if claimed is None:
+                await cls._revoke_reused(session, token_hash, now)
+                await session.commit()
+                return None
+            user = (await session.execute(
+                select(User.id, User.email, User.role).where(User.id == claimed.user_id, User.is_locked.is_not(True))
+            )).first()
+            if user is None:
+                await session.commit()
+                return None
+            new_token, row = cls._new_token(user.id, claimed.family_id, now)
+            session.add(row)
+            await session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            await session.rollback()
+            return None
+        return RefreshResult(new_token, user)
+
+    @classmethod
+    async def _revoke_reused(cls, session: AsyncSession, token_hash: str, now: datetime):
+        family = select(RefreshToken.family_id).where(
+            RefreshToken.token_hash == token_hash, RefreshToken.used_at.is_not(None)
+        ).scalar_subquery()
+        result = await session.execute(
+            update(RefreshToken).where(
+                RefreshToken.family_id == family, RefreshToken.revoked_at.is_(None)
+            ).values(revoked_at=now).execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            metrics.counter("refresh_token_reuse_total", "Refresh token families revoked after a used token was replayed").inc()
+            logger.warning("Refresh token reuse detected; revoked %s tokens", result.rowcount)
+
+    @classmethod
+    async def revoke_user(cls, session: AsyncSession, user_id: uuid.UUID) -> int:
+        """Revoke every outstanding refresh token of a user, e.g. on password reset. The caller commits."""
+        result = await session.execute(
+            update(RefreshToken).where(
+                RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)
+            ).values(revoked_at=datetime.now(timezone.utc)).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @classmethod
+    async def revoke_family(cls, session: AsyncSession, token: str) -> int:
+        """Revoke the given refresh token and every token rotated from the same login. The caller commits."""
+        family = select(RefreshToken.family_id).where(RefreshToken.token_hash == cls._hash(token)).scalar_subquery()
+        result = await session.execute(
+            update(RefreshToken).where(
+                RefreshToken.family_id == family, RefreshToken.revoked_at.is_(None)
+            ).values(revoked_at=datetime.now(timezone.utc)).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
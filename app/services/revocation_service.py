@@ -0,0 +1,202 @@
+from builtins import Exception, bool, classmethod, dict, float, int, isinstance, len, max, str
+from datetime import datetime, timedelta, timezone
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Database
+from app.models.revoked_token_model import RevokedToken
+from app.utils.bloom_filter import BloomFilter
+from app.utils.metrics import metrics
+from app.utils.periodic import PeriodicTask
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Incremental syncs re-read this far back, so rows committed out of revoked_at order are not missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+def subject_key(subject: str) -> str:
+    return f"sub:{subject}"
+
+class RevocationService:
+    """
+    Revoked access tokens, checked on every authenticated request.
+
+    The ``revoked_tokens`` table is authoritative. Each worker mirrors its keys in a
+    Bloom filter, so a token that was never revoked is accepted without any I/O; only
+    filter hits (revoked tokens and rare false positives) are confirmed, from a bounded
+    map of keys this worker revoked, synced or already looked up, else in the database.
+    The filter is synced incrementally every ``revocation_sync_interval_seconds``, and
+    rebuilt from scratch, after pruning expired rows, every
+    ``revocation_rebuild_interval_seconds``. A revocation made by another worker takes
+    effect here within one sync interval.
+    """
+    _filter: BloomFilter = BloomFilter(settings.revocation_filter_capacity, settings.revocation_filter_error_rate)
+    _synced_until: Optional[datetime] = None
+    _rebuilt_at: float = 0.0
+    # Keys remembered within the sync overlap, so syncs that re-read them do not add them again
+    _recent: Dict[str, datetime] = {}
+    # When each recently revoked or looked-up key was revoked, or None if it is not; bounded LRU
+    _confirmed: "OrderedDict[str, Optional[datetime]]" = OrderedDict()
+    _sync_task: Optional[PeriodicTask] = None
+
+    @classmethod
+    def _confirm(cls, key: str, revoked_at: Optional[datetime]):
+        cls._confirmed[key] = revoked_at
+        cls._confirmed.move_to_end(key)
+        if len(cls._confirmed) > settings.revocation_confirmed_max_entries:
+            cls._confirmed.popitem(last=False)
+
+    @classmethod
+    def _remember(cls, key: str, revoked_at: datetime):
+        # Known revocations answer filter hits without a query, and stay current when a subject is revoked again
+        cls._confirm(key, revoked_at)
+        if key in cls._recent:
+            cls._recent[key] = max(cls._recent[key], revoked_at)
+            return
+        cls._recent[key] = revoked_at
+        cls._filter.add(key)
+        metrics.gauge("revocation_filter_entries", "Keys in this worker's revocation Bloom filter").set(len(cls._filter))
+
+    @classmethod
+    async def _revoke(cls, session: AsyncSession, key: str, expires_at: datetime):
+        revoked_at = datetime.now(timezone.utc)
+        await session.merge(RevokedToken(key=key, expires_at=expires_at, revoked_at=revoked_at))
+        cls._remember(key, revoked_at)
+
+    @classmethod
+    async def revoke_token(cls, session: AsyncSession, jti: str, expires_at):
+        """Revoke one access token until its ``exp`` (a datetime or a Unix timestamp). The caller commits."""
+        if not isinstance(expires_at, datetime):
+            expires_at = datetime.fromtimestamp(expires_at, timezone.utc)
+        await cls._revoke(session, jti, expires_at)
+
+    @classmethod
+    async def revoke_subject(cls, session: AsyncSession, subject: str):
+        """Revoke every access token issued to ``subject`` until now. The caller commits."""
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
+        await cls._revoke(session, subject_key(subject), expires_at)
+
+    @classmethod
+    async def revoke_user(cls, session: AsyncSession, user_id, email: Optional[str] = None):
+        """
+        Revoke every access token of a user. The caller commits.
+
+        Tokens name the user by id; while legacy email-subject tokens are accepted,
+        those are revoked too.
+        """
+        await cls.revoke_subject(session, str(user_id))
+        if email and settings.jwt_accept_legacy_subject:
+            await cls.revoke_subject(session, email)
+
+    @classmethod
+    async def revoke_users(cls, session: AsyncSession, users: Sequence[Tuple]):
+        """
+        Revoke every access token of each ``(user_id, email)`` with one upsert, as
+        revoke_user does one by one. The caller commits.
+        """
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(minutes=settings.access_token_expire_minutes)
+        keys = [subject_key(str(user_id)) for user_id, _ in users]
+        if settings.jwt_accept_legacy_subject:
+            keys += [subject_key(email) for _, email in users if email]
+        if not keys:
+            return
+        dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(RevokedToken).values([{"key": key, "expires_at": expires_at, "revoked_at": now} for key in keys])
+        await session.execute(statement.on_conflict_do_update(
+            index_elements=[RevokedToken.key],
+            set_={"expires_at": statement.excluded.expires_at, "revoked_at": statement.excluded.revoked_at},
+        ))
+        for key in keys:
+            cls._remember(key, now)
+
+    @classmethod
+    async def is_revoked(cls, claims: dict) -> bool:
+        """Check a verified token's ``jti`` and subject against the filter, then the table on a hit."""
+        subject = claims.get("sub") or claims.get("user_id")
+        keys = [key for key in (claims.get("jti"), subject and subject_key(subject)) if key]
+        candidates = [key for key in keys if key in cls._filter]
+        if not candidates:
+            return False
+        metrics.counter("revocation_filter_hits_total", "Tokens whose jti or subject matched the revocation filter").inc()
+        answers = {key: cls._confirmed[key] for key in candidates if key in cls._confirmed}
+        for key in answers:
+            cls._confirmed.move_to_end(key)
+        unknown = [key for key in candidates if key not in answers]
+        if unknown:
+            async with Database.get_session_factory()() as session:
+                rows = (await session.execute(
+                    select(RevokedToken.key, RevokedToken.revoked_at).where(RevokedToken.key.in_(unknown))
+                )).all()
+            found = {row.key: row.revoked_at for row in rows}
+            for key in unknown:
+                answers[key] = found.get(key)
+                cls._confirm(key, answers[key])
+        issued_at = claims.get("iat", 0)
+        for key, revoked_at in answers.items():
+            if revoked_at is not None and (key == claims.get("jti") or revoked_at.timestamp() >= issued_at):
+                return True
+        metrics.counter("revocation_filter_false_positives_total", "Revocation filter hits not confirmed by the database").inc()
+        return False
+
+    @classmethod
+    async def rebuild(cls, session: AsyncSession):
+        """Delete expired rows and reload every remaining key into a new filter."""
+        now = datetime.now(timezone.utc)
+        await session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        await session.commit()
+        rows = (await session.execute(select(RevokedToken.key, RevokedToken.revoked_at))).all()
+        bloom = BloomFilter(max(settings.revocation_filter_capacity, 2 * len(rows)), settings.revocation_filter_error_rate)
+        for row in rows:
+            bloom.add(row.key)
+        cls._filter = bloom
+        cls._confirmed = OrderedDict()
+        cls._synced_until = max([row.revoked_at for row in rows], default=now)
+        cls._recent = {row.key: row.revoked_at for row in rows if row.revoked_at > cls._synced_until - SYNC_OVERLAP}
+        cls._rebuilt_at = time.monotonic()
+        metrics.gauge("revocation_filter_entries", "Keys in this worker's revocation Bloom filter").set(len(bloom))
+
+    @classmethod
+    async def sync(cls, session: AsyncSession):
+        """Add keys revoked by other workers since the last sync."""
+        if cls._synced_until is None:
+            return await cls.rebuild(session)
+        rows = (await session.execute(
+            select(RevokedToken.key, RevokedToken.revoked_at).where(RevokedToken.revoked_at > cls._synced_until - SYNC_OVERLAP)
+        )).all()
+        for row in rows:
+            cls._remember(row.key, row.revoked_at)
+            cls._synced_until = max(cls._synced_until, row.revoked_at)
+        # Keys revoked before the next sync's window will not be read again
+        cls._recent = {key: revoked_at for key, revoked_at in cls._recent.items() if revoked_at > cls._synced_until - SYNC_OVERLAP}
+
+    @classmethod
+    async def _tick(cls):
+        async with Database.get_session_factory()() as session:
+            if cls._filter.saturated or time.monotonic() - cls._rebuilt_at >= settings.revocation_rebuild_interval_seconds:
+                await cls.rebuild(session)
+            else:
+                await cls.sync(session)
+
+    @classmethod
+    async def start(cls):
+        """Load the filter and schedule syncs. A failed load is logged and retried by the next sync."""
+        try:
+            await cls._tick()
+        except Exception as e:
+            logger.error("Could not load revoked tokens: %s", e)
+        cls._sync_task = PeriodicTask("token-revocation-sync", settings.revocation_sync_interval_seconds, cls._tick)
+        cls._sync_task.start()
+
+    @classmethod
+    async def stop(cls):
+        if cls._sync_task is not None:
+            await cls._sync_task.stop()
+            cls._sync_task = None
@@ -0,0 +1,93 @@
+from builtins import ValueError, bool, classmethod, dict, len, list, set, str
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import any_, delete, func, literal, select, true, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user_model import User
+from app.schemas.user_schemas import BulkUserAction, BulkUserRequest, BulkUserResult
+from app.services.revocation_service import RevocationService
+from app.services.user_count_service import UserCountService
+from app.services.user_service import UserService
+from settings.config import settings
+
+class UserBulkService:
+    """
+    Admin operations on many users at once, each as one set-based UPDATE or DELETE
+    ... RETURNING id and one commit.
+
+    Users are named by id, at most ``user_bulk_max_users`` of them, or by a GET /users/
+    filter, in which case the first ``user_bulk_max_users`` matching users that the
+    action would change are taken, in creation order; repeating the request works
+    through the rest. Only users the action changes are touched: unlocking skips
+    unlocked accounts, as unlock_user_account does. Role changes and deletes never
+    apply to the caller, and revoke the access tokens of the users they change.
+    """
+
+    @classmethod
+    def _id_in(cls, session: AsyncSession, ids: Sequence[UUID]):
+        if session.bind.dialect.name == "postgresql":
+            # One array parameter, so every batch size shares one prepared statement
+            return User.id == any_(literal(list(ids), postgresql.ARRAY(postgresql.UUID(as_uuid=True))))
+        return User.id.in_(ids)
+
+    @classmethod
+    def _changes(cls, request: BulkUserRequest) -> Tuple[list, dict]:
+        """The condition a user must meet for the action to change it, and the new values."""
+        if request.action == BulkUserAction.SET_ROLE:
+            return [User.role != request.role], {"role": request.role}
+        if request.action == BulkUserAction.UNLOCK:
+            return [User.is_locked.is_(True)], {"is_locked": False, "failed_login_attempts": 0}
+        if request.action == BulkUserAction.SET_PROFESSIONAL:
+            return [User.is_professional.is_distinct_from(request.is_professional)], {
+                "is_professional": request.is_professional, "professional_status_updated_at": func.now()}
+        return [true()], {}
+
+    @classmethod
+    async def apply(cls, session: AsyncSession, request: BulkUserRequest,
+                    caller_id: Optional[UUID]) -> Tuple[List[BulkUserResult], bool]:
+        """Apply ``request`` and return the outcome for each user, and whether more users may match its filter."""
+        limit = settings.user_bulk_max_users
+        if request.ids is not None and len(set(request.ids)) > limit:
+            raise ValueError(f"At most {limit} users can be changed at once")
+        conditions, values = cls._changes(request)
+        protected = request.action in (BulkUserAction.SET_ROLE, BulkUserAction.DELETE) and caller_id is not None
+        if protected:
+            conditions.append(User.id != caller_id)
+        if request.ids is not None:
+            target = cls._id_in(session, request.ids)
+        else:
+            target = User.id.in_(
+                select(User.id).where(*UserService.filter_conditions(request.filter), *conditions)
+                .order_by(User.created_at, User.id).limit(limit).scalar_subquery()
+            )
+        if request.action == BulkUserAction.DELETE:
+            statement = delete(User)
+        else:
+            statement = update(User).values(**values)
+        statement = statement.where(target, *conditions).returning(User.id, User.email) \
+            .execution_options(synchronize_session=False)
+        changed = (await session.execute(statement)).all()
+        if request.action in (BulkUserAction.SET_ROLE, BulkUserAction.DELETE):
+            # Tokens carry the role, and must not outlive the user
+            await RevocationService.revoke_users(session, changed)
+        await session.commit()
+        if request.action == BulkUserAction.DELETE:
+            UserCountService.invalidate()
+
+        done = "deleted" if request.action == BulkUserAction.DELETE else "updated"
+        results = {row.id: done for row in changed}
+        if request.ids is None:
+            return [BulkUserResult(id=user_id, status=status) for user_id, status in results.items()], len(changed) == limit
+        missing = [user_id for user_id in dict.fromkeys(request.ids) if user_id not in results]
+        existing = set()
+        if missing:
+            existing = set((await session.execute(select(User.id).where(cls._id_in(session, missing)))).scalars())
+        for user_id in missing:
+            if protected and user_id == caller_id:
+                results[user_id] = "not_allowed"
+            else:
+                results[user_id] = "unchanged" if user_id in existing else "not_found"
+        return [BulkUserResult(id=user_id, status=results[user_id]) for user_id in dict.fromkeys(request.ids)], False
@@ -0,0 +1,69 @@
+from builtins import ValueError, bool, classmethod, int
+import time
+from typing import NamedTuple, Optional, Sequence
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user_model import User
+from settings.config import settings
+
+COUNT_MODES = ("exact", "cached", "estimate")
+
+class UserCount(NamedTuple):
+    """Number of users, and whether it was counted or is the planner's estimate."""
+    value: int
+    exact: bool = True
+
+class UserCountService:
+    """
+    Total number of users for paginated listings, per ``user_count_mode``.
+
+    ``exact`` counts every time. ``cached`` keeps an exact count for
+    ``user_count_cache_ttl_seconds``; this worker drops it when a user is created or
+    deleted, other workers see the change when their copy expires. ``estimate`` reads
+    PostgreSQL's ``pg_class.reltuples``, which costs nothing but is only as fresh as the
+    last ANALYZE, and counts exactly when the estimate is below
+    ``user_count_estimate_threshold`` or the database has none. Filtered listings are
+    always counted exactly.
+    """
+    _cached: Optional[UserCount] = None
+    _cached_at: float = 0.0
+
+    @classmethod
+    async def _exact(cls, session: AsyncSession, conditions: Sequence = ()) -> UserCount:
+        query = select(func.count()).select_from(User).where(*conditions).execution_options(replica=True)
+        return UserCount((await session.execute(query)).scalar())
+
+    @classmethod
+    async def _estimate(cls, session: AsyncSession) -> Optional[UserCount]:
+        if session.bind.dialect.name != "postgresql":
+            return None
+        query = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)")
+        estimate = (await session.execute(query, {"table": User.__tablename__})).scalar()
+        # reltuples is -1 (or 0 before PostgreSQL 14) until the table is first analyzed
+        if estimate is None or estimate < settings.user_count_estimate_threshold:
+            return None
+        return UserCount(estimate, exact=False)
+
+    @classmethod
+    async def get(cls, session: AsyncSession, conditions: Sequence = ()) -> UserCount:
+        """Count the users matching ``conditions``, WHERE clauses of a filtered listing."""
+        mode = settings.user_count_mode
+        if conditions:
+            return await cls._exact(session, conditions)
+        if mode == "estimate":
+            return await cls._estimate(session) or await cls._exact(session)
+        if mode == "cached":
+            if cls._cached is None or time.monotonic() - cls._cached_at >= settings.user_count_cache_ttl_seconds:
+                cls._cached = await cls._exact(session)
+                cls._cached_at = time.monotonic()
+            return cls._cached
+        if mode != "exact":
+            raise ValueError(f"Unknown user_count_mode '{mode}', expected one of {', '.join(COUNT_MODES)}")
+        return await cls._exact(session)
+
+    @classmethod
+    def invalidate(cls):
+        """Forget the cached count; called after users are created or deleted."""
+        cls._cached = None
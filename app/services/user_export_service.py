@@ -0,0 +1,31 @@
+from builtins import classmethod, str
+from typing import AsyncIterator, Optional
+
+from app.database import Database
+from app.schemas.user_schemas import UserExportFormat, UserFilter
+from app.services.user_service import USER_EXPORT_COLUMNS, UserService
+from app.utils.record_stream import format_records
+from settings.config import settings
+
+class UserExportService:
+    """
+    The user table, or the users matching a listing's filters, as one NDJSON or CSV stream.
+
+    The export reads from a read replica when there is one, in its own session, since the
+    request's session closes when the handler returns, long before the stream ends.
+    Batches of ``user_export_batch_size`` rows are fetched from a server-side cursor only
+    as the previous batch is sent, so memory stays flat and a slow client slows the
+    query instead of buffering the table.
+    """
+
+    @classmethod
+    async def export(cls, fmt: UserExportFormat, filters: Optional[UserFilter] = None) -> AsyncIterator[str]:
+        """Yield the export in chunks of one batch each."""
+        header = [column.key for column in USER_EXPORT_COLUMNS] if fmt == UserExportFormat.CSV else None
+        async with Database.get_session_factory()() as session:
+            async for rows in UserService.stream_users(session, filters, settings.user_export_batch_size):
+                yield format_records(rows, fmt.value, header)
+                header = None
+        if header:
+            # Nothing matched; a CSV export still gets its header
+            yield format_records([], fmt.value, header)
@@ -0,0 +1,188 @@
+from builtins import Exception, ValueError, classmethod, dict, int, isinstance, len, list, map, set, str, zip
+import asyncio
+import uuid
+from logging import getLogger
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+from fastapi import BackgroundTasks
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Database
+from app.models.user_model import User, UserRole
+from app.schemas.user_schemas import UserCreate
+from app.services.email_service import EmailService
+from app.services.user_count_service import UserCountService
+from app.utils.admission import Overloaded
+from app.utils.nickname_gen import generate_nickname
+from app.utils.security import generate_verification_token, hash_password_async
+from settings.config import settings
+
+logger = getLogger(__name__)
+
+Record = Union[dict, ValueError]
+
+class UserImportService:
+    """
+    Bulk creation of users from a stream of records, for migrating tenants in.
+
+    Records are taken ``user_import_batch_size`` at a time. Each batch is validated,
+    checked against existing emails and nicknames with one query each, hashed on the
+    hashing pool and written with a single multi-row INSERT ... ON CONFLICT DO NOTHING,
+    in its own session and commit, so rows already imported stay if the stream breaks.
+    Imported users get the role and verification flow of self-registered ones. A batch's
+    verification emails are queued once it is committed and sent in a worker thread over
+    one SMTP session per batch, one batch after another; the import never waits for them,
+    so a slow mail server holds its queued batches in memory rather than the import.
+    """
+    # Email sends still running, referenced so they finish even if the client goes away
+    _sending: Set[asyncio.Task] = set()
+
+    @classmethod
+    async def import_users(cls, records: AsyncIterator[Tuple[int, Record]], email_service: EmailService,
+                           background_tasks: BackgroundTasks) -> AsyncIterator[dict]:
+        """Import ``(line, record)`` pairs and yield one result per record, in input order."""
+        batch, sending = [], None
+        async for item in records:
+            batch.append(item)
+            if len(batch) >= settings.user_import_batch_size:
+                results, created = await cls._import_batch(batch)
+                sending = cls._send_emails(email_service, created, sending)
+                for result in results:
+                    yield result
+                batch = []
+        if batch:
+            results, created = await cls._import_batch(batch)
+            sending = cls._send_emails(email_service, created, sending)
+            for result in results:
+                yield result
+        if sending is not None:
+            # The last batch's emails finish after the response
+            background_tasks.add_task(asyncio.wait, {sending})
+
+    @classmethod
+    def _validate(cls, batch: List[Tuple[int, Record]]) -> Tuple[Dict[int, dict], List[Tuple[int, UserCreate]]]:
+        results, valid, emails = {}, [], set()
+        for line, record in batch:
+            if isinstance(record, ValueError):
+                results[line] = {"line": line, "status": "invalid", "errors": [str(record)]}
+                continue
+            try:
+                # The role is assigned as for registration, so any given one is ignored
+                user = UserCreate(**{**record, "role": UserRole.ANONYMOUS.name})
+            except ValidationError as e:
+                errors = [f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()]
+                results[line] = {"line": line, "email": record.get("email"), "status": "invalid", "errors": errors}
+                continue
+            if user.email in emails:
+                results[line] = {"line": line, "email": user.email, "status": "duplicate"}
+                continue
+            emails.add(user.email)
+            valid.append((line, user))
+        return results, valid
+
+    @classmethod
+    async def _hash_passwords(cls, passwords: List[str]) -> List[str]:
+        # As many hashes in flight as the pool has workers, so logins queue behind at most one batch of them
+        slots = asyncio.Semaphore(settings.password_hash_pool_size)
+
+        async def hash_one(password: str) -> str:
+            async with slots:
+                while True:
+                    try:
+                        # Admitted as registrations, so imports take their share of the pool and logins keep theirs
+                        return await hash_password_async(password, stage="register")
+                    except Overloaded as e:
+                        await asyncio.sleep(e.retry_after)
+
+        return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+    @classmethod
+    def _insert(cls, session: AsyncSession, rows: List[dict]):
+        dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+        # No conflict target: a row clashing on email or nickname, e.g. with a concurrent signup, is skipped
+        return dialect.insert(User).values(rows).on_conflict_do_nothing().returning(User.id)
+
+    @classmethod
+    def _unique_nickname(cls, nickname: str, unavailable: Set[str]) -> str:
+        """Regenerate ``nickname`` until it is not in ``unavailable``, then reserve it there."""
+        while nickname in unavailable:
+            nickname = generate_nickname()
+        unavailable.add(nickname)
+        return nickname
+
+    @classmethod
+    async def _import_batch(cls, batch: List[Tuple[int, Record]]) -> Tuple[List[dict], List[User]]:
+        """Import one batch; return its results in input order and the users it created."""
+        results, valid = cls._validate(batch)
+        if not valid:
+            return [results[line] for line, _ in batch], []
+        async with Database.get_session_factory()() as session:
+            existing = set((await session.execute(
+                select(User.email).where(User.email.in_([user.email for _, user in valid]))
+            )).scalars())
+            for line, user in valid:
+                if user.email in existing:
+                    results[line] = {"line": line, "email": user.email, "status": "duplicate"}
+            valid = [(line, user) for line, user in valid if user.email not in existing]
+            nicknames = [user.nickname or generate_nickname() for _, user in valid]
+            taken = set((await session.execute(select(User.nickname).where(User.nickname.in_(nicknames)))).scalars())
+            for line, user in valid:
+                if user.nickname in taken:
+                    results[line] = {"line": line, "email": user.email, "status": "conflict", "errors": ["nickname: already taken"]}
+            kept = [(item, nickname) for item, nickname in zip(valid, nicknames) if item[1].nickname not in taken]
+            valid, nicknames = [item for item, _ in kept], [nickname for _, nickname in kept]
+            # End the read transaction so the connection goes back to the pool while the passwords are hashed
+            await session.commit()
+            hashes = await cls._hash_passwords([user.password for _, user in valid])
+            rows = []
+            # Generated nicknames keep clear of existing users and of every other nickname in the batch
+            unavailable = taken | {user.nickname for _, user in valid if user.nickname}
+            for (_, user), nickname, hashed_password in zip(valid, nicknames, hashes):
+                if not user.nickname:
+                    nickname = cls._unique_nickname(nickname, unavailable)
+                rows.append({
+                    **user.model_dump(exclude={"password", "nickname", "role"}),
+                    "id": uuid.uuid4(), "nickname": nickname, "role": UserRole.ANONYMOUS, "email_verified": False,
+                    "is_professional": False, "is_locked": False, "failed_login_attempts": 0,
+                    "hashed_password": hashed_password, "verification_token": generate_verification_token(),
+                })
+            inserted = set((await session.execute(cls._insert(session, rows))).scalars()) if rows else set()
+            await session.commit()
+        created = [User(**row) for row in rows if row["id"] in inserted]
+        for (line, user), row in zip(valid, rows):
+            if row["id"] in inserted:
+                results[line] = {"line": line, "email": user.email, "status": "created", "id": str(row["id"])}
+            else:
+                # Taken by a user created since the check, or a nickname clash
+                results[line] = {"line": line, "email": user.email, "status": "conflict"}
+        if created:
+            UserCountService.invalidate()
+        return [results[line] for line, _ in batch], created
+
+    @classmethod
+    def _send_emails(cls, email_service: EmailService, users: List[User],
+                     previous: Optional[asyncio.Task]) -> Optional[asyncio.Task]:
+        """Queue ``users``' verification emails behind the ``previous`` batch's without waiting for either."""
+        if not users:
+            return previous
+        task = asyncio.create_task(cls.send_verification_emails(email_service, users, previous))
+        cls._sending.add(task)
+        task.add_done_callback(cls._sending.discard)
+        return task
+
+    @classmethod
+    async def send_verification_emails(cls, email_service: EmailService, users: List[User],
+                                       previous: Optional[asyncio.Task] = None):
+        """
+        Send a batch's verification emails once the ``previous`` batch's are sent, so an import
+        holds one SMTP session at a time; a failure is logged and does not stop later batches.
+        """
+        if previous is not None:
+            await asyncio.wait({previous})
+        try:
+            await email_service.send_verification_emails(users)
+        except Exception as e:
+            logger.error("Verification emails to %d imported users failed: %s", len(users), e)
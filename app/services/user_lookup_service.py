@@ -0,0 +1,87 @@
+from builtins import bool, classmethod, dict, enumerate, isinstance, list, property, str, tuple
+from collections import namedtuple
+from functools import lru_cache
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import Enum as SQLAlchemyEnum, Select, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user_model import User
+from app.services.user_service import UserService
+from settings.config import settings
+
+# Every column of the users table, in model order
+USER_COLUMNS = tuple(getattr(User, column.key) for column in User.__table__.columns)
+
+class _Lookup(NamedTuple):
+    query: Select
+    row_type: type
+    decoders: Dict[int, Callable]
+
+@lru_cache(maxsize=None)
+def _lookup(by: str, names: Tuple[str, ...]) -> _Lookup:
+    """The query, row type and value decoders for looking a user up ``by`` a column, reading ``names``."""
+    columns = [User.__table__.columns[name] for name in names]
+    row_type = namedtuple("UserRow", names)
+    # Read like a SQLAlchemy Row, so callers can take either kind of result
+    row_type._mapping = property(row_type._asdict)
+    # asyncpg returns enum columns as the stored name; map them back to the model's enums
+    decoders = {
+        index: column.type.enum_class.__getitem__
+        for index, column in enumerate(columns)
+        if isinstance(column.type, SQLAlchemyEnum) and column.type.enum_class is not None
+    }
+    query = select(*columns).where(User.__table__.columns[by] == bindparam("value"))
+    return _Lookup(query, row_type, decoders)
+
+class UserLookupService:
+    """
+    Hot single-user lookups by id or email, returning read-only rows.
+
+    With ``db_fast_path_lookups`` on PostgreSQL through asyncpg, the SQL of each lookup
+    is compiled once from the model and run with ``fetchrow`` on the session's pooled
+    connection, where asyncpg keeps it as a prepared statement, skipping SQLAlchemy's
+    statement construction, cache lookup and result processing. Rows are plain named
+    tuples. Replica routing follows UserService; statement events do not fire and the
+    session is not autoflushed. Otherwise, and in pgbouncer mode where statements
+    cannot stay prepared, the lookups go through UserService and return Rows.
+    """
+    _sql: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+
+    @classmethod
+    def enabled(cls, session: AsyncSession) -> bool:
+        return (settings.db_fast_path_lookups and not settings.db_pgbouncer_mode
+                and session.bind.dialect.driver == "asyncpg")
+
+    @classmethod
+    async def _fetch(cls, session: AsyncSession, by: str, value, replica: bool, columns: Sequence):
+        key = (by, tuple(column.key for column in columns))
+        lookup = _lookup(*key)
+        # Passing the SELECT keeps a primary read from counting as a write for replica routing
+        connection = await session.connection(bind_arguments={"clause": lookup.query, "replica": replica})
+        if key not in cls._sql:
+            cls._sql[key] = str(lookup.query.compile(dialect=connection.dialect))
+        raw = await connection.get_raw_connection()
+        record = await raw.driver_connection.fetchrow(cls._sql[key], value)
+        if record is None:
+            return None
+        values = list(record.values())
+        for index, decode in lookup.decoders.items():
+            if values[index] is not None:
+                values[index] = decode(values[index])
+        return lookup.row_type(*values)
+
+    @classmethod
+    async def get_by_id(cls, session: AsyncSession, user_id: UUID, replica: bool = True,
+                        columns: Sequence = USER_COLUMNS) -> Optional[tuple]:
+        if cls.enabled(session):
+            return await cls._fetch(session, "id", user_id, replica, columns)
+        return await UserService.get_by_id(session, user_id, replica=replica, columns=columns)
+
+    @classmethod
+    async def get_by_email(cls, session: AsyncSession, email: str, replica: bool = True,
+                           columns: Sequence = USER_COLUMNS) -> Optional[tuple]:
+        if cls.enabled(session):
+            return await cls._fetch(session, "email", email, replica, columns)
+        return await UserService.get_by_email(session, email, replica=replica, columns=columns)
@@ -1,19 +1,23 @@
-from builtins import Exception, bool, classmethod, int, str
+from builtins import Exception, ValueError, bool, classmethod, dict, int, str
 from datetime import datetime, timezone
 import secrets
-from typing import Optional, Dict, List
+from typing import AsyncIterator, NamedTuple, Optional, Dict, List, Sequence, Tuple
 from pydantic import ValidationError
-from sqlalchemy import func, null, update, select
+from sqlalchemy import Row, exists, func, null, or_, tuple_, update, select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.dependencies import get_email_service, get_settings
 from app.models.user_model import User
-from app.schemas.user_schemas import UserCreate, UserUpdate
+from app.schemas.user_schemas import UserCreate, UserFilter, UserResponse, UserSort, UserUpdate
+from app.utils.cursor import Cursor
 from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password, verify_password
+from app.utils.security import generate_verification_token, hash_password_async, password_needs_rehash, verify_password_async
 from uuid import UUID
 from app.services.email_service import EmailService
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.revocation_service import RevocationService
+from app.services.user_count_service import UserCountService
 from app.models.user_model import UserRole, User
 from app.utils.validators import validate_user_update_fields
 import logging
@@ -22,12 +26,35 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Just what UserResponse shows, plus created_at for cursors; read paths that only render
+# users select these instead of hydrating ORM instances with hashes, tokens and the rest
+USER_RESPONSE_COLUMNS = tuple(getattr(User, field) for field in UserResponse.model_fields) + (User.created_at,)
+
+# What GET /users/export may hand out: no password hashes, verification tokens or login attempt counters
+USER_EXPORT_COLUMNS = USER_RESPONSE_COLUMNS + (
+    User.updated_at, User.last_login_at, User.email_verified, User.is_locked, User.professional_status_updated_at,
+)
+
+SORT_COLUMNS = {"created_at": User.created_at, "last_login_at": User.last_login_at, "nickname": User.nickname, "email": User.email}
+
+class LoginResult(NamedTuple):
+    """Outcome of a login attempt: the authenticated user row, or whether the account is locked."""
+    user: Optional[Row]
+    locked: bool = False
+
 class UserService:
+    """
+    User operations, each one unit of work on the caller's session.
+
+    Reads do not commit: they run in the session's transaction, which ends when the
+    operation that writes commits once, or when the request's session is closed.
+    """
     @classmethod
-    async def _execute_query(cls, session: AsyncSession, query):
+    async def _execute_query(cls, session: AsyncSession, query, commit: bool = False):
         try:
             result = await session.execute(query)
-            await session.commit()
+            if commit:
+                await session.commit()
             return result
         except IntegrityError as e:
             logger.error(f"Integrity error: {e}")
@@ -39,22 +66,27 @@ class UserService:
             return None
 
     @classmethod
-    async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
-        query = select(User).filter_by(**filters)
+    async def _fetch_user(cls, session: AsyncSession, replica: bool = False, columns: Sequence = (), **filters) -> Optional[User]:
+        query = select(*columns) if columns else select(User)
+        query = query.filter_by(**filters).execution_options(replica=replica)
         result = await cls._execute_query(session, query)
-        return result.scalars().first() if result else None
+        if not result:
+            return None
+        return result.first() if columns else result.scalars().first()
 
+    # Read-only lookups may be served by a read replica; pass replica=False when the row is about to be modified.
+    # With ``columns`` (e.g. USER_RESPONSE_COLUMNS) plain rows of just those columns are returned instead of users.
     @classmethod
-    async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
-        return await cls._fetch_user(session, id=user_id)
+    async def get_by_id(cls, session: AsyncSession, user_id: UUID, replica: bool = True, columns: Sequence = ()) -> Optional[User]:
+        return await cls._fetch_user(session, replica=replica, columns=columns, id=user_id)
 
     @classmethod
     async def get_by_nickname(cls, session: AsyncSession, nickname: str) -> Optional[User]:
         return await cls._fetch_user(session, nickname=nickname)
 
     @classmethod
-    async def get_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
-        return await cls._fetch_user(session, email=email)
+    async def get_by_email(cls, session: AsyncSession, email: str, replica: bool = True, columns: Sequence = ()) -> Optional[User]:
+        return await cls._fetch_user(session, replica=replica, columns=columns, email=email)
 
     @classmethod
     async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
@@ -64,15 +96,14 @@ class UserService:
             if existing_user:
                 logger.error("User with given email already exists.")
                 return None
-            validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
+            validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'), stage="register")
             new_user = User(**validated_data)
             new_nickname = generate_nickname()
             while await cls.get_by_nickname(session, new_nickname):
                 new_nickname = generate_nickname()
             new_user.nickname = new_nickname
             logger.info(f"User Role: {new_user.role}")
-            user_count = await cls.count(session)
-            new_user.role = UserRole.ADMIN if user_count == 0 else UserRole.ANONYMOUS
+            new_user.role = UserRole.ANONYMOUS if await cls.any_users(session) else UserRole.ADMIN
             if new_user.role == UserRole.ADMIN:
                 new_user.email_verified = True
 
@@ -82,6 +113,7 @@ class UserService:
 
             session.add(new_user)
             await session.commit()
+            UserCountService.invalidate()
             return new_user
         except ValidationError as e:
             logger.error(f"Validation error during user creation: {e}")
@@ -102,14 +134,14 @@ class UserService:
         # Prepare and execute the update query
         query = update(User).where(User.id == user_id).values(**validated_data).execution_options(synchronize_session="fetch")
         try:
-            result = await cls._execute_query(session, query)
+            result = await cls._execute_query(session, query, commit=True)
         except IntegrityError as ie:
             # If a unique constraint is violated (e.g., email conflict), let the caller handle it
             raise
         if result is None:
             return None
         # Fetch the updated user and refresh to get latest data
-        updated_user = await cls.get_by_id(session, user_id)
+        updated_user = await cls.get_by_id(session, user_id, replica=False)
         if updated_user:
             await session.refresh(updated_user)
             logger.info(f"User {user_id} updated successfully.")
@@ -118,21 +150,174 @@ class UserService:
             logger.error(f"User {user_id} not found after update attempt.")
             return None
 
+    @classmethod
+    async def update_user(cls, session: AsyncSession, user: User, update_data: Dict[str, str]) -> Optional[User]:
+        """Apply ``update_data`` to an already loaded user and commit, without fetching it again."""
+        try:
+            UserUpdate(**update_data)
+        except ValidationError as e:
+            logger.error(f"Validation error during user {user.id}: {e}")
+            return None
+        validated_data = validate_user_update_fields(update_data)
+        if not validated_data:
+            return None
+        for field, value in validated_data.items():
+            setattr(user, field, value)
+        try:
+            await session.commit()
+        except IntegrityError as e:
+            logger.error(f"Integrity error: {e}")
+            await session.rollback()
+            raise
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            await session.rollback()
+            return None
+        logger.info(f"User {user.id} updated successfully.")
+        return user
+
     @classmethod
     async def delete(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
+        user = await cls.get_by_id(session, user_id, replica=False)
         if not user:
             logger.info(f"User with ID {user_id} not found.")
             return False
         await session.delete(user)
+        await RevocationService.revoke_user(session, user.id, user.email)
         await session.commit()
+        UserCountService.invalidate()
         return True
 
+    @staticmethod
+    def filter_conditions(filters: Optional[UserFilter]) -> list:
+        """WHERE clauses for the set parameters of ``filters``."""
+        if filters is None:
+            return []
+        conditions = []
+        if filters.role is not None:
+            conditions.append(User.role == filters.role)
+        for flag in ("email_verified", "is_locked", "is_professional"):
+            value = getattr(filters, flag)
+            if value is not None:
+                conditions.append(getattr(User, flag) == value)
+        if filters.created_after is not None:
+            conditions.append(User.created_at >= filters.created_after)
+        if filters.created_before is not None:
+            conditions.append(User.created_at < filters.created_before)
+        if filters.last_login_after is not None:
+            conditions.append(User.last_login_at >= filters.last_login_after)
+        if filters.last_login_before is not None:
+            conditions.append(User.last_login_at < filters.last_login_before)
+        if filters.nickname_prefix:
+            conditions.append(User.nickname.startswith(filters.nickname_prefix, autoescape=True))
+        if filters.email_prefix:
+            conditions.append(User.email.startswith(filters.email_prefix, autoescape=True))
+        return conditions
+
+    @staticmethod
+    def sort_order(sort: UserSort = UserSort.CREATED_AT) -> list:
+        """ORDER BY clauses for ``sort``, with the id as tie-breaker so pages are stable."""
+        descending = sort.value.startswith("-")
+        key = sort.value.lstrip("-")
+        column, tie_breaker = SORT_COLUMNS[key], User.id
+        if descending:
+            column, tie_breaker = column.desc(), tie_breaker.desc()
+        if key == "last_login_at":
+            # Users who never logged in come last either way
+            column = column.nulls_last()
+        return [column, tie_breaker]
+
+    @classmethod
+    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10, replica: bool = True,
+                         filters: Optional[UserFilter] = None, sort: UserSort = UserSort.CREATED_AT,
+                         columns: Sequence = ()) -> List[User]:
+        """A page of users, or with ``columns`` a page of rows holding only those columns."""
+        query = select(*columns) if columns else select(User)
+        query = query.where(*cls.filter_conditions(filters)).order_by(*cls.sort_order(sort)) \
+            .offset(skip).limit(limit).execution_options(replica=replica)
+        result = await cls._execute_query(session, query)
+        if not result:
+            return []
+        return result.all() if columns else result.scalars().all()
+
     @classmethod
-    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
-        query = select(User).offset(skip).limit(limit)
+    async def list_users_with_total(cls, session: AsyncSession, skip: int = 0, limit: int = 10,
+                                    method: str = "window", replica: bool = True, filters: Optional[UserFilter] = None,
+                                    sort: UserSort = UserSort.CREATED_AT, columns: Sequence = ()) -> Tuple[List[User], int]:
+        """
+        Return a page of users and the total number of users from a single statement.
+
+        With ``method="window"`` each row carries ``count(*) OVER ()``, which is computed
+        over every row before OFFSET/LIMIT apply, so the whole table is read and sorted.
+        ``method="subquery"`` attaches an uncorrelated ``(SELECT count(*) FROM users)``
+        that the database evaluates once, leaving the page free to use the index. A page
+        past the end has no rows to carry the total; only then is it counted separately.
+        With ``columns`` the page holds rows of those columns rather than users.
+        """
+        conditions = cls.filter_conditions(filters)
+        if method == "window":
+            total = func.count().over()
+        elif method == "subquery":
+            total = select(func.count()).select_from(User).where(*conditions).scalar_subquery()
+        else:
+            raise ValueError(f"Unknown total method '{method}', expected 'window' or 'subquery'")
+        query = select(*(columns or (User,)), total.label("total")).where(*conditions).order_by(*cls.sort_order(sort)) \
+            .offset(skip).limit(limit).execution_options(replica=replica)
         result = await cls._execute_query(session, query)
-        return result.scalars().all() if result else []
+        rows = result.all() if result else []
+        if not rows:
+            return [], await cls.count(session, replica=replica, conditions=conditions)
+        return (rows if columns else [row.User for row in rows]), rows[0].total
+
+    @classmethod
+    async def list_users_after(cls, session: AsyncSession, cursor: Optional[Cursor], limit: int = 10,
+                               replica: bool = True, filters: Optional[UserFilter] = None,
+                               columns: Sequence = ()) -> Tuple[List[User], bool]:
+        """
+        Return a keyset page of users in ``(created_at, id)`` order, and whether more
+        users lie beyond it in the direction of travel.
+
+        The page starts just after ``cursor`` (or before it, for a backwards cursor),
+        found by the ``ix_users_created_at_id`` index, so it costs the same at any depth.
+        With ``columns``, which must include created_at and id, the page holds rows of
+        those columns rather than users.
+        """
+        position = tuple_(User.created_at, User.id)
+        query = (select(*columns) if columns else select(User)).where(*cls.filter_conditions(filters))
+        if cursor is None:
+            query = query.order_by(User.created_at, User.id)
+        elif cursor.backwards:
+            query = query.where(position < tuple_(cursor.created_at, cursor.id)).order_by(User.created_at.desc(), User.id.desc())
+        else:
+            query = query.where(position > tuple_(cursor.created_at, cursor.id)).order_by(User.created_at, User.id)
+        # One extra row tells whether another page follows
+        result = await cls._execute_query(session, query.limit(limit + 1).execution_options(replica=replica))
+        if not result:
+            users = []
+        else:
+            users = list(result.all() if columns else result.scalars().all())
+        has_more = len(users) > limit
+        users = users[:limit]
+        if cursor is not None and cursor.backwards:
+            users.reverse()
+        return users, has_more
+
+    @classmethod
+    async def stream_users(cls, session: AsyncSession, filters: Optional[UserFilter] = None,
+                           batch_size: int = 1000, columns: Sequence = USER_EXPORT_COLUMNS) -> AsyncIterator[List[Row]]:
+        """
+        Yield every user matching ``filters``, in ``(created_at, id)`` order, as lists of
+        at most ``batch_size`` rows of ``columns``.
+
+        The rows come from a server-side cursor, ``batch_size`` at a time, so memory does
+        not grow with the table; the cursor's transaction stays open until the caller
+        stops iterating.
+        """
+        query = select(*columns).where(*cls.filter_conditions(filters)).order_by(User.created_at, User.id) \
+            .execution_options(replica=True, yield_per=batch_size)
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield partition
 
     @classmethod
     async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], get_email_service) -> Optional[User]:
@@ -140,26 +325,66 @@ class UserService:
 
 
     @classmethod
-    async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
-        user = await cls.get_by_email(session, email)
-        if user:
-            if user.email_verified is False:
-                return None
-            if user.is_locked:
-                return None
-            if verify_password(password, user.hashed_password):
-                user.failed_login_attempts = 0
-                user.last_login_at = datetime.now(timezone.utc)
-                session.add(user)
-                await session.commit()
-                return user
-            else:
-                user.failed_login_attempts += 1
-                if user.failed_login_attempts >= settings.max_login_attempts:
-                    user.is_locked = True
-                session.add(user)
-                await session.commit()
-        return None
+    async def authenticate(cls, session: AsyncSession, email: str, password: str) -> LoginResult:
+        """
+        Check credentials and record the attempt in two statements.
+
+        Only the columns needed for authentication are read. The outcome is then written
+        with one atomic UPDATE ... RETURNING, so concurrent failed attempts cannot lose
+        increments of ``failed_login_attempts``.
+        """
+        query = select(
+            User.id, User.email_verified, User.is_locked, User.hashed_password
+        ).where(User.email == email)
+        credentials = (await session.execute(query)).first()
+        # End the read transaction so the connection goes back to the pool while the hash is checked
+        await session.commit()
+        if credentials is None:
+            return LoginResult(None)
+        if credentials.is_locked:
+            return LoginResult(None, locked=True)
+        if credentials.email_verified is False:
+            return LoginResult(None)
+        if await verify_password_async(password, credentials.hashed_password, stage="login"):
+            values = {"failed_login_attempts": 0, "last_login_at": datetime.now(timezone.utc)}
+            if password_needs_rehash(credentials.hashed_password):
+                # Upgrade the stored hash to the current scheme/cost in the same commit
+                values["hashed_password"] = await hash_password_async(password, stage="login")
+            # Still unlocked: a lockout committed since the read above must not be undone by this login
+            query = update(User).where(User.id == credentials.id, User.is_locked.isnot(True)).values(**values).returning(
+                User.id, User.email, User.role
+            ).execution_options(synchronize_session="fetch")
+            result = await cls._execute_query(session, query, commit=True)
+            if result is None:
+                return LoginResult(None)
+            user = result.first()
+            return LoginResult(user, locked=user is None)
+        attempts = func.coalesce(User.failed_login_attempts, 0) + 1
+        query = update(User).where(User.id == credentials.id).values(
+            failed_login_attempts=attempts,
+            is_locked=or_(User.is_locked, attempts >= settings.max_login_attempts),
+        ).returning(User.is_locked).execution_options(synchronize_session="fetch")
+        result = await cls._execute_query(session, query)
+        locked = bool(result and result.scalar())
+        if locked:
+            # This attempt locked the account; end the sessions it already has, in the same commit
+            await RevocationService.revoke_user(session, credentials.id, email)
+        await session.commit()
+        return LoginResult(None, locked=locked)
+
+    @classmethod
+    async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[Row]:
+        """Return the id, email and role of the user if the credentials are valid."""
+        return (await cls.authenticate(session, email, password)).user
+
+    @classmethod
+    async def logout(cls, session: AsyncSession, claims: dict, refresh_token: Optional[str] = None):
+        """Revoke the presented access token and, if given, the refresh tokens of the same login."""
+        if claims.get("jti") and claims.get("exp"):
+            await RevocationService.revoke_token(session, claims["jti"], claims["exp"])
+        if refresh_token:
+            await RefreshTokenService.revoke_family(session, refresh_token)
+        await session.commit()
 
     @classmethod
     async def is_account_locked(cls, session: AsyncSession, email: str) -> bool:
@@ -169,20 +394,23 @@ class UserService:
 
     @classmethod
     async def reset_password(cls, session: AsyncSession, user_id: UUID, new_password: str) -> bool:
-        hashed_password = hash_password(new_password)
-        user = await cls.get_by_id(session, user_id)
+        hashed_password = await hash_password_async(new_password)
+        user = await cls.get_by_id(session, user_id, replica=False)
         if user:
             user.hashed_password = hashed_password
             user.failed_login_attempts = 0  # Resetting failed login attempts
             user.is_locked = False  # Unlocking the user account, if locked
             session.add(user)
+            # Sessions started with the old password must log in again
+            await RefreshTokenService.revoke_user(session, user_id)
+            await RevocationService.revoke_user(session, user_id, user.email)
             await session.commit()
             return True
         return False
 
     @classmethod
     async def verify_email_with_token(cls, session: AsyncSession, user_id: UUID, token: str) -> bool:
-        user = await cls.get_by_id(session, user_id)
+        user = await cls.get_by_id(session, user_id, replica=False)
         if user and user.verification_token == token:
             user.email_verified = True
             user.verification_token = None  # Clear the token once used
@@ -193,21 +421,28 @@ class UserService:
         return False
 
     @classmethod
-    async def count(cls, session: AsyncSession) -> int:
+    async def count(cls, session: AsyncSession, replica: bool = True, conditions: Sequence = ()) -> int:
         """
         Count the number of users in the database.
 
         :param session: The AsyncSession instance for database access.
+        :param replica: Whether a read replica may answer.
+        :param conditions: WHERE clauses, from ``filter_conditions``, limiting which users count.
         :return: The count of users.
         """
-        query = select(func.count()).select_from(User)
+        query = select(func.count()).select_from(User).where(*conditions).execution_options(replica=replica)
         result = await session.execute(query)
         count = result.scalar()
         return count
 
+    @classmethod
+    async def any_users(cls, session: AsyncSession) -> bool:
+        """Whether any user exists; stops at the first row instead of counting them all."""
+        return bool((await session.execute(select(exists().select_from(User)))).scalar())
+
     @classmethod
     async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
+        user = await cls.get_by_id(session, user_id, replica=False)
         if user and user.is_locked:
             user.is_locked = False
             user.failed_login_attempts = 0  # Optionally reset failed login attempts
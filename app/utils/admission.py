@@ -0,0 +1,105 @@
+from builtins import Exception, any, dict, float, int, isinstance, len, max, min, str, sum
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from logging import getLogger
+from typing import Deque, Dict
+
+from app.utils.metrics import metrics
+
+logger = getLogger(__name__)
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Overloaded(Exception):
+    """Raised when a stage rejects work instead of queueing it."""
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"{stage} is overloaded, retry in {retry_after}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounded admission for a fixed-capacity stage shared by several request classes.
+
+    At most ``capacity`` callers run at once. Others wait in a per-class queue, as long
+    as the class stays within its share of ``max_queue_depth`` and gets a slot within
+    ``max_wait`` seconds; otherwise ``Overloaded`` is raised at once. When slots free up
+    while several classes are waiting, they are handed out in proportion to ``shares``.
+    """
+
+    def __init__(self, name: str, capacity: int, max_queue_depth: int, max_wait: float, shares: Dict[str, float]):
+        self.name = name
+        self.capacity = capacity
+        self.max_wait = max_wait
+        total_share = sum(shares.values())
+        self.shares = {stage: share / total_share for stage, share in shares.items()}
+        self.queue_limits = {stage: max(1, math.floor(max_queue_depth * share)) for stage, share in self.shares.items()}
+        self.in_flight = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {stage: deque() for stage in self.shares}
+        self._granted: Dict[str, int] = {stage: 0 for stage in self.shares}
+
+    def queue_depth(self, stage: str) -> int:
+        return len(self._waiters[stage])
+
+    def _record_depth(self, stage: str):
+        metrics.gauge(f"{self.name}_queue_depth", "Callers waiting for a slot", stage=stage).set(self.queue_depth(stage))
+
+    def _record_wait(self, stage: str, waited: float):
+        metrics.histogram(f"{self.name}_queue_wait_seconds", "Time spent waiting for a slot", WAIT_BUCKETS, stage=stage).observe(waited)
+
+    def _reject(self, stage: str):
+        metrics.counter(f"{self.name}_rejected_total", "Callers turned away by admission control", stage=stage).inc()
+        raise Overloaded(self.name, max(1, math.ceil(self.max_wait)))
+
+    async def acquire(self, stage: str):
+        """Wait for a slot for ``stage`` or raise ``Overloaded``."""
+        if self.in_flight < self.capacity and not any(self._waiters.values()):
+            self.in_flight += 1
+            self._record_wait(stage, 0.0)
+            return
+        if self.queue_depth(stage) >= self.queue_limits[stage]:
+            self._reject(stage)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[stage].append(waiter)
+        self._record_depth(stage)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters[stage].remove(waiter)
+            self._record_depth(stage)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(stage)
+            raise
+        self._record_wait(stage, time.monotonic() - started)
+
+    def release(self):
+        """Free a slot, handing it to the waiting class furthest below its share."""
+        waiting = [stage for stage, queue in self._waiters.items() if queue]
+        if not waiting:
+            self.in_flight -= 1
+            # Shares only matter within a backlog; start the next one from a clean slate
+            self._granted = {s: 0 for s in self._granted}
+            return
+        stage = min(waiting, key=lambda s: self._granted[s] / self.shares[s])
+        waiter = self._waiters[stage].popleft()
+        self._granted[stage] += 1
+        self._record_depth(stage)
+        waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, stage: str):
+        await self.acquire(stage)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,48 @@
+from builtins import TypeError, ValueError, bool, len, str
+import base64
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from settings.config import settings
+
+class Cursor(NamedTuple):
+    """A position in a listing ordered by ``(created_at, id)``, and which way to page from it."""
+    created_at: datetime
+    id: uuid.UUID
+    backwards: bool = False
+
+class PageCursors(NamedTuple):
+    """Cursors of the pages after and before the current one, if there are such pages."""
+    next: Optional[str]
+    prev: Optional[str]
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(settings.pagination_cursor_secret.encode(), payload.encode(), hashlib.sha256).digest()[:16])
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Serialize ``cursor`` as an opaque, signed, URL-safe token."""
+    payload = _b64encode(json.dumps(
+        [cursor.created_at.isoformat(), str(cursor.id), cursor.backwards], separators=(",", ":")
+    ).encode())
+    return f"{payload}.{_sign(payload)}"
+
+def decode_cursor(token: str) -> Cursor:
+    """Return the cursor in ``token``; ValueError if it was not issued by this service or is malformed."""
+    payload, _, signature = token.partition(".")
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise ValueError("Invalid cursor")
+    try:
+        created_at, user_id, backwards = json.loads(_b64decode(payload))
+        return Cursor(datetime.fromisoformat(created_at), uuid.UUID(user_id), bool(backwards))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,158 @@
+from builtins import ImportError, KeyError, ValueError, bool, classmethod, int, range, str
+import time
+from abc import ABC, abstractmethod
+from logging import getLogger
+from typing import Dict, Optional, Tuple
+
+import bcrypt
+
+from settings.config import settings
+
+logger = getLogger(__name__)
+
+class PasswordHasher(ABC):
+    """A password hashing scheme, recognised by the prefix of the hashes it produces."""
+    name: str = None
+    prefixes: Tuple[str, ...] = ()
+    default_cost: int = None
+    min_cost: int = None
+    max_cost: int = None
+
+    @abstractmethod
+    def hash(self, password: str, cost: int) -> str:
+        ...
+
+    @abstractmethod
+    def verify(self, password: str, hashed_password: str) -> bool:
+        ...
+
+    @abstractmethod
+    def needs_rehash(self, hashed_password: str, cost: int) -> bool:
+        """True if the hash is weaker than ``cost``; stronger hashes are never downgraded."""
+
+    def identifies(self, hashed_password: str) -> bool:
+        return hashed_password.startswith(self.prefixes)
+
+class BcryptHasher(PasswordHasher):
+    name = "bcrypt"
+    prefixes = ("$2b$", "$2a$", "$2y$")
+    default_cost = 12
+    min_cost = 4
+    max_cost = 16
+
+    def hash(self, password: str, cost: int) -> str:
+        salt = bcrypt.gensalt(rounds=cost)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password: str, cost: int) -> bool:
+        # Layout: $2b$<cost>$<salt+digest>
+        return not hashed_password.startswith("$2b$") or int(hashed_password.split("$")[2]) < cost
+
+class Argon2Hasher(PasswordHasher):
+    """argon2id via the optional ``argon2-cffi`` package; cost is the argon2 time cost."""
+    name = "argon2id"
+    prefixes = ("$argon2id$",)
+    default_cost = 3
+    min_cost = 1
+    max_cost = 10
+
+    def _hasher(self, cost: int):
+        try:
+            from argon2 import PasswordHasher as Argon2PasswordHasher
+        except ImportError as e:
+            raise ValueError("argon2id hashing requires the 'argon2-cffi' package") from e
+        return Argon2PasswordHasher(
+            time_cost=cost,
+            memory_cost=settings.argon2_memory_cost,
+            parallelism=settings.argon2_parallelism,
+        )
+
+    def hash(self, password: str, cost: int) -> str:
+        return self._hasher(cost).hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        from argon2.exceptions import VerifyMismatchError
+        try:
+            return self._hasher(self.default_cost).verify(hashed_password, password)
+        except VerifyMismatchError:
+            return False
+
+    def needs_rehash(self, hashed_password: str, cost: int) -> bool:
+        from argon2 import extract_parameters
+        parameters = extract_parameters(hashed_password)
+        return parameters.time_cost < cost or parameters.memory_cost < settings.argon2_memory_cost
+
+HASHERS: Dict[str, PasswordHasher] = {hasher.name: hasher for hasher in (BcryptHasher(), Argon2Hasher())}
+
+def get_hasher(name: str) -> PasswordHasher:
+    """Return the hasher registered under ``name``."""
+    try:
+        return HASHERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown password hashing scheme '{name}'") from None
+
+def identify_hasher(hashed_password: str) -> PasswordHasher:
+    """Return the hasher that produced ``hashed_password``, based on its prefix."""
+    for hasher in HASHERS.values():
+        if hasher.identifies(hashed_password):
+            return hasher
+    raise ValueError("Unrecognised password hash format")
+
+def calibrate_cost(hasher: PasswordHasher, budget_ms: float) -> int:
+    """
+    Find the highest cost factor whose hash time stays within ``budget_ms`` on this machine.
+
+    Costs are tried from ``min_cost`` upwards until one exceeds the budget; the minimum
+    cost is returned even if it is already over budget.
+    """
+    chosen = hasher.min_cost
+    for cost in range(hasher.min_cost, hasher.max_cost + 1):
+        started = time.perf_counter()
+        hasher.hash("calibration-password", cost)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > budget_ms:
+            break
+        chosen = cost
+    return chosen
+
+class HashingPolicy:
+    """The scheme and cost new password hashes are created with."""
+    scheme: str = settings.password_hash_scheme
+    cost: Optional[int] = settings.password_hash_cost or None
+
+    @classmethod
+    def initialize(cls, scheme: Optional[str] = None, cost: Optional[int] = None, budget_ms: Optional[float] = None):
+        """
+        Set the target scheme and cost.
+
+        A configured cost wins. Without one, a time budget calibrates the cost on this
+        host; workers calibrating separately can land on different costs, so the result
+        is logged to be pinned as ``password_hash_cost``.
+        """
+        scheme = scheme or settings.password_hash_scheme
+        hasher = get_hasher(scheme)
+        cost = cost or settings.password_hash_cost or None
+        budget_ms = settings.password_hash_budget_ms if budget_ms is None else budget_ms
+        if budget_ms and cost is None:
+            cost = calibrate_cost(hasher, budget_ms)
+            logger.warning("Calibrated %s cost to %s for a %s ms budget; set PASSWORD_HASH_COST=%s to use it on every worker",
+                           scheme, cost, budget_ms, cost)
+        cls.scheme = scheme
+        cls.cost = cost
+
+    @classmethod
+    def target(cls) -> Tuple[PasswordHasher, int]:
+        """Return the hasher and cost for new hashes."""
+        hasher = get_hasher(cls.scheme)
+        return hasher, cls.cost or hasher.default_cost
+
+    @classmethod
+    def needs_rehash(cls, hashed_password: str) -> bool:
+        """True if ``hashed_password`` was made with another scheme or a lower cost than the target."""
+        hasher, cost = cls.target()
+        if not hasher.identifies(hashed_password):
+            return True
+        return hasher.needs_rehash(hashed_password, cost)
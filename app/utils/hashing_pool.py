@@ -0,0 +1,82 @@
+from builtins import ValueError, classmethod, int, str
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from logging import getLogger
+from typing import Any, Callable, Optional
+
+from app.utils.admission import AdmissionController
+from settings.config import settings
+
+logger = getLogger(__name__)
+
+POOL_KINDS = ("process", "thread", "inline")
+
+class HashingPool:
+    """Runs CPU-bound password hashing outside the event loop."""
+    _executor: Optional[Executor] = None
+    _kind: Optional[str] = None
+    _admission: Optional[AdmissionController] = None
+
+    @classmethod
+    def initialize(cls, kind: Optional[str] = None, size: Optional[int] = None):
+        """Start the executor. Defaults come from Settings."""
+        if cls._kind is not None:
+            return
+        kind = kind or settings.password_hash_pool
+        size = size or settings.password_hash_pool_size
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Unknown password hash pool '{kind}', expected one of {POOL_KINDS}")
+        if kind == "process":
+            # spawn keeps forked copies of the event loop and DB connections out of the workers
+            cls._executor = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+        elif kind == "thread":
+            # bcrypt releases the GIL while hashing, so threads scale across cores too
+            cls._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="password-hash")
+        cls._kind = kind
+        cls._admission = cls._build_admission(size)
+        logger.info("Password hashing pool started: %s x%s", kind, size)
+
+    @classmethod
+    def shutdown(cls):
+        """Stop the executor and wait for in-flight hashes to finish; this blocks, so async callers run it in a thread."""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True)
+        cls._executor = None
+        cls._kind = None
+        cls._admission = None
+
+    @classmethod
+    def _build_admission(cls, capacity: int) -> AdmissionController:
+        login_share = settings.hash_queue_login_share
+        return AdmissionController(
+            "password_hash",
+            capacity=capacity,
+            max_queue_depth=settings.hash_queue_max_depth,
+            max_wait=settings.hash_queue_max_wait_ms / 1000,
+            shares={"login": login_share, "register": 1 - login_share},
+        )
+
+    @classmethod
+    def admission(cls) -> AdmissionController:
+        """The admission controller guarding the pool, shared by login and registration."""
+        if cls._admission is None:
+            cls._admission = cls._build_admission(settings.password_hash_pool_size)
+        return cls._admission
+
+    @classmethod
+    async def run(cls, func: Callable[..., Any], *args, stage: Optional[str] = None) -> Any:
+        """
+        Run ``func(*args)`` on the pool and await the result.
+
+        With a ``stage`` ('login' or 'register') the call first passes admission control
+        and may raise ``Overloaded``. Before ``initialize()`` (e.g. in tests) the loop's
+        default thread pool is used.
+        """
+        if stage is not None:
+            async with cls.admission().slot(stage):
+                return await cls.run(func, *args)
+        if cls._kind == "inline":
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls._executor, func, *args)
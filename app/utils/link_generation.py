@@ -1,19 +1,25 @@
 from builtins import dict, int, max, str
-from typing import List, Callable
-from urllib.parse import urlencode
+from typing import List, Callable, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
 from uuid import UUID
 
 from fastapi import Request
 from app.schemas.link_schema import Link
 from app.schemas.pagination_schema import PaginationLink
+from app.utils.cursor import PageCursors
 
 # Utility function to create a link
 def create_link(rel: str, href: str, method: str = "GET", action: str = None) -> Link:
     return Link(rel=rel, href=href, method=method, action=action)
 
-def create_pagination_link(rel: str, base_url: str, params: dict) -> PaginationLink:
+def create_pagination_link(rel: str, base_url: str, params: dict, carried: Sequence[Tuple[str, str]] = ()) -> PaginationLink:
     # Ensure parameters are added in a specific order
-    query_string = f"skip={params['skip']}&limit={params['limit']}"
+    if 'cursor' in params:
+        query_string = urlencode({'limit': params['limit'], 'cursor': params['cursor']})
+    else:
+        query_string = f"skip={params['skip']}&limit={params['limit']}"
+    if carried:
+        query_string += "&" + urlencode(carried)
     return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
 
 def create_user_links(user_id: UUID, request: Request) -> List[Link]:
@@ -30,19 +36,38 @@ def create_user_links(user_id: UUID, request: Request) -> List[Link]:
         for rel, action, method, action_desc in actions
     ]
 
-def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
-    base_url = str(request.url)
+def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int,
+                              cursors: Optional[PageCursors] = None) -> List[PaginationLink]:
+    """
+    Generate self/first/last/next/prev links for a page of a listing.
+
+    With ``cursors`` the listing is paged by cursor: next and prev carry the opaque
+    cursors, first starts over with an empty cursor, and there is no last link.
+    """
+    base_url, _, query = str(request.url).partition("?")
+    # Filters and sort order carry over to every page
+    carried = [(key, value) for key, value in parse_qsl(query, keep_blank_values=True) if key not in ("skip", "limit", "cursor")]
+    if cursors is not None:
+        links = [
+            PaginationLink(rel="self", href=str(request.url)),
+            create_pagination_link("first", base_url, {'limit': limit, 'cursor': ''}, carried),
+        ]
+        if cursors.next:
+            links.append(create_pagination_link("next", base_url, {'limit': limit, 'cursor': cursors.next}, carried))
+        if cursors.prev:
+            links.append(create_pagination_link("prev", base_url, {'limit': limit, 'cursor': cursors.prev}, carried))
+        return links
     total_pages = (total_items + limit - 1) // limit
     links = [
-        create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}),
-        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit}),
-        create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit})
+        create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}, carried),
+        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit}, carried),
+        create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit}, carried)
     ]
 
     if skip + limit < total_items:
-        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit}))
+        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit}, carried))
 
     if skip > 0:
-        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}))
+        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}, carried))
 
     return links
@@ -0,0 +1,113 @@
+from builtins import dict, float, int, sorted, str
+import bisect
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Dict[str, str]] = None) -> str:
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+class Counter:
+    """A monotonically increasing value."""
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def samples(self, name: str, labels) -> Iterable[str]:
+        yield f"{name}{_format_labels(labels)} {self.value}"
+
+class Gauge:
+    """A value that can go up and down."""
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def samples(self, name: str, labels) -> Iterable[str]:
+        yield f"{name}{_format_labels(labels)} {self.value}"
+
+class Histogram:
+    """Counts observations into cumulative buckets, Prometheus style."""
+    kind = "histogram"
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def samples(self, name: str, labels) -> Iterable[str]:
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            yield f"{name}_bucket{_format_labels(labels, {'le': str(bound)})} {cumulative}"
+        yield f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {self.count}"
+        yield f"{name}_count{_format_labels(labels)} {self.count}"
+        yield f"{name}_sum{_format_labels(labels)} {self.sum}"
+
+class MetricsRegistry:
+    """Process-local registry of named, labelled metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Dict[Tuple[Tuple[str, str], ...], object]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, factory, name: str, help_text: str, labels: Dict[str, str]):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            family = self._metrics.setdefault(name, {})
+            if key not in family:
+                family[key] = factory()
+                self._help.setdefault(name, help_text)
+            return family[key]
+
+    def counter(self, name: str, help_text: str = "", **labels) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = "", **labels) -> Gauge:
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._get(lambda: Histogram(buckets), name, help_text, labels)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            families = {name: dict(family) for name, family in self._metrics.items()}
+        for name in sorted(families):
+            family = families[name]
+            kind = next(iter(family.values())).kind
+            if self._help.get(name):
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in family.items():
+                lines.extend(metric.samples(name, labels))
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
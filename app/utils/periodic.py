@@ -0,0 +1,37 @@
+from builtins import Exception, float, str
+import asyncio
+from logging import getLogger
+from typing import Awaitable, Callable, Optional
+
+logger = getLogger(__name__)
+
+class PeriodicTask:
+    """Runs an async callable every ``interval`` seconds in the background until stopped."""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=self.name)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.func()
+            except Exception as e:
+                # Keep the loop alive; the next run may succeed
+                logger.error("Periodic task %s failed: %s", self.name, e)
@@ -0,0 +1,108 @@
+from builtins import ValueError, classmethod, dict, float, int, len, max, str
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.utils.metrics import metrics
+from settings.config import settings
+
+WINDOWS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Parse a rate such as '10/minute' into (limit, window in seconds)."""
+    try:
+        limit, period = rate.split("/")
+        return int(limit), WINDOWS[period.strip()]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate '{rate}', expected '<count>/<second|minute|hour|day>'") from None
+
+class RateLimitBackend(ABC):
+    """Counter storage for the rate limiter. Implement ``hit`` to share limits across workers."""
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: int) -> float:
+        """Count one request for ``key``; return 0 if allowed, else seconds until it would be."""
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process sliding-window counters kept in an LRU capped at ``max_keys`` entries.
+
+    Each key stores the counts of the current and previous fixed windows; the sliding
+    count weights the previous window by how much of it still overlaps. Memory use is
+    bounded; when full the least recently seen key is forgotten.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._counters)
+
+    async def hit(self, key: str, limit: int, window: int) -> float:
+        now = time.monotonic()
+        window_start = now - now % window
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = [window_start, 0, 0]
+            self._counters[key] = counter
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+        started, current, previous = counter
+        if window_start != started:
+            # Roll over; anything older than one window no longer counts
+            previous = current if window_start - started == window else 0
+            current = 0
+            counter[:] = [window_start, current, previous]
+        overlap = 1 - (now - window_start) / window
+        if previous * overlap + current >= limit:
+            return max(window_start + window - now, 0.001)
+        counter[1] = current + 1
+        return 0.0
+
+class RateLimiter:
+    """Applies the per-route limits from ``Settings.rate_limits`` through a pluggable backend."""
+    _backend: Optional[RateLimitBackend] = None
+    _rules: Optional[Dict[str, Tuple[int, int]]] = None
+
+    @classmethod
+    def configure(cls, backend: Optional[RateLimitBackend] = None, rules: Optional[Dict[str, str]] = None):
+        """Swap the backend (e.g. for a shared store) and/or the rules; None keeps the defaults."""
+        cls._backend = backend
+        cls._rules = {name: parse_rate(rate) for name, rate in rules.items()} if rules is not None else None
+
+    @classmethod
+    def backend(cls) -> RateLimitBackend:
+        if cls._backend is None:
+            cls._backend = MemoryRateLimitBackend(settings.rate_limit_max_keys)
+        return cls._backend
+
+    @classmethod
+    def rules(cls) -> Dict[str, Tuple[int, int]]:
+        if cls._rules is None:
+            cls._rules = {name: parse_rate(rate) for name, rate in settings.rate_limits.items()}
+        return cls._rules
+
+    @classmethod
+    async def check(cls, scope: str, **identities: Optional[str]) -> float:
+        """
+        Count a request to ``scope`` against each identity that has a rule ``'<scope>:<identity>'``.
+
+        Returns 0 if the request is allowed, otherwise the Retry-After delay in seconds.
+        """
+        if not settings.rate_limit_enabled:
+            return 0.0
+        retry_after = 0.0
+        for identity, value in identities.items():
+            rule = cls.rules().get(f"{scope}:{identity}")
+            if rule is None or value is None:
+                continue
+            limit, window = rule
+            delay = await cls.backend().hit(f"{scope}:{identity}:{value}", limit, window)
+            if delay:
+                metrics.counter("rate_limited_total", "Requests rejected by rate limiting", scope=scope, identity=identity).inc()
+                retry_after = max(retry_after, delay)
+        return retry_after
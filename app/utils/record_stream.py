@@ -0,0 +1,133 @@
+from builtins import UnicodeDecodeError, ValueError, bytes, dict, int, isinstance, len, next, str, zip
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Optional, Sequence, Tuple, Union
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+RECORD_FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+# Longest line a record may take; the rest of a longer one is discarded as it arrives
+MAX_LINE_BYTES = 64 * 1024
+
+def _decode(line: bytes) -> Union[str, ValueError]:
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError:
+        return ValueError("Invalid UTF-8")
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line: int = MAX_LINE_BYTES) -> AsyncIterator[Union[str, ValueError]]:
+    """
+    Split a byte stream into decoded lines without holding more than one partial line.
+
+    A line longer than ``max_line`` bytes, or one that is not valid UTF-8, yields ValueError
+    in its place.
+    """
+    too_long = f"Line longer than {max_line} bytes"
+    pending, overlong = b"", False
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if overlong or len(line) > max_line:
+                overlong = False
+                yield ValueError(too_long)
+            else:
+                yield _decode(line.rstrip(b"\r"))
+        if len(pending) > max_line:
+            pending, overlong = b"", True
+    if overlong or len(pending) > max_line:
+        yield ValueError(too_long)
+    elif pending:
+        yield _decode(pending)
+
+async def parse_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, dict]]:
+    """
+    Yield ``(line number, record)`` for each record in a CSV or NDJSON byte stream.
+
+    CSV needs a header row; empty cells are left out of the record. Each record is one
+    line, so quoted CSV values cannot contain line breaks. A line that does not parse, is
+    not UTF-8 or is longer than MAX_LINE_BYTES yields ValueError in place of the record,
+    and parsing carries on with the next line.
+    """
+    header = None
+    number = 0
+    async for line in iter_lines(chunks):
+        number += 1
+        if isinstance(line, ValueError):
+            yield number, line
+            continue
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Expected a JSON object")
+            except ValueError as e:
+                record = ValueError(f"Invalid JSON: {e}")
+            yield number, record
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield number, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield number, {name: value for name, value in zip(header, values) if value != ""}
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+# Leading characters that make spreadsheet applications read a cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def _cell(value: Any) -> Any:
+    value = "" if value is None else _plain(value)
+    # A leading quote makes spreadsheets show the value as text instead of evaluating it
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def format_records(rows: Sequence, fmt: str, header: Optional[Sequence[str]] = None) -> str:
+    """
+    Render result rows as NDJSON lines or CSV lines, keyed by column name; CSV output
+    starts with ``header`` when one is given, and text cells that a spreadsheet would
+    evaluate as a formula are prefixed with a quote.
+    """
+    if fmt == "ndjson":
+        return "".join(json.dumps({key: _plain(value) for key, value in row._mapping.items()}) + "\n" for row in rows)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow(header)
+    writer.writerows([[_cell(value) for value in row] for row in rows])
+    return out.getvalue()
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse whose body is produced while the request body is still being read.
+
+    StreamingResponse watches for the client going away by reading the same receive
+    channel the request body arrives on, which would swallow the rest of the body. This
+    one does not; a client that disconnects mid-upload ends ``request.stream()`` with
+    ClientDisconnect instead. Clients must read the response while they send, or both
+    sides stall once the socket buffers fill.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
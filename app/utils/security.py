@@ -1,19 +1,24 @@
 # app/security.py
 from builtins import Exception, ValueError, bool, int, str
 import secrets
-import bcrypt
 from logging import getLogger
+from typing import Optional
+from app.utils.hashers import HashingPolicy, get_hasher, identify_hasher
+from app.utils.hashing_pool import HashingPool
 
 # Set up logging
 logger = getLogger(__name__)
 
-def hash_password(password: str, rounds: int = 12) -> str:
+def hash_password(password: str, rounds: Optional[int] = None, scheme: Optional[str] = None) -> str:
     """
-    Hashes a password using bcrypt with a specified cost factor.
+    Hashes a password with the configured hashing scheme (bcrypt unless changed).
     
     Args:
         password (str): The plain text password to hash.
         rounds (int): The cost factor that determines the computational cost of hashing.
+            Defaults to the cost chosen by HashingPolicy.
+        scheme (str): The hashing scheme to use, e.g. 'bcrypt' or 'argon2id'.
+            Defaults to the scheme chosen by HashingPolicy.
 
     Returns:
         str: The hashed password.
@@ -22,9 +27,12 @@ def hash_password(password: str, rounds: int = 12) -> str:
         ValueError: If hashing the password fails.
     """
     try:
-        salt = bcrypt.gensalt(rounds=rounds)
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed_password.decode('utf-8')
+        if scheme is None:
+            hasher, cost = HashingPolicy.target()
+        else:
+            hasher = get_hasher(scheme)
+            cost = hasher.default_cost
+        return hasher.hash(password, rounds or cost)
     except Exception as e:
         logger.error("Failed to hash password: %s", e)
         raise ValueError("Failed to hash password") from e
@@ -35,7 +43,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     Args:
         plain_password (str): The plain text password to verify.
-        hashed_password (str): The bcrypt hashed password.
+        hashed_password (str): The hashed password; its prefix selects the hashing scheme.
 
     Returns:
         bool: True if the password is correct, False otherwise.
@@ -44,10 +52,29 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         ValueError: If the hashed password format is incorrect or the function fails to verify.
     """
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return identify_hasher(hashed_password).verify(plain_password, hashed_password)
     except Exception as e:
         logger.error("Error verifying password: %s", e)
         raise ValueError("Authentication process encountered an unexpected error") from e
 
+async def hash_password_async(password: str, rounds: Optional[int] = None, stage: Optional[str] = None) -> str:
+    """
+    Hash a password on the hashing pool without blocking the event loop.
+
+    Pass ``stage`` ('login' or 'register') to go through admission control; raises
+    ``Overloaded`` when the hashing queue is full.
+    """
+    # Resolve the policy here: pool processes do not share this process's calibration
+    hasher, cost = HashingPolicy.target()
+    return await HashingPool.run(hash_password, password, rounds or cost, hasher.name, stage=stage)
+
+async def verify_password_async(plain_password: str, hashed_password: str, stage: Optional[str] = None) -> bool:
+    """Verify a password on the hashing pool without blocking the event loop."""
+    return await HashingPool.run(verify_password, plain_password, hashed_password, stage=stage)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if a stored hash should be upgraded to the current scheme and cost."""
+    return HashingPolicy.needs_rehash(hashed_password)
+
 def generate_verification_token():
     return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
\ No newline at end of file
@@ -1,8 +1,9 @@
 # smtp_client.py
-from builtins import Exception, int, str
+from builtins import Exception, int, list, str
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Iterable, List, Tuple
 from settings.config import settings
 import logging
 
@@ -13,19 +14,42 @@ class SMTPClient:
         self.username = username
         self.password = password
 
+    def _message(self, subject: str, html_content: str, recipient: str) -> str:
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = self.username
+        message['To'] = recipient
+        message.attach(MIMEText(html_content, 'html'))
+        return message.as_string()
+
     def send_email(self, subject: str, html_content: str, recipient: str):
         try:
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = self.username
-            message['To'] = recipient
-            message.attach(MIMEText(html_content, 'html'))
-
             with smtplib.SMTP(self.server, self.port) as server:
                 server.starttls()  # Use TLS
                 server.login(self.username, self.password)
-                server.sendmail(self.username, recipient, message.as_string())
+                server.sendmail(self.username, recipient, self._message(subject, html_content, recipient))
             logging.info(f"Email sent to {recipient}")
         except Exception as e:
             logging.error(f"Failed to send email: {str(e)}")
             raise
+
+    def send_emails(self, messages: Iterable[Tuple[str, str, str]]) -> List[str]:
+        """
+        Send ``(subject, html_content, recipient)`` messages over one connection and return
+        the recipients that failed. A refused message does not stop the rest; failing to
+        connect, or losing the connection, raises. Blocking, so async callers run it in a thread.
+        """
+        failed = []
+        with smtplib.SMTP(self.server, self.port) as server:
+            server.starttls()
+            server.login(self.username, self.password)
+            for subject, html_content, recipient in messages:
+                try:
+                    server.sendmail(self.username, recipient, self._message(subject, html_content, recipient))
+                    logging.info(f"Email sent to {recipient}")
+                except smtplib.SMTPServerDisconnected:
+                    raise
+                except Exception as e:
+                    logging.error(f"Failed to send email to {recipient}: {str(e)}")
+                    failed.append(recipient)
+        return failed
@@ -0,0 +1,77 @@
+from builtins import bool, dict, float, int, isinstance, len, str
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.utils.metrics import metrics
+from settings.config import settings
+
+class TokenCache:
+    """
+    Bounded LRU of verified token claims, keyed by a SHA-256 digest of the token.
+
+    An entry lives until the token's ``exp`` claim; tokens without one are never cached.
+    The cache only replaces signature verification: callers still apply their own
+    revocation checks to the claims they get back, and can drop entries early with
+    ``discard_where``.
+    """
+
+    def __init__(self, max_entries: int, name: str = "token_cache"):
+        self.max_entries = max_entries
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return the cached claims for ``token``, or None on a miss or an expired entry."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                metrics.counter(f"{self.name}_misses_total", "Token verifications not served from cache").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        metrics.counter(f"{self.name}_hits_total", "Token verifications served from cache").inc()
+        return entry[1]
+
+    def put(self, token: str, claims: dict):
+        """Cache verified ``claims`` until their ``exp``."""
+        expires_at = claims.get("exp")
+        if self.max_entries <= 0 or not isinstance(expires_at, (int, float)) or isinstance(expires_at, bool):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_where(self, predicate: Callable[[dict], bool]) -> int:
+        """Drop every entry whose claims match ``predicate``, e.g. on revocation; returns the count."""
+        with self._lock:
+            keys = [key for key, (_, claims) in self._entries.items() if predicate(claims)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache(settings.token_cache_max_entries)
@@ -0,0 +1,20 @@
+import uuid
+import pytest
+from sqlalchemy import insert
+from app.models.user_model import User, UserRole
+from app.services.user_service import UserService
+
+async def _grow_table(session, size: int, **columns):
+    """Insert users until the table holds ``size``; ``columns`` are extra values for every new row."""
+    rows = [
+        {"id": uuid.uuid4(), "nickname": f"bench-{uuid.uuid4().hex[:12]}", "email": f"{uuid.uuid4().hex}@example.com",
+         "role": UserRole.AUTHENTICATED, "hashed_password": "x", "email_verified": True, **columns}
+        for _ in range(size - await UserService.count(session))
+    ]
+    for start in range(0, len(rows), 5_000):
+        await session.execute(insert(User), rows[start:start + 5_000])
+    await session.commit()
+
+@pytest.fixture
+def grow_table():
+    return _grow_table
@@ -0,0 +1,50 @@
+"""
+Throughput of bcrypt hashing run inline on the event loop versus on the thread and process pools.
+
+Run with: pytest tests/benchmarks/test_password_hashing_benchmark.py -m slow -s --no-cov
+"""
+import asyncio
+import time
+import pytest
+from app.utils.hashing_pool import HashingPool
+from app.utils.security import hash_password_async
+
+HASHES = 16
+ROUNDS = 10
+POOL_SIZE = 4
+
+async def measure(kind: str):
+    HashingPool.shutdown()
+    HashingPool.initialize(kind, POOL_SIZE)
+    # Warm up so process start-up is not counted
+    await asyncio.gather(*(hash_password_async("warmup", 4) for _ in range(POOL_SIZE)))
+
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.005)
+
+    tick_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    hashes = await asyncio.gather(*(hash_password_async(f"password-{i}", ROUNDS) for i in range(HASHES)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick_task
+    HashingPool.shutdown()
+    assert len(hashes) == HASHES
+    return HASHES / elapsed, max_lag
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_password_hashing_pool_throughput():
+    results = {kind: await measure(kind) for kind in ("inline", "thread", "process")}
+    for kind, (throughput, max_lag) in results.items():
+        print(f"{kind:>8}: {throughput:8.1f} hashes/s, max event loop lag {max_lag * 1000:7.1f} ms")
+    # Off-loop pools must keep the loop responsive while hashing
+    assert results["thread"][1] < results["inline"][1]
+    assert results["process"][1] < results["inline"][1]
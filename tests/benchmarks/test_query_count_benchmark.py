@@ -0,0 +1,73 @@
+"""
+SQL statements and commits per endpoint, with one commit per unit of work versus a commit after every query.
+
+Run with: pytest tests/benchmarks/test_query_count_benchmark.py -m slow -s --no-cov
+"""
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from app.dependencies import get_email_service
+from app.main import app
+from app.services.user_service import UserService
+
+class NoEmailService:
+    async def send_verification_email(self, user):
+        pass
+
+@contextmanager
+def count_statements(session):
+    counts = {"statements": 0, "commits": 0}
+    engine = session.bind.sync_engine
+
+    def on_execute(*args):
+        counts["statements"] += 1
+
+    def on_commit(conn):
+        counts["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        yield counts
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+
+async def commit_every_query(session, query, commit: bool = False):
+    # The previous behaviour of UserService._execute_query
+    result = await session.execute(query)
+    await session.commit()
+    return result
+
+async def measure(client, db_session, token, user_id, run: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    requests = {
+        "POST /register/": lambda: client.post("/register/", json={"email": f"bench{run}@example.com", "password": "AnotherPassword123!", "role": "AUTHENTICATED"}),
+        "GET /users/": lambda: client.get("/users/?skip=0&limit=10", headers=headers),
+        "GET /users/{id}": lambda: client.get(f"/users/{user_id}", headers=headers),
+        "PUT /users/{id}": lambda: client.put(f"/users/{user_id}", json={"first_name": f"Bench{run}"}, headers=headers),
+    }
+    results = {}
+    for name, send in requests.items():
+        with count_statements(db_session) as counts:
+            response = await send()
+        assert response.status_code == 200, (name, response.text)
+        results[name] = counts
+    return results
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_statements_per_endpoint(async_client, db_session, admin_user, admin_token, monkeypatch):
+    # Count only database work, not SMTP
+    app.dependency_overrides[get_email_service] = NoEmailService
+    unit_of_work = await measure(async_client, db_session, admin_token, admin_user.id, 1)
+    monkeypatch.setattr(UserService, "_execute_query", classmethod(lambda cls, *args, **kwargs: commit_every_query(*args, **kwargs)))
+    per_query = await measure(async_client, db_session, admin_token, admin_user.id, 2)
+    print(f"\n{'endpoint':<18}{'commit per query':>22}{'unit of work':>22}")
+    for name in unit_of_work:
+        before, after = per_query[name], unit_of_work[name]
+        print(f"{name:<18}{before['statements']:>12} sql {before['commits']:>3} tx"
+              f"{after['statements']:>12} sql {after['commits']:>3} tx")
+    assert unit_of_work["GET /users/"]["commits"] == 0
+    assert unit_of_work["POST /register/"]["commits"] == 1
+    assert unit_of_work["POST /register/"]["commits"] < per_query["POST /register/"]["commits"]
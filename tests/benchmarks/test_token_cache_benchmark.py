@@ -0,0 +1,33 @@
+"""
+get_current_user throughput with and without the verified-token cache.
+
+Run with: pytest tests/benchmarks/test_token_cache_benchmark.py -m slow -s --no-cov
+"""
+import time
+from datetime import timedelta
+import pytest
+import app.dependencies as deps
+from app.services.jwt_service import create_access_token
+from app.utils.token_cache import TokenCache
+
+CALLS = 20000
+
+async def measure(token: str) -> float:
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        await deps.get_current_user(token=token)
+    return CALLS / (time.perf_counter() - started)
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_get_current_user_with_and_without_cache(monkeypatch):
+    token = create_access_token(data={"sub": "user@example.com", "role": "ADMIN"}, expires_delta=timedelta(minutes=5))
+    monkeypatch.setattr(deps, "token_cache", TokenCache(max_entries=0))
+    uncached = await measure(token)
+    cache = TokenCache(max_entries=1000)
+    monkeypatch.setattr(deps, "token_cache", cache)
+    cached = await measure(token)
+    print(f"\nwithout cache: {uncached:10.0f} calls/s")
+    print(f"   with cache: {cached:10.0f} calls/s ({cache.hits} hits, {cache.misses} misses)")
+    assert cache.misses == 1
+    assert cached > uncached
@@ -0,0 +1,34 @@
+"""
+Peak memory and throughput of GET /users/export's stream as the users table grows; the
+peak should stay flat because rows are fetched from a server-side cursor in batches.
+
+Run with: pytest tests/benchmarks/test_user_export_benchmark.py -m slow -s --no-cov
+"""
+import time
+import tracemalloc
+import pytest
+from app.schemas.user_schemas import UserExportFormat
+from app.services.user_export_service import UserExportService
+
+TABLE_SIZES = (10_000, 100_000)
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_export_memory_stays_flat(db_session, grow_table):
+    print(f"\n{'users':>8}{'format':>8}{'rows/s':>10}{'peak KiB':>10}")
+    peaks = []
+    for size in TABLE_SIZES:
+        await grow_table(db_session, size, bio="b" * 300)
+        for fmt in UserExportFormat:
+            tracemalloc.start()
+            started, lines = time.perf_counter(), 0
+            async for chunk in UserExportService.export(fmt):
+                lines += chunk.count("\n")
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert lines == size + (fmt == UserExportFormat.CSV)
+            peaks.append(peak)
+            print(f"{size:>8}{fmt.value:>8}{size / elapsed:>10.0f}{peak / 1024:>10.0f}")
+    # Ten times the users must not mean ten times the memory
+    assert max(peaks) < 2 * min(peaks)
@@ -0,0 +1,44 @@
+"""
+Latency of a GET /users/ page fetched as count() plus list_users() versus one statement carrying the total,
+as count(*) OVER () or as a scalar count subquery.
+
+Run with: pytest tests/benchmarks/test_user_list_query_benchmark.py -m slow -s --no-cov
+"""
+import time
+import pytest
+from app.services.user_service import UserService
+
+TABLE_SIZES = (1_000, 10_000, 50_000)
+ROUNDS = 20
+PAGE = 10
+
+async def two_queries(session, skip: int):
+    total = await UserService.count(session)
+    return await UserService.list_users(session, skip, PAGE), total
+
+async def window(session, skip: int):
+    return await UserService.list_users_with_total(session, skip, PAGE, method="window")
+
+async def subquery(session, skip: int):
+    return await UserService.list_users_with_total(session, skip, PAGE, method="subquery")
+
+async def measure(session, fetch, skip: int) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        users, total = await fetch(session, skip)
+        await session.rollback()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_single_statement_totals_against_separate_count(db_session, grow_table):
+    print(f"\n{'users':>8}{'count + list':>16}{'count(*) OVER ()':>20}{'count subquery':>18}")
+    for size in TABLE_SIZES:
+        await grow_table(db_session, size)
+        skip = size // 2
+        expected = [user.id for user in (await two_queries(db_session, skip))[0]]
+        for fetch in (window, subquery):
+            users, total = await fetch(db_session, skip)
+            assert ([user.id for user in users], total) == (expected, size)
+        timings = [await measure(db_session, fetch, skip) for fetch in (two_queries, window, subquery)]
+        print(f"{size:>8}{timings[0]:>13.2f} ms{timings[1]:>17.2f} ms{timings[2]:>15.2f} ms")
@@ -0,0 +1,57 @@
+"""
+Lookups per second of single users by id and by email through the ORM,
+select(User).filter_by(...), versus the prepared-statement asyncpg fast path.
+
+Run with: pytest tests/benchmarks/test_user_lookup_benchmark.py -m slow -s --no-cov
+"""
+import random
+import time
+import pytest
+from sqlalchemy import select
+from app.models.user_model import User
+from app.services.user_lookup_service import UserLookupService
+from app.services.user_service import USER_RESPONSE_COLUMNS, UserService
+from settings.config import settings
+
+TABLE_SIZE = 5_000
+LOOKUPS = 2_000
+
+async def measure(session, lookup, keys) -> float:
+    started = time.perf_counter()
+    for key in keys:
+        assert await lookup(session, key) is not None
+        # A new request starts with an empty identity map
+        session.expunge_all()
+    return len(keys) / (time.perf_counter() - started)
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_fast_path_against_orm(db_session, grow_table, monkeypatch):
+    if db_session.bind.dialect.driver != "asyncpg":
+        pytest.skip("The fast path needs PostgreSQL through asyncpg")
+    monkeypatch.setattr(settings, "db_fast_path_lookups", True)
+    monkeypatch.setattr(settings, "db_pgbouncer_mode", False)
+    await grow_table(db_session, TABLE_SIZE, bio="b" * 300)
+    users = (await db_session.execute(select(User.id, User.email).limit(LOOKUPS))).all()
+    ids, emails = [user.id for user in users], [user.email for user in users]
+    random.shuffle(ids)
+    random.shuffle(emails)
+    cases = [
+        ("id, full user", ids,
+         lambda s, key: UserService.get_by_id(s, key),
+         lambda s, key: UserLookupService.get_by_id(s, key)),
+        ("id, response columns", ids,
+         lambda s, key: UserService.get_by_id(s, key, columns=USER_RESPONSE_COLUMNS),
+         lambda s, key: UserLookupService.get_by_id(s, key, columns=USER_RESPONSE_COLUMNS)),
+        ("email, id only", emails,
+         lambda s, key: UserService.get_by_email(s, key, columns=(User.id,)),
+         lambda s, key: UserLookupService.get_by_email(s, key, columns=(User.id,))),
+    ]
+    print(f"\n{'lookup':<24}{'ORM/s':>10}{'fast path/s':>14}")
+    for name, keys, orm, fast in cases:
+        # Warm both statement caches before timing
+        await measure(db_session, orm, keys[:50])
+        await measure(db_session, fast, keys[:50])
+        orm_rate, fast_rate = await measure(db_session, orm, keys), await measure(db_session, fast, keys)
+        print(f"{name:<24}{orm_rate:>10.0f}{fast_rate:>14.0f}")
+        assert fast_rate > orm_rate
@@ -0,0 +1,53 @@
+"""
+Rows per second and peak memory of rendering GET /users/ pages from full User instances
+versus from rows of only the columns UserResponse shows.
+
+Run with: pytest tests/benchmarks/test_user_projection_benchmark.py -m slow -s --no-cov
+"""
+import time
+import tracemalloc
+import pytest
+from app.schemas.user_schemas import UserResponse
+from app.services.user_service import USER_RESPONSE_COLUMNS, UserService
+
+TABLE_SIZE = 5_000
+PAGE_SIZES = (10, 100, 1_000)
+ROUNDS = 20
+# Rows about as wide as real users, so the ORM's per-column work shows
+ROW_COLUMNS = {"hashed_password": "$2b$12$" + "x" * 53, "email_verified": False, "verification_token": "v" * 32,
+               "bio": "b" * 500, "first_name": "Bench", "last_name": "User"}
+
+async def render(session, limit: int, columns=()):
+    users = await UserService.list_users(session, 0, limit, columns=columns)
+    if columns:
+        # As the routes do: rows of stored users are not validated again before FastAPI serializes them
+        return [UserResponse.model_construct(**user._mapping) for user in users]
+    return [UserResponse.model_validate(user) for user in users]
+
+async def measure(session, limit: int, columns=()):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await render(session, limit, columns)
+        # A new request starts with an empty identity map
+        session.expunge_all()
+    rows_per_second = limit * ROUNDS / (time.perf_counter() - started)
+    tracemalloc.start()
+    await render(session, limit, columns)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    session.expunge_all()
+    return rows_per_second, peak / 1024
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_projection_against_orm_instances(db_session, grow_table):
+    await grow_table(db_session, TABLE_SIZE, **ROW_COLUMNS)
+    print(f"\n{'page':>6}{'ORM rows/s':>14}{'peak KiB':>11}{'projection rows/s':>21}{'peak KiB':>11}")
+    for limit in PAGE_SIZES:
+        orm = await render(db_session, limit)
+        projected = await render(db_session, limit, USER_RESPONSE_COLUMNS)
+        assert [user.model_dump() for user in projected] == [user.model_dump() for user in orm]
+        db_session.expunge_all()
+        (orm_rate, orm_peak), (rate, peak) = await measure(db_session, limit), await measure(db_session, limit, USER_RESPONSE_COLUMNS)
+        print(f"{limit:>6}{orm_rate:>14.0f}{orm_peak:>11.0f}{rate:>21.0f}{peak:>11.0f}")
+        assert peak < orm_peak and rate > orm_rate
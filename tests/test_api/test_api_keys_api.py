@@ -0,0 +1,59 @@
+import pytest
+from app.services.api_key_service import ApiKeyService, api_key_cache
+from app.models.user_model import UserRole
+
+@pytest.mark.asyncio
+async def test_api_key_authenticates_with_its_role(async_client, admin_token, manager_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/api-keys/", json={"name": "billing", "user_id": str(manager_user.id), "role": "MANAGER"}, headers=headers)
+    assert response.status_code == 201
+    key = response.json()["key"]
+    assert key.startswith("um_")
+
+    key_headers = {"Authorization": f"Bearer {key}"}
+    response = await async_client.get("/users/", headers=key_headers)
+    assert response.status_code == 200
+    # The key acts as a MANAGER, so admin-only routes stay closed
+    response = await async_client.get("/api-keys/", headers=key_headers)
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_api_key_role_cannot_exceed_owner(async_client, admin_token, manager_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/api-keys/", json={"name": "billing", "user_id": str(manager_user.id), "role": "ADMIN"}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_and_revoke_api_key(async_client, admin_token, manager_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    created = (await async_client.post("/api-keys/", json={"name": "billing", "user_id": str(manager_user.id), "role": "MANAGER"}, headers=headers)).json()
+    key_headers = {"Authorization": f"Bearer {created['key']}"}
+    assert (await async_client.get("/users/", headers=key_headers)).status_code == 200
+
+    listed = (await async_client.get("/api-keys/", headers=headers)).json()
+    assert [k["prefix"] for k in listed] == [created["prefix"]]
+    assert "key" not in listed[0]
+
+    response = await async_client.delete(f"/api-keys/{created['id']}", headers=headers)
+    assert response.status_code == 204
+    assert (await async_client.get("/users/", headers=key_headers)).status_code == 401
+
+@pytest.mark.asyncio
+async def test_tampered_api_key_is_rejected(async_client, admin_token, manager_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    key = (await async_client.post("/api-keys/", json={"name": "billing", "user_id": str(manager_user.id), "role": "MANAGER"}, headers=headers)).json()["key"]
+    tampered = key[:-4] + ("AAAA" if not key.endswith("AAAA") else "BBBB")
+    assert await ApiKeyService.verify(tampered) is None
+    assert (await async_client.get("/users/", headers={"Authorization": "Bearer um_malformed"})).status_code == 401
+    api_key_cache.clear()
+
+@pytest.mark.asyncio
+async def test_api_key_role_follows_owner_demotion(async_client, admin_token, manager_user, db_session):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    key = (await async_client.post("/api-keys/", json={"name": "billing", "user_id": str(manager_user.id), "role": "MANAGER"}, headers=headers)).json()["key"]
+    manager_user.role = UserRole.AUTHENTICATED
+    await db_session.commit()
+    api_key_cache.clear()
+    assert (await ApiKeyService.verify(key))["role"] == "AUTHENTICATED"
+    assert (await async_client.get("/users/", headers={"Authorization": f"Bearer {key}"})).status_code == 403
+    api_key_cache.clear()
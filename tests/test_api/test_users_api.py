@@ -1,11 +1,15 @@
 from builtins import str
+import json
+from datetime import datetime, timedelta, timezone
 import pytest
 from httpx import AsyncClient
 from app.main import app
 from app.models.user_model import User, UserRole
+from app.services.email_service import EmailService
 from app.utils.nickname_gen import generate_nickname
 from app.utils.security import hash_password
 from app.services.jwt_service import decode_token  # Import your FastAPI app
+from settings.config import settings
 
 # Example of a test function using the async_client fixture
 @pytest.mark.asyncio
@@ -52,12 +56,13 @@ async def test_update_user_email_access_allowed(async_client, admin_user, admin_
     assert response.json()["email"] == updated_data["email"]
 
 @pytest.mark.asyncio
-async def test_delete_user(async_client, admin_user, admin_token):
+async def test_delete_user(async_client, admin_token, verified_user):
     headers = {"Authorization": f"Bearer {admin_token}"}
-    delete_response = await async_client.delete(f"/users/{admin_user.id}", headers=headers)
+    # Another user: deleting a user revokes their tokens, which would end the admin's own session
+    delete_response = await async_client.delete(f"/users/{verified_user.id}", headers=headers)
     assert delete_response.status_code == 204
     # Verify the user is deleted
-    fetch_response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    fetch_response = await async_client.get(f"/users/{verified_user.id}", headers=headers)
     assert fetch_response.status_code == 404
 
 @pytest.mark.asyncio
@@ -105,6 +110,78 @@ async def test_login_success(async_client, verified_user):
     assert user_id is not None, "Token missing 'sub' claim"
     assert decoded_token["role"] == "AUTHENTICATED", "The user role should be AUTHENTICATED"
 
+@pytest.mark.asyncio
+async def test_refresh_token_rotates(async_client, verified_user):
+    form_data = {
+        "username": verified_user.email,
+        "password": "MySuperPassword$1234"
+    }
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    refresh_token = response.json()["refresh_token"]
+    assert refresh_token
+
+    response = await async_client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    data = response.json()
+    assert decode_token(data["access_token"])["sub"] == str(verified_user.id)
+    assert data["refresh_token"] != refresh_token
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse_revokes_family(async_client, verified_user):
+    form_data = {
+        "username": verified_user.email,
+        "password": "MySuperPassword$1234"
+    }
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    first = response.json()["refresh_token"]
+    second = (await async_client.post("/token/refresh", json={"refresh_token": first})).json()["refresh_token"]
+
+    # Replaying the used token fails and also invalidates its successor
+    response = await async_client.post("/token/refresh", json={"refresh_token": first})
+    assert response.status_code == 401
+    response = await async_client.post("/token/refresh", json={"refresh_token": second})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_refresh_token_invalid(async_client):
+    response = await async_client.post("/token/refresh", json={"refresh_token": "not-a-token"})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_and_refresh_tokens(async_client, verified_user):
+    form_data = {
+        "username": verified_user.email,
+        "password": "MySuperPassword$1234"
+    }
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    tokens = response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = await async_client.post("/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert response.status_code == 204
+    response = await async_client.get("/users/me", headers=headers)
+    assert response.status_code == 401
+    response = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_login_token_subject_is_user_id(async_client, verified_user):
+    form_data = {
+        "username": verified_user.email,
+        "password": "MySuperPassword$1234"
+    }
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    decoded_token = decode_token(response.json()["access_token"])
+    assert decoded_token["sub"] == str(verified_user.id)
+    assert decoded_token["ver"] == 2
+
+    # Changing the email keeps the session valid
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = await async_client.put("/users/me", json={"email": "renamed@example.com"}, headers=headers)
+    assert response.status_code == 200
+    response = await async_client.get("/users/me", headers=headers)
+    assert response.json()["email"] == "renamed@example.com"
+
 @pytest.mark.asyncio
 async def test_login_user_not_found(async_client):
     form_data = {
@@ -192,6 +269,85 @@ async def test_list_users_unauthorized(async_client, user_token):
     )
     assert response.status_code == 403  # Forbidden, as expected for regular user
 
+@pytest.mark.asyncio
+async def test_list_users_reports_exact_total(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["total"] == 51
+    assert response.json()["total_estimated"] is False
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["window", "subquery"])
+async def test_list_users_total_from_page_query(async_client, admin_token, users_with_same_role_50_users, monkeypatch, method):
+    from app.routers import user_routes
+    monkeypatch.setattr(user_routes.settings, "user_list_total_query", method)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    page = (await async_client.get("/users/?skip=45&limit=10", headers=headers)).json()
+    assert (page["total"], page["size"]) == (51, 6)
+    past_end = (await async_client.get("/users/?skip=100&limit=10", headers=headers)).json()
+    assert (past_end["total"], past_end["size"]) == (51, 0)
+
+@pytest.mark.asyncio
+async def test_list_users_filters_and_keeps_filters_in_links(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?role=AUTHENTICATED&email_verified=false&limit=20", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 50
+    assert all(item["role"] == "AUTHENTICATED" for item in data["items"])
+    links = {link["rel"]: link["href"] for link in data["links"]}
+    assert "role=AUTHENTICATED" in links["next"] and "email_verified=false" in links["next"]
+    response = await async_client.get("/users/?role=ADMIN", headers=headers)
+    assert response.json()["total"] == 1
+
+@pytest.mark.asyncio
+async def test_list_users_sorts_by_nickname(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?sort=-nickname&limit=51", headers=headers)
+    nicknames = [item["nickname"] for item in response.json()["items"]]
+    assert nicknames == sorted(nicknames, reverse=True)
+
+@pytest.mark.asyncio
+async def test_list_users_rejects_cursor_with_other_sort(async_client, admin_token):
+    response = await async_client.get("/users/?cursor=&sort=nickname", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_users_by_cursor_visits_every_user_once(async_client, admin_token, db_session):
+    # Explicit, distinct creation times: SQLite stores server_default timestamps as whole-second
+    # strings, which do not compare with a cursor's bound datetime
+    started = datetime.now(timezone.utc) - timedelta(days=1)
+    db_session.add_all([
+        User(nickname=f"cursor_{i:02d}", email=f"cursor_{i:02d}@example.com", hashed_password="x",
+             role=UserRole.AUTHENTICATED, created_at=started + timedelta(seconds=i))
+        for i in range(50)
+    ])
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?limit=20&cursor=", headers=headers)
+    assert response.status_code == 200
+    total = response.json()["total"]
+    seen, pages = [], [response.json()]
+    while True:
+        page = pages[-1]
+        seen += [item["id"] for item in page["items"]]
+        links = {link["rel"]: link["href"] for link in page["links"]}
+        if "next" not in links:
+            break
+        pages.append((await async_client.get(links["next"], headers=headers)).json())
+    assert len(seen) == len(set(seen)) == total
+    # Only the first page pays for the count
+    assert all(page["total"] is None for page in pages[1:])
+    # Walking back from the last page returns the previous page unchanged
+    prev_href = {link["rel"]: link["href"] for link in pages[-1]["links"]}["prev"]
+    previous = (await async_client.get(prev_href, headers=headers)).json()
+    assert [item["id"] for item in previous["items"]] == [item["id"] for item in pages[-2]["items"]]
+
+@pytest.mark.asyncio
+async def test_list_users_rejects_forged_cursor(async_client, admin_token):
+    response = await async_client.get("/users/?cursor=forged.cursor", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
 # New tests for Phase 5: /users/me endpoints
 
 @pytest.mark.asyncio
@@ -295,3 +451,107 @@ async def test_update_profile_picture_replace(async_client, user, user_token):
     assert os.path.exists(os.path.join("profile_pictures", filename2))
     # ...old file removed
     assert not os.path.exists(os.path.join("profile_pictures", filename1))
+
+@pytest.mark.asyncio
+async def test_login_rate_limited_per_email(async_client, verified_user):
+    from app.utils.rate_limit import RateLimiter
+    RateLimiter.configure(rules={"login:email": "2/minute"})
+    form_data = {
+        "username": verified_user.email,
+        "password": "IncorrectPassword123!"
+    }
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    for _ in range(2):
+        response = await async_client.post("/login/", data=urlencode(form_data), headers=headers)
+        assert response.status_code == 401
+    response = await async_client.post("/login/", data=urlencode(form_data), headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    RateLimiter.configure()
+
+@pytest.mark.asyncio
+async def test_login_overloaded_returns_503(async_client, verified_user, monkeypatch):
+    from app.utils.admission import AdmissionController
+    from app.utils.hashing_pool import HashingPool
+    # Every hashing slot is taken and the queue gives up quickly
+    admission = AdmissionController("password_hash", capacity=1, max_queue_depth=2, max_wait=0.05,
+                                    shares={"login": 0.5, "register": 0.5})
+    admission.in_flight = 1
+    monkeypatch.setattr(HashingPool, "_admission", admission)
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+@pytest.mark.asyncio
+async def test_import_users_streams_a_result_per_row(async_client, admin_token, admin_user, monkeypatch):
+    sent = []
+    async def send_verification_emails(self, users):
+        sent.extend(user.email for user in users)
+    monkeypatch.setattr(EmailService, "send_verification_emails", send_verification_emails)
+    body = (
+        "email,password,first_name\n"
+        "new.one@example.com,Secure*1234,New\n"
+        f"{admin_user.email},Secure*1234,\n"
+        "not-an-email,Secure*1234,\n"
+        "new.one@example.com,Secure*1234,\n"
+    )
+    response = await async_client.post("/users/import", content=body, headers={
+        "Authorization": f"Bearer {admin_token}", "Content-Type": "text/csv"})
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result.get("status") for result in results[:-1]] == ["created", "duplicate", "invalid", "duplicate"]
+    assert results[-1] == {"summary": {"created": 1, "duplicate": 2, "invalid": 1}}
+    assert sent == ["new.one@example.com"]
+
+@pytest.mark.asyncio
+async def test_import_users_requires_admin_and_known_format(async_client, admin_token, manager_token):
+    response = await async_client.post("/users/import", content="{}", headers={
+        "Authorization": f"Bearer {manager_token}", "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 403
+    response = await async_client.post("/users/import", content="x", headers={
+        "Authorization": f"Bearer {admin_token}", "Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+@pytest.mark.asyncio
+async def test_export_users_streams_filtered_users_without_secrets(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/export", headers=headers)
+    assert response.status_code == 200
+    users = [json.loads(line) for line in response.text.splitlines()]
+    assert len(users) == 51
+    assert not {"hashed_password", "verification_token", "failed_login_attempts"} & users[0].keys()
+    response = await async_client.get("/users/export?format=csv&role=ADMIN", headers=headers)
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *rows = response.text.splitlines()
+    assert "email" in header.split(",") and len(rows) == 1
+
+@pytest.mark.asyncio
+async def test_bulk_unlock_reports_each_id(async_client, admin_token, locked_user, verified_user):
+    missing = "00000000-0000-0000-0000-000000000001"
+    response = await async_client.post("/users/bulk", json={
+        "action": "unlock", "ids": [str(locked_user.id), str(verified_user.id), missing]},
+        headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["results"]] == ["updated", "unchanged", "not_found"]
+
+@pytest.mark.asyncio
+async def test_bulk_set_role_by_filter_skips_the_caller(async_client, admin_token, admin_user, users_with_same_role_50_users, monkeypatch):
+    monkeypatch.setattr(settings, "user_bulk_max_users", 30)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    body = {"action": "set_role", "role": "MANAGER", "filter": {"is_locked": False}}
+    first = (await async_client.post("/users/bulk", json=body, headers=headers)).json()
+    assert len(first["results"]) == 30 and first["more"] is True
+    second = (await async_client.post("/users/bulk", json=body, headers=headers)).json()
+    assert len(second["results"]) == 20
+    assert str(admin_user.id) not in {result["id"] for result in first["results"] + second["results"]}
+    response = await async_client.post("/users/bulk", json={"action": "delete", "ids": [str(admin_user.id)]}, headers=headers)
+    assert response.json()["results"] == [{"id": str(admin_user.id), "status": "not_allowed"}]
+
+@pytest.mark.asyncio
+async def test_bulk_delete_refuses_an_empty_filter(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/users/bulk", json={"action": "delete", "filter": {}}, headers=headers)
+    assert response.status_code == 422
+    response = await async_client.get(f"/users/{verified_user.id}", headers=headers)
+    assert response.status_code == 200
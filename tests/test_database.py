@@ -1,7 +1,9 @@
 import os
+from collections import OrderedDict
 import pytest
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
-from app.database import Database, Base
+from app.database import Database, Base, LazySession, engine_options
+from settings.config import settings
 from app.models import user_model  # Ensure at least one model is loaded
 
 # Match docker-compose service credentials
@@ -43,3 +45,98 @@ async def test_create_tables_executes():
     Database._engine = create_async_engine(TEST_DB_URL, echo=False, future=True)
     await Database.create_tables()
     assert "users" in Base.metadata.tables
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+        self.sync_session = type("SyncSession", (), {"info": {"connection_hold_seconds": 0.02}})()
+
+    def add(self, obj):
+        self.added = obj
+
+    async def close(self):
+        self.closed = True
+
+@pytest.mark.asyncio
+async def test_lazy_session_is_not_created_until_used():
+    created = []
+    lazy = LazySession(lambda: created.append(FakeSession()) or created[-1])
+    assert not lazy.started
+    await lazy.close()
+    assert created == []
+
+@pytest.mark.asyncio
+async def test_lazy_session_creates_once_and_closes():
+    created = []
+    lazy = LazySession(lambda: created.append(FakeSession()) or created[-1])
+    lazy.add("a")
+    lazy.add("b")
+    assert len(created) == 1 and created[0].added == "b"
+    await lazy.close()
+    assert created[0].closed
+    assert not lazy.started
+
+@pytest.mark.asyncio
+async def test_lazy_session_cannot_be_used_after_close():
+    created = []
+    lazy = LazySession(lambda: created.append(FakeSession()) or created[-1])
+    await lazy.close()
+    with pytest.raises(RuntimeError):
+        lazy.add("a")
+    await lazy.close()
+    assert created == []
+
+def test_engine_options_for_postgres(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_size", 7)
+    monkeypatch.setattr(settings, "db_pgbouncer_mode", False)
+    options = engine_options(TEST_DB_URL)
+    assert options["pool_size"] == 7
+    assert options["connect_args"]["statement_cache_size"] == settings.db_statement_cache_size
+    assert "prepared_statement_name_func" not in options["connect_args"]
+
+def test_engine_options_pgbouncer_mode(monkeypatch):
+    monkeypatch.setattr(settings, "db_pgbouncer_mode", True)
+    connect_args = engine_options(TEST_DB_URL)["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    name_func = connect_args["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+def test_engine_options_sqlite_keeps_default_pool():
+    options = engine_options("sqlite+aiosqlite:///./test.db")
+    assert "pool_size" not in options and "connect_args" not in options
+
+def test_pool_status_reports_configured_pool():
+    Database._engine = None
+    Database._session_factory = None
+    Database.initialize(TEST_DB_URL)
+    status = Database.pool_status()
+    assert status["pool"] == "InstrumentedQueuePool"
+    assert status["size"] == settings.db_pool_size
+    assert status["checked_out"] == 0 and status["overflow"] == 0
+
+@pytest.fixture
+def replicas(monkeypatch):
+    engines = ["replica0", "replica1", "replica2"]
+    monkeypatch.setattr(Database, "_replicas", engines)
+    monkeypatch.setattr(Database, "_healthy", list(engines))
+    monkeypatch.setattr(Database, "_pins", OrderedDict())
+    return engines
+
+def test_next_replica_round_robins_over_healthy_replicas(replicas, monkeypatch):
+    picks = {Database.next_replica() for _ in range(6)}
+    assert picks == set(replicas)
+    monkeypatch.setattr(Database, "_healthy", ["replica1"])
+    assert {Database.next_replica() for _ in range(3)} == {"replica1"}
+    monkeypatch.setattr(Database, "_healthy", [])
+    assert Database.next_replica() is None
+
+def test_writer_is_pinned_to_primary_until_pin_expires(replicas, monkeypatch):
+    monkeypatch.setattr(settings, "db_replica_pin_seconds", 60)
+    Database.pin_primary("user-1")
+    assert Database.is_pinned("user-1")
+    assert not Database.is_pinned("user-2")
+    assert not Database.is_pinned(None)
+    monkeypatch.setattr(settings, "db_replica_pin_seconds", -1)
+    Database.pin_primary("user-2")
+    assert not Database.is_pinned("user-2")
@@ -0,0 +1,100 @@
+import types
+import pytest
+from fastapi import HTTPException
+from app.dependencies import get_current_principal, get_current_principal_for_update
+
+class CountingSession:
+    """Stands in for AsyncSession and returns ``user`` for every query."""
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+        self.replica = []
+
+    async def get(self, model, ident, execution_options=None, **kwargs):
+        self.queries += 1
+        self.replica.append(execution_options["replica"])
+        return self.user
+
+    async def execute(self, query):
+        self.queries += 1
+        user = self.user
+        class Result:
+            def scalars(self):
+                return self
+            def first(self):
+                return user
+        return Result()
+
+def make_request():
+    return types.SimpleNamespace(state=types.SimpleNamespace())
+
+@pytest.mark.asyncio
+async def test_principal_is_loaded_once_per_request():
+    user = object()
+    db = CountingSession(user)
+    request = make_request()
+    current_user = {"user_id": "2b4c3d9e-7f0a-4c55-9d1e-0f3a2b6c8d71", "role": "AUTHENTICATED"}
+    assert await get_current_principal(request, db, current_user) is user
+    assert await get_current_principal(request, db, current_user) is user
+    assert db.queries == 1
+
+@pytest.mark.asyncio
+async def test_principal_for_update_is_read_from_the_primary():
+    user = object()
+    db = CountingSession(user)
+    request = make_request()
+    current_user = {"user_id": "2b4c3d9e-7f0a-4c55-9d1e-0f3a2b6c8d71", "role": "AUTHENTICATED"}
+    assert await get_current_principal(request, db, current_user) is user
+    # The replica copy is not good enough for a route that modifies the user
+    assert await get_current_principal_for_update(request, db, current_user) is user
+    assert await get_current_principal_for_update(request, db, current_user) is user
+    assert await get_current_principal(request, db, current_user) is user
+    assert db.replica == [True, False]
+
+@pytest.mark.asyncio
+async def test_principal_accepts_email_subject_and_404s_when_missing():
+    db = CountingSession(None)
+    with pytest.raises(HTTPException) as exc:
+        await get_current_principal(make_request(), db, {"user_id": "john.doe@example.com", "role": "AUTHENTICATED"})
+    assert exc.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_legacy_email_subject_tokens_follow_setting(monkeypatch):
+    import app.dependencies as deps
+    monkeypatch.setattr(deps, "decode_token", lambda token: {"sub": "john.doe@example.com", "role": "AUTHENTICATED"})
+    assert (await deps.get_current_user(token="legacy"))["user_id"] == "john.doe@example.com"
+
+    monkeypatch.setattr(deps.settings, "jwt_accept_legacy_subject", False)
+    with pytest.raises(HTTPException) as exc:
+        await deps.get_current_user(token="legacy")
+    assert exc.value.status_code == 401
+
+@pytest.mark.asyncio
+async def test_api_keys_are_not_legacy_tokens(monkeypatch):
+    import uuid
+    from datetime import datetime, timezone
+    import app.dependencies as deps
+    from app.models.user_model import UserRole
+    from app.services.api_key_service import ApiKeyService, api_key_cache
+
+    key = "um_0123456789ab_secret"
+    row = types.SimpleNamespace(id=uuid.uuid4(), key_hash=ApiKeyService._digest(key), role=UserRole.MANAGER,
+                                expires_at=None, revoked_at=None, user_id=uuid.uuid4(), is_locked=False,
+                                owner_role=UserRole.MANAGER)
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        async def execute(self, query):
+            return types.SimpleNamespace(first=lambda: row)
+
+    monkeypatch.setattr("app.services.api_key_service.Database.get_session_factory", lambda: Session)
+    monkeypatch.setattr(deps.settings, "jwt_accept_legacy_subject", False)
+    api_key_cache.clear()
+    current_user = await deps.get_current_user(token=key)
+    assert current_user == {"user_id": str(row.user_id), "role": "MANAGER"}
+    api_key_cache.clear()
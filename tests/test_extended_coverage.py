@@ -2,23 +2,24 @@ import os, json, types, asyncio, uuid
 import pytest
 from fastapi import HTTPException
 
-def test_get_current_user_invalid_token(monkeypatch):
+@pytest.mark.asyncio
+async def test_get_current_user_invalid_token(monkeypatch):
     import app.dependencies as deps
     # Token decoding returns None -> should raise 401
     monkeypatch.setattr(deps, "decode_token", lambda token: None)
     with pytest.raises(HTTPException) as exc:
-        deps.get_current_user(token="fake")
+        await deps.get_current_user(token="fake")
     assert exc.value.status_code == 401
 
     # Token decoded but missing fields -> should raise 401
     monkeypatch.setattr(deps, "decode_token", lambda token: {})
     with pytest.raises(HTTPException) as exc:
-        deps.get_current_user(token="fake")
+        await deps.get_current_user(token="fake")
     assert exc.value.status_code == 401
 
     # Valid token payload -> should return user dict
     monkeypatch.setattr(deps, "decode_token", lambda token: {"sub": "user123", "role": "AUTHENTICATED"})
-    current_user = deps.get_current_user(token="fake")
+    current_user = await deps.get_current_user(token="fake")
     assert current_user == {"user_id": "user123", "role": "AUTHENTICATED"}
 
 def test_require_role_enforcement():
@@ -85,6 +86,9 @@ async def test_startup_event(monkeypatch):
         @classmethod
         async def create_tables(cls):
             DummyDB.create_called = True
+        @classmethod
+        async def start(cls):
+            pass
     monkeypatch.setattr(main, "Database", DummyDB)
 
     # Monkeypatch get_settings to provide dummy settings
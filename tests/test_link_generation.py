@@ -6,6 +6,7 @@ from uuid import uuid4
 import pytest
 from fastapi import Request
 
+from app.utils.cursor import PageCursors
 from app.utils.link_generation import create_link, create_pagination_link, create_user_links, generate_pagination_links
 
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
@@ -49,3 +50,18 @@ def test_generate_pagination_links(mock_request):
     assert len(links) >= 4
     expected_self_url = "http://testserver/users?limit=5&skip=10"
     assert normalize_url(str(links[0].href)) == normalize_url(expected_self_url), "Self link should match expected URL"
+
+def test_generate_cursor_pagination_links(mock_request):
+    links = generate_pagination_links(mock_request, 0, 5, 0, cursors=PageCursors("nextcursor", None))
+    by_rel = {link.rel: normalize_url(str(link.href)) for link in links}
+    assert by_rel["next"] == normalize_url("http://testserver/users?limit=5&cursor=nextcursor")
+    assert by_rel["first"] == normalize_url("http://testserver/users?limit=5&cursor=")
+    assert "prev" not in by_rel and "last" not in by_rel
+
+def test_pagination_links_keep_filters(mock_request):
+    mock_request.url = "http://testserver/users?skip=5&limit=5&is_locked=true&sort=-created_at"
+    links = generate_pagination_links(mock_request, 5, 5, 50)
+    for link in links:
+        query = parse_qs(urlparse(str(link.href)).query)
+        assert query["is_locked"] == ["true"] and query["sort"] == ["-created_at"]
+    assert {link.rel: parse_qs(urlparse(str(link.href)).query)["skip"] for link in links}["next"] == ["10"]
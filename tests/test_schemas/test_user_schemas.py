@@ -2,7 +2,7 @@ import uuid
 import pytest
 from pydantic import ValidationError
 from datetime import datetime
-from app.schemas.user_schemas import UserBase, UserCreate, UserUpdate, UserResponse, UserListResponse, LoginRequest
+from app.schemas.user_schemas import UserBase, UserCreate, UserUpdate, UserResponse, UserListResponse, LoginRequest, BulkUserRequest
 
 # Fixtures for common test data
 @pytest.fixture
@@ -108,3 +108,10 @@ def test_user_base_url_invalid(url, user_base_data):
     user_base_data["profile_picture_url"] = url
     with pytest.raises(ValidationError):
         UserBase(**user_base_data)
+
+@pytest.mark.parametrize("action, extra", [("delete", {}), ("set_role", {"role": "MANAGER"})])
+def test_bulk_request_rejects_empty_filter_for_irreversible_actions(action, extra):
+    with pytest.raises(ValidationError):
+        BulkUserRequest(action=action, filter={}, **extra)
+    assert BulkUserRequest(action=action, filter={"is_locked": True}, **extra).filter.is_locked
+    assert BulkUserRequest(action="unlock", filter={}).filter is not None
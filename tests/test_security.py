@@ -1,7 +1,7 @@
 # test_security.py
 from builtins import RuntimeError, ValueError, isinstance, str
 import pytest
-from app.utils.security import hash_password, verify_password
+from app.utils.security import hash_password, hash_password_async, verify_password, verify_password_async
 
 def test_hash_password():
     """Test that hashing password returns a bcrypt hashed string."""
@@ -65,3 +65,17 @@ def test_hash_password_internal_error(monkeypatch):
     with pytest.raises(ValueError):
         hash_password("test")
 
+
+@pytest.mark.asyncio
+async def test_hash_password_async_round_trip():
+    """Test that the async helpers produce and verify bcrypt hashes."""
+    hashed = await hash_password_async("secure_password", 4)
+    assert hashed.startswith('$2b$04$')
+    assert await verify_password_async("secure_password", hashed) is True
+    assert await verify_password_async("wrong_password", hashed) is False
+
+@pytest.mark.asyncio
+async def test_verify_password_async_invalid_hash():
+    """Test that errors from the pool surface as ValueError."""
+    with pytest.raises(ValueError):
+        await verify_password_async("secure_password", "invalid_hash_format")
@@ -0,0 +1,121 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from jwt.algorithms import OKPAlgorithm
+
+from app.routers.well_known_routes import get_jwks
+from app.services import jwt_service
+from app.services.key_ring import KeyRing, SigningKey
+from settings.config import settings
+
+@pytest.fixture
+def key_ring(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "jwt_algorithm", "EdDSA")
+    monkeypatch.setattr(settings, "jwt_keys_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "jwt_key_rotation_days", 30)
+    monkeypatch.setattr(settings, "jwt_key_overlap_minutes", 60)
+    monkeypatch.setattr(settings, "jwks_max_age_seconds", 3600)
+    monkeypatch.setattr(KeyRing, "_keys", [])
+    yield KeyRing
+    KeyRing._keys = []
+
+def test_eddsa_token_round_trip_with_kid(key_ring):
+    key_ring.rotate()
+    token = jwt_service.create_access_token(data={"sub": "user@example.com", "role": "admin"})
+    kid = jwt.get_unverified_header(token)["kid"]
+    assert kid == key_ring.signing_key().kid
+    assert jwt_service.decode_token(token)["role"] == "ADMIN"
+
+def test_token_verifies_against_published_jwks(key_ring):
+    key_ring.rotate()
+    token = jwt_service.create_access_token(data={"sub": "user@example.com"})
+    kid = jwt.get_unverified_header(token)["kid"]
+    jwk = next(k for k in key_ring.jwks()["keys"] if k["kid"] == kid)
+    assert jwk["alg"] == "EdDSA" and jwk["use"] == "sig"
+    # A relying service needs nothing but the public JWK
+    public_key = OKPAlgorithm.from_jwk(jwk)
+    assert jwt.decode(token, public_key, algorithms=["EdDSA"])["sub"] == "user@example.com"
+
+def test_unknown_kid_is_rejected(key_ring):
+    key_ring.rotate()
+    other = key_ring.signing_key().private_key
+    token = jwt.encode({"sub": "x"}, other, algorithm="EdDSA", headers={"kid": "0-deadbeef"})
+    assert jwt_service.decode_token(token) is None
+
+def write_key(key_ring, created_at, suffix):
+    key = SigningKey(f"{created_at}-{suffix}", ed25519.Ed25519PrivateKey.generate(), "EdDSA")
+    key_ring._write(key)
+    return key.kid
+
+def test_rotation_publishes_new_key_before_it_signs(key_ring):
+    now = int(time.time())
+    first = write_key(key_ring, now - 30 * 86400 + 3600, "aaaaaaaa")
+    # Due: the next key is published a JWKS max-age before the first one's 30 days are up
+    key_ring.rotate(now=now)
+    assert len(key_ring._keys) == 2
+    second = key_ring._keys[-1].kid
+    assert key_ring.signing_key(now=now).kid == first
+    assert key_ring.signing_key(now=now + 3600).kid == second
+    assert second in [k["kid"] for k in key_ring.jwks()["keys"]]
+
+def test_rotation_is_not_due_early(key_ring):
+    now = int(time.time())
+    write_key(key_ring, now - 29 * 86400, "aaaaaaaa")
+    key_ring.rotate(now=now)
+    assert len(key_ring._keys) == 1
+
+def test_retired_key_is_pruned_after_overlap(key_ring, tmp_path):
+    now = int(time.time())
+    old = write_key(key_ring, now - 10 * 86400, "aaaaaaaa")
+    # The newer key activated 400s ago, so the old one is still inside the 60 minute overlap
+    new = write_key(key_ring, now - 4000, "bbbbbbbb")
+    key_ring.rotate(now=now)
+    assert [k.kid for k in key_ring._keys] == [old, new]
+    key_ring.rotate(now=now + 3600)
+    assert [k.kid for k in key_ring._keys] == [new]
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".pem")] == [f"{new}.pem"]
+
+def test_rotation_tolerates_key_removed_by_another_worker(key_ring, tmp_path, monkeypatch):
+    now = int(time.time())
+    old = write_key(key_ring, now - 10 * 86400, "aaaaaaaa")
+    new = write_key(key_ring, now - 3 * 3600, "bbbbbbbb")
+    load = key_ring.load.__func__
+
+    def load_then_lose_old_key(cls):
+        load(cls)
+        os.remove(os.path.join(tmp_path, f"{old}.pem"))
+
+    monkeypatch.setattr(KeyRing, "load", classmethod(load_then_lose_old_key))
+    key_ring.rotate(now=now)
+    assert [k.kid for k in key_ring._keys] == [new]
+
+def test_request_path_does_not_touch_the_disk(key_ring, monkeypatch):
+    with pytest.raises(RuntimeError):
+        key_ring.signing_key()
+    assert key_ring.jwks() == {"keys": []}
+    key_ring.rotate()
+    monkeypatch.setattr(KeyRing, "load", classmethod(lambda cls: pytest.fail("loaded from disk")))
+    assert key_ring.verification_key("0-deadbeef") is None
+    assert key_ring.verification_key(key_ring.signing_key().kid) is not None
+
+def test_concurrent_first_start_creates_one_key(key_ring, tmp_path):
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: key_ring.rotate(), range(4)))
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".pem")]) == 1
+
+@pytest.mark.asyncio
+async def test_jwks_endpoint_is_cacheable(key_ring):
+    key_ring.rotate()
+    response = await get_jwks()
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert b'"kid"' in response.body
+
+@pytest.mark.asyncio
+async def test_jwks_endpoint_is_empty_for_hs256(monkeypatch):
+    monkeypatch.setattr(settings, "jwt_algorithm", "HS256")
+    response = await get_jwks()
+    assert response.body == b'{"keys":[]}'
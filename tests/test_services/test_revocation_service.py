@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from app.services.revocation_service import RevocationService, subject_key
+from app.utils.bloom_filter import BloomFilter
+
+@pytest.fixture
+def empty_filter(monkeypatch):
+    monkeypatch.setattr(RevocationService, "_filter", BloomFilter(100))
+    monkeypatch.setattr(RevocationService, "_confirmed", OrderedDict())
+    monkeypatch.setattr(RevocationService, "_recent", {})
+    return RevocationService._filter
+
+@pytest.mark.asyncio
+async def test_filter_miss_needs_no_database(empty_filter, monkeypatch):
+    # Any database access would fail: the session factory is never called on a miss
+    monkeypatch.setattr("app.services.revocation_service.Database.get_session_factory", lambda: pytest.fail("database queried"))
+    assert await RevocationService.is_revoked({"jti": "abc", "sub": "user@example.com", "iat": time.time()}) is False
+
+@pytest.mark.asyncio
+async def test_tokens_without_jti_or_sub_are_not_revoked(empty_filter):
+    assert await RevocationService.is_revoked({}) is False
+
+@pytest.mark.asyncio
+async def test_token_without_jti_is_checked_by_subject(empty_filter, monkeypatch):
+    empty_filter.add(subject_key("user@example.com"))
+
+    class Queried(Exception):
+        pass
+
+    def session_factory():
+        raise Queried()
+
+    # Tokens issued before jti existed can only match a subject revocation
+    monkeypatch.setattr("app.services.revocation_service.Database.get_session_factory", lambda: session_factory)
+    with pytest.raises(Queried):
+        await RevocationService.is_revoked({"sub": "user@example.com", "iat": time.time()})
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, query):
+        self.queries += 1
+        return SimpleNamespace(all=lambda: self.rows)
+
+@pytest.mark.asyncio
+async def test_confirmed_hits_are_answered_from_memory(empty_filter, monkeypatch):
+    revoked_at = datetime.now(timezone.utc)
+    session = FakeSession([SimpleNamespace(key=subject_key("user-1"), revoked_at=revoked_at)])
+    monkeypatch.setattr("app.services.revocation_service.Database.get_session_factory", lambda: lambda: session)
+    empty_filter.add(subject_key("user-1"))
+    empty_filter.add("false-positive")
+    issued_before = {"sub": "user-1", "iat": revoked_at.timestamp() - 60}
+    assert await RevocationService.is_revoked(issued_before) is True
+    assert await RevocationService.is_revoked(issued_before) is True
+    assert await RevocationService.is_revoked({"sub": "user-1", "iat": revoked_at.timestamp() + 60}) is False
+    assert session.queries == 1
+    # A filter hit the database did not confirm is remembered too, until the key is revoked
+    session.rows = []
+    assert await RevocationService.is_revoked({"jti": "false-positive"}) is False
+    RevocationService._remember("false-positive", revoked_at)
+    assert await RevocationService.is_revoked({"jti": "false-positive"}) is True
+    assert session.queries == 2
+
+@pytest.mark.asyncio
+async def test_sync_does_not_count_keys_again_in_the_overlap(empty_filter, monkeypatch):
+    now = datetime.now(timezone.utc)
+    monkeypatch.setattr(RevocationService, "_synced_until", now - timedelta(seconds=30))
+    monkeypatch.setattr(RevocationService, "_recent", {})
+    session = FakeSession([SimpleNamespace(key="a", revoked_at=now - timedelta(seconds=20)),
+                           SimpleNamespace(key="b", revoked_at=now)])
+    for _ in range(3):
+        await RevocationService.sync(session)
+    assert len(empty_filter) == 2
+    assert "a" in empty_filter and "b" in empty_filter
+
+def test_subject_key():
+    assert subject_key("user@example.com") == "sub:user@example.com"
@@ -0,0 +1,68 @@
+import types
+import pytest
+from app.services.user_count_service import UserCount, UserCountService
+from settings.config import settings
+
+class FakeSession:
+    """Answers the exact count with ``count`` and the planner estimate with ``estimate``."""
+    def __init__(self, count, estimate=None, dialect="postgresql"):
+        self.count = count
+        self.estimate = estimate
+        self.bind = types.SimpleNamespace(dialect=types.SimpleNamespace(name=dialect))
+        self.queries = []
+
+    async def execute(self, query, params=None):
+        is_estimate = "reltuples" in str(query)
+        self.queries.append("estimate" if is_estimate else "count")
+        value = self.estimate if is_estimate else self.count
+        return types.SimpleNamespace(scalar=lambda: value)
+
+@pytest.fixture
+def count_mode(monkeypatch):
+    monkeypatch.setattr(UserCountService, "_cached", None)
+    def set_mode(mode):
+        monkeypatch.setattr(settings, "user_count_mode", mode)
+    return set_mode
+
+@pytest.mark.asyncio
+async def test_exact_mode_counts_every_time(count_mode):
+    count_mode("exact")
+    session = FakeSession(42)
+    assert await UserCountService.get(session) == UserCount(42, exact=True)
+    await UserCountService.get(session)
+    assert session.queries == ["count", "count"]
+
+@pytest.mark.asyncio
+async def test_cached_mode_counts_again_after_invalidation(count_mode):
+    count_mode("cached")
+    session = FakeSession(42)
+    await UserCountService.get(session)
+    session.count = 43
+    assert (await UserCountService.get(session)).value == 42
+    UserCountService.invalidate()
+    assert (await UserCountService.get(session)).value == 43
+    assert session.queries == ["count", "count"]
+
+@pytest.mark.asyncio
+async def test_estimate_mode_uses_planner_estimate_above_threshold(count_mode, monkeypatch):
+    count_mode("estimate")
+    monkeypatch.setattr(settings, "user_count_estimate_threshold", 1000)
+    session = FakeSession(5_000_123, estimate=5_000_000)
+    assert await UserCountService.get(session) == UserCount(5_000_000, exact=False)
+    assert session.queries == ["estimate"]
+
+@pytest.mark.asyncio
+async def test_estimate_mode_counts_small_or_unanalyzed_tables(count_mode, monkeypatch):
+    count_mode("estimate")
+    monkeypatch.setattr(settings, "user_count_estimate_threshold", 1000)
+    for estimate in (500, -1):
+        assert await UserCountService.get(FakeSession(512, estimate=estimate)) == UserCount(512, exact=True)
+    session = FakeSession(512, estimate=5_000_000, dialect="sqlite")
+    assert await UserCountService.get(session) == UserCount(512, exact=True)
+    assert session.queries == ["count"]
+
+@pytest.mark.asyncio
+async def test_unknown_mode_is_rejected(count_mode):
+    count_mode("guess")
+    with pytest.raises(ValueError):
+        await UserCountService.get(FakeSession(1))
@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from app.services.user_import_service import UserImportService
+from app.utils.admission import Overloaded
+
+pytestmark = pytest.mark.asyncio
+
+async def test_import_hashing_goes_through_admission(monkeypatch):
+    stages, rejected = [], []
+
+    async def hash_password_async(password, stage=None):
+        stages.append(stage)
+        if not rejected:
+            rejected.append(password)
+            raise Overloaded("password_hash", 0)
+        return f"hashed-{password}"
+
+    monkeypatch.setattr("app.services.user_import_service.hash_password_async", hash_password_async)
+    # A rejected hash waits and retries instead of failing the import
+    assert await UserImportService._hash_passwords(["a", "b"]) == ["hashed-a", "hashed-b"]
+    assert stages == ["register"] * 3
+
+def test_generated_nicknames_avoid_taken_and_batch_nicknames(monkeypatch):
+    generated = iter(["taken_1", "mine_2", "fresh_3", "fresh_3", "fresh_4"])
+    monkeypatch.setattr("app.services.user_import_service.generate_nickname", lambda: next(generated))
+    unavailable = {"taken_1", "mine_2"}
+    # A regenerated nickname that is taken too is regenerated again
+    assert UserImportService._unique_nickname("taken_1", unavailable) == "fresh_3"
+    # ... and one already handed out in the batch is not handed out twice
+    assert UserImportService._unique_nickname("fresh_3", unavailable) == "fresh_4"
+    assert UserImportService._unique_nickname("other_5", unavailable) == "other_5"
+    assert unavailable == {"taken_1", "mine_2", "fresh_3", "fresh_4", "other_5"}
+
+async def test_batch_emails_queue_in_order_without_holding_up_the_import():
+    release, sent = asyncio.Event(), []
+
+    class EmailService:
+        async def send_verification_emails(self, users):
+            if users == ["first"]:
+                await release.wait()
+            if users == ["second"]:
+                raise ConnectionError("SMTP is down")
+            sent.extend(users)
+
+    email_service = EmailService()
+    first = UserImportService._send_emails(email_service, ["first"], None)
+    assert UserImportService._send_emails(email_service, [], first) is first
+    # Queuing returns straight away even though the first batch is still sending
+    second = UserImportService._send_emails(email_service, ["second"], first)
+    third = UserImportService._send_emails(email_service, ["third"], second)
+    await asyncio.sleep(0)
+    assert sent == [] and not third.done()
+    release.set()
+    await third
+    # A failed batch is logged and the next one is still sent
+    assert sent == ["first", "third"]
@@ -0,0 +1,45 @@
+from builtins import getattr
+from uuid import uuid4
+import pytest
+from app.models.user_model import User, UserRole
+from app.services.user_lookup_service import USER_COLUMNS, UserLookupService, _lookup
+from app.services.user_service import USER_RESPONSE_COLUMNS, UserService
+from settings.config import settings
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+def fast_path(db_session, monkeypatch):
+    if db_session.bind.dialect.driver != "asyncpg":
+        pytest.skip("The fast path needs PostgreSQL through asyncpg")
+    monkeypatch.setattr(settings, "db_fast_path_lookups", True)
+    monkeypatch.setattr(settings, "db_pgbouncer_mode", False)
+
+def test_lookup_rows_read_like_result_rows():
+    lookup = _lookup("id", ("id", "email", "role"))
+    row = lookup.row_type(uuid4(), "a@example.com", UserRole.ADMIN)
+    assert list(row._mapping) == ["id", "email", "role"]
+    assert list(lookup.decoders) == [2]
+    assert lookup.decoders[2]("ADMIN") is UserRole.ADMIN
+
+async def test_fast_path_matches_orm(db_session, verified_user, fast_path):
+    assert UserLookupService.enabled(db_session)
+    expected = await UserService.get_by_id(db_session, verified_user.id)
+    by_id = await UserLookupService.get_by_id(db_session, verified_user.id)
+    by_email = await UserLookupService.get_by_email(db_session, verified_user.email)
+    for row in (by_id, by_email):
+        assert {column.key: getattr(row, column.key) for column in USER_COLUMNS} == \
+            {column.key: getattr(expected, column.key) for column in USER_COLUMNS}
+    assert by_id.role is UserRole.AUTHENTICATED
+
+async def test_fast_path_projection_and_missing_user(db_session, verified_user, fast_path):
+    row = await UserLookupService.get_by_id(db_session, verified_user.id, columns=USER_RESPONSE_COLUMNS)
+    assert row._mapping == (await UserService.get_by_id(db_session, verified_user.id, columns=USER_RESPONSE_COLUMNS))._mapping
+    assert await UserLookupService.get_by_id(db_session, uuid4()) is None
+    assert await UserLookupService.get_by_email(db_session, "nobody@example.com", columns=(User.id,)) is None
+
+async def test_lookups_fall_back_to_orm_when_disabled(db_session, verified_user, monkeypatch):
+    monkeypatch.setattr(settings, "db_fast_path_lookups", False)
+    assert not UserLookupService.enabled(db_session)
+    row = await UserLookupService.get_by_email(db_session, verified_user.email, columns=(User.id,))
+    assert row.id == verified_user.id
@@ -1,9 +1,9 @@
 from builtins import range
 import pytest
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.dependencies import get_settings
 from app.models.user_model import User, UserRole
-from app.services.user_service import UserService
+from app.services.user_service import USER_RESPONSE_COLUMNS, UserService
 from app.utils.nickname_gen import generate_nickname
 
 pytestmark = pytest.mark.asyncio
@@ -92,6 +92,14 @@ async def test_list_users_with_pagination(db_session, users_with_same_role_50_us
     assert len(users_page_2) == 10
     assert users_page_1[0].id != users_page_2[0].id
 
+# Test that the projected listing matches the ORM listing without loading credentials
+async def test_list_users_projection_matches_orm(db_session, users_with_same_role_50_users):
+    users = await UserService.list_users(db_session, skip=0, limit=10)
+    rows = await UserService.list_users(db_session, skip=0, limit=10, columns=USER_RESPONSE_COLUMNS)
+    assert [row.id for row in rows] == [user.id for user in users]
+    assert [row.email for row in rows] == [user.email for user in users]
+    assert "hashed_password" not in rows[0]._fields
+
 # Test registering a user with valid data
 async def test_register_user_with_valid_data(db_session, email_service):
     user_data = {
@@ -161,3 +169,42 @@ async def test_unlock_user_account(db_session, locked_user):
     assert unlocked, "The account should be unlocked"
     refreshed_user = await UserService.get_by_id(db_session, locked_user.id)
     assert not refreshed_user.is_locked, "The user should no longer be locked"
+
+# Test that a successful login upgrades a hash made with an outdated cost factor
+async def test_login_user_rehashes_outdated_hash(db_session, verified_user, monkeypatch):
+    from app.utils.hashers import HashingPolicy
+    monkeypatch.setattr(HashingPolicy, "cost", 4)
+    assert not verified_user.hashed_password.startswith("$2b$04$")
+    logged_in_user = await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234")
+    assert logged_in_user is not None
+    refreshed_user = await UserService.get_by_email(db_session, verified_user.email)
+    assert refreshed_user.hashed_password.startswith("$2b$04$")
+
+# Test that the failed attempt reaching the limit reports the lock atomically
+async def test_authenticate_reports_lock_on_final_failed_attempt(db_session, verified_user):
+    max_login_attempts = get_settings().max_login_attempts
+    results = [
+        await UserService.authenticate(db_session, verified_user.email, "wrongpassword")
+        for _ in range(max_login_attempts)
+    ]
+    assert [result.locked for result in results] == [False] * (max_login_attempts - 1) + [True]
+    assert all(result.user is None for result in results)
+
+# Test that a lockout committed while the password is checked is not undone by the login
+async def test_authenticate_respects_concurrent_lockout(db_session, verified_user, monkeypatch):
+    async def verify_then_lock(password, hashed_password, stage=None):
+        await db_session.execute(update(User).where(User.id == verified_user.id).values(is_locked=True, failed_login_attempts=5))
+        await db_session.commit()
+        return True
+    monkeypatch.setattr("app.services.user_service.verify_password_async", verify_then_lock)
+    result = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234")
+    assert result.locked is True
+    assert result.user is None
+    await db_session.refresh(verified_user)
+    assert verified_user.failed_login_attempts == 5
+
+# Test that a locked account is reported without checking the password
+async def test_authenticate_locked_user(db_session, locked_user):
+    result = await UserService.authenticate(db_session, locked_user.email, "MySuperPassword$1234")
+    assert result.locked is True
+    assert result.user is None
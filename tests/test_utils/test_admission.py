@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from app.utils.admission import AdmissionController, Overloaded
+
+def controller(**overrides):
+    options = dict(capacity=1, max_queue_depth=4, max_wait=1.0, shares={"login": 0.75, "register": 0.25})
+    options.update(overrides)
+    return AdmissionController("test_stage", **options)
+
+@pytest.mark.asyncio
+async def test_acquire_within_capacity_does_not_wait():
+    admission = controller(capacity=2)
+    await admission.acquire("login")
+    await admission.acquire("register")
+    assert admission.in_flight == 2
+    admission.release()
+    admission.release()
+    assert admission.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_rejects_when_stage_queue_is_full():
+    admission = controller()
+    await admission.acquire("login")
+    # register gets floor(4 * 0.25) = 1 queue slot
+    waiter = asyncio.create_task(admission.acquire("register"))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as exc:
+        await admission.acquire("register")
+    assert exc.value.retry_after == 1
+    admission.release()
+    await waiter
+    admission.release()
+    assert admission.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_rejects_after_max_wait():
+    admission = controller(max_wait=0.01)
+    await admission.acquire("login")
+    with pytest.raises(Overloaded):
+        await admission.acquire("login")
+    assert admission.queue_depth("login") == 0
+    admission.release()
+    assert admission.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_slots_follow_priority_split():
+    admission = controller(max_queue_depth=16)
+    await admission.acquire("login")
+    order = []
+
+    async def worker(stage):
+        async with admission.slot(stage):
+            order.append(stage)
+
+    tasks = [asyncio.create_task(worker(stage)) for stage in ["register"] * 4 + ["login"] * 4]
+    await asyncio.sleep(0)
+    admission.release()
+    await asyncio.gather(*tasks)
+    # login holds 3/4 of the share, so it is served first and most often
+    assert order[:4].count("login") == 3
+    assert admission.in_flight == 0
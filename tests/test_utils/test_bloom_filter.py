@@ -0,0 +1,24 @@
+from app.utils.bloom_filter import BloomFilter
+
+def test_added_items_are_always_found():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert len(bloom) == 1000
+
+def test_false_positive_rate_is_near_target():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+def test_saturated_after_capacity():
+    bloom = BloomFilter(capacity=2)
+    bloom.add("a")
+    bloom.add("b")
+    assert not bloom.saturated
+    bloom.add("c")
+    assert bloom.saturated
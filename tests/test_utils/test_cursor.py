@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime, timezone
+import pytest
+from app.utils.cursor import Cursor, decode_cursor, encode_cursor
+
+def make_cursor(backwards=False):
+    return Cursor(datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc), uuid.uuid4(), backwards)
+
+def test_cursor_round_trips():
+    for backwards in (False, True):
+        cursor = make_cursor(backwards)
+        assert decode_cursor(encode_cursor(cursor)) == cursor
+
+def test_cursor_is_opaque_and_url_safe():
+    token = encode_cursor(make_cursor())
+    assert "2024" not in token
+    assert all(c.isalnum() or c in "-_." for c in token)
+
+def test_tampered_cursor_is_rejected():
+    payload, _, signature = encode_cursor(make_cursor()).partition(".")
+    forged = encode_cursor(make_cursor(backwards=True)).partition(".")[0]
+    with pytest.raises(ValueError):
+        decode_cursor(f"{forged}.{signature}")
+    with pytest.raises(ValueError):
+        decode_cursor(payload)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
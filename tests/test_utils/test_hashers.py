@@ -0,0 +1,62 @@
+import pytest
+from app.utils.hashers import BcryptHasher, HashingPolicy, calibrate_cost, get_hasher, identify_hasher
+from app.utils.security import hash_password, verify_password
+
+@pytest.fixture
+def policy(monkeypatch):
+    monkeypatch.setattr(HashingPolicy, "scheme", "bcrypt")
+    monkeypatch.setattr(HashingPolicy, "cost", 4)
+    return HashingPolicy
+
+def test_identify_hasher_by_prefix():
+    assert identify_hasher(hash_password("secret", 4)).name == "bcrypt"
+    assert identify_hasher(hash_password("secret", 1, scheme="argon2id")).name == "argon2id"
+    with pytest.raises(ValueError):
+        identify_hasher("plaintext")
+
+def test_get_hasher_unknown_scheme():
+    with pytest.raises(ValueError):
+        get_hasher("md5")
+
+def test_bcrypt_and_argon2_hashes_coexist():
+    bcrypt_hash = hash_password("secret", 4)
+    argon2_hash = hash_password("secret", 1, scheme="argon2id")
+    assert argon2_hash.startswith("$argon2id$")
+    assert verify_password("secret", bcrypt_hash) is True
+    assert verify_password("secret", argon2_hash) is True
+    assert verify_password("wrong", argon2_hash) is False
+
+def test_policy_needs_rehash_only_below_target_cost(policy, monkeypatch):
+    assert policy.needs_rehash(hash_password("secret", 4)) is False
+    # A stronger hash, e.g. from a worker that calibrated higher, is kept as is
+    assert policy.needs_rehash(hash_password("secret", 5)) is False
+    monkeypatch.setattr(HashingPolicy, "cost", 5)
+    assert policy.needs_rehash(hash_password("secret", 4)) is True
+
+def test_policy_needs_rehash_on_scheme_change(policy, monkeypatch):
+    monkeypatch.setattr(HashingPolicy, "scheme", "argon2id")
+    monkeypatch.setattr(HashingPolicy, "cost", 1)
+    assert policy.needs_rehash(hash_password("secret", 4, scheme="bcrypt")) is True
+    assert policy.needs_rehash(hash_password("secret", 1, scheme="argon2id")) is False
+
+def test_hash_password_uses_policy(policy):
+    assert hash_password("secret").startswith("$2b$04$")
+
+def test_calibrate_cost_respects_budget():
+    hasher = BcryptHasher()
+    assert calibrate_cost(hasher, 0) == hasher.min_cost
+    assert hasher.min_cost <= calibrate_cost(hasher, 50) <= hasher.max_cost
+
+def test_policy_initialize_with_budget(monkeypatch):
+    monkeypatch.setattr(HashingPolicy, "scheme", HashingPolicy.scheme)
+    monkeypatch.setattr(HashingPolicy, "cost", HashingPolicy.cost)
+    monkeypatch.setattr("app.utils.hashers.calibrate_cost", lambda hasher, budget_ms: 7)
+    HashingPolicy.initialize("bcrypt", budget_ms=100)
+    assert HashingPolicy.target()[1] == 7
+
+def test_policy_configured_cost_wins_over_calibration(monkeypatch):
+    monkeypatch.setattr(HashingPolicy, "scheme", HashingPolicy.scheme)
+    monkeypatch.setattr(HashingPolicy, "cost", HashingPolicy.cost)
+    monkeypatch.setattr("app.utils.hashers.calibrate_cost", lambda hasher, budget_ms: pytest.fail("calibrated"))
+    HashingPolicy.initialize("bcrypt", cost=6, budget_ms=100)
+    assert HashingPolicy.target()[1] == 6
@@ -0,0 +1,33 @@
+import threading
+import pytest
+from app.utils.hashing_pool import HashingPool
+
+@pytest.fixture
+def reset_pool():
+    HashingPool.shutdown()
+    yield
+    HashingPool.shutdown()
+
+def current_thread_name():
+    return threading.current_thread().name
+
+@pytest.mark.asyncio
+async def test_run_without_initialize_uses_default_executor(reset_pool):
+    name = await HashingPool.run(current_thread_name)
+    assert name != threading.current_thread().name
+
+@pytest.mark.asyncio
+async def test_thread_pool(reset_pool):
+    HashingPool.initialize("thread", 1)
+    name = await HashingPool.run(current_thread_name)
+    assert name.startswith("password-hash")
+
+@pytest.mark.asyncio
+async def test_inline_pool_runs_on_loop_thread(reset_pool):
+    HashingPool.initialize("inline", 1)
+    name = await HashingPool.run(current_thread_name)
+    assert name == threading.current_thread().name
+
+def test_initialize_rejects_unknown_kind(reset_pool):
+    with pytest.raises(ValueError):
+        HashingPool.initialize("gpu", 1)
@@ -0,0 +1,22 @@
+from app.utils.metrics import MetricsRegistry
+
+def test_registry_returns_same_metric_for_same_labels():
+    registry = MetricsRegistry()
+    assert registry.counter("requests_total", stage="login") is registry.counter("requests_total", stage="login")
+    assert registry.counter("requests_total", stage="login") is not registry.counter("requests_total", stage="register")
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests seen", stage="login").inc(2)
+    registry.gauge("queue_depth", stage="login").set(3)
+    histogram = registry.histogram("wait_seconds", buckets=(0.1, 1.0), stage="login")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    output = registry.render()
+    assert "# HELP requests_total Requests seen" in output
+    assert 'requests_total{stage="login"} 2.0' in output
+    assert 'queue_depth{stage="login"} 3' in output
+    assert 'wait_seconds_bucket{stage="login",le="0.1"} 1' in output
+    assert 'wait_seconds_bucket{stage="login",le="1.0"} 2' in output
+    assert 'wait_seconds_bucket{stage="login",le="+Inf"} 2' in output
+    assert 'wait_seconds_count{stage="login"} 2' in output
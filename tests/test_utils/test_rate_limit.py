@@ -0,0 +1,55 @@
+import pytest
+from app.utils import rate_limit as rate_limit_module
+from app.utils.rate_limit import MemoryRateLimitBackend, RateLimiter, parse_rate
+
+@pytest.fixture
+def limiter():
+    RateLimiter.configure(rules={"login:email": "2/minute", "login:ip": "3/minute"})
+    yield RateLimiter
+    RateLimiter.configure()
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 60)
+    assert parse_rate("1/day") == (1, 86400)
+    with pytest.raises(ValueError):
+        parse_rate("10 per minute")
+
+@pytest.mark.asyncio
+async def test_memory_backend_limits_within_window(monkeypatch):
+    monkeypatch.setattr(rate_limit_module.time, "monotonic", lambda: 120.0)
+    backend = MemoryRateLimitBackend(max_keys=10)
+    assert await backend.hit("k", 2, 60) == 0
+    assert await backend.hit("k", 2, 60) == 0
+    assert await backend.hit("k", 2, 60) == 60
+
+@pytest.mark.asyncio
+async def test_memory_backend_slides_previous_window(monkeypatch):
+    now = [120.0]
+    monkeypatch.setattr(rate_limit_module.time, "monotonic", lambda: now[0])
+    backend = MemoryRateLimitBackend(max_keys=10)
+    for _ in range(2):
+        await backend.hit("k", 2, 60)
+    # Half way through the next window half of the previous count still applies
+    now[0] = 210.0
+    assert await backend.hit("k", 2, 60) == 0
+    assert await backend.hit("k", 2, 60) > 0
+    # Two windows later the old counts are gone
+    now[0] = 400.0
+    assert await backend.hit("k", 2, 60) == 0
+
+@pytest.mark.asyncio
+async def test_memory_backend_is_bounded():
+    backend = MemoryRateLimitBackend(max_keys=3)
+    for i in range(10):
+        await backend.hit(f"key-{i}", 5, 60)
+    assert len(backend) == 3
+
+@pytest.mark.asyncio
+async def test_limiter_checks_each_identity(limiter):
+    assert await limiter.check("login", ip="1.2.3.4", email="a@example.com") == 0
+    assert await limiter.check("login", ip="1.2.3.4", email="a@example.com") == 0
+    # email limit reached, ip still has room
+    assert await limiter.check("login", ip="1.2.3.4", email="a@example.com") > 0
+    assert await limiter.check("login", ip="1.2.3.4", email="b@example.com") > 0
+    # identities without a rule are not counted
+    assert await limiter.check("login", token="abc") == 0
@@ -0,0 +1,68 @@
+import json
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+import pytest
+from app.models.user_model import UserRole
+from app.utils.record_stream import format_records, iter_lines, parse_records
+
+async def chunked(text: str, size: int = 5):
+    data = text.encode()
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def collect(text: str, fmt: str):
+    return [(line, record) async for line, record in parse_records(chunked(text), fmt)]
+
+@pytest.mark.asyncio
+async def test_csv_records_survive_chunk_boundaries():
+    records = await collect('email,first_name,bio\r\na@example.com,Ann,"Likes commas, quotes"\r\n\r\nb@example.com,,x', "csv")
+    assert records == [
+        (2, {"email": "a@example.com", "first_name": "Ann", "bio": "Likes commas, quotes"}),
+        (4, {"email": "b@example.com", "bio": "x"}),
+    ]
+
+@pytest.mark.asyncio
+async def test_malformed_lines_are_reported_and_skipped():
+    csv_records = await collect("email,first_name\na@example.com\nb@example.com,Bob\n", "csv")
+    assert isinstance(csv_records[0][1], ValueError)
+    assert csv_records[1] == (3, {"email": "b@example.com", "first_name": "Bob"})
+    ndjson_records = await collect('{"email": "a@example.com"}\n[1]\n{oops\n{"email": "b@example.com"}', "ndjson")
+    assert [line for line, _ in ndjson_records] == [1, 2, 3, 4]
+    assert [isinstance(record, ValueError) for _, record in ndjson_records] == [False, True, True, False]
+
+@pytest.mark.asyncio
+async def test_overlong_lines_are_rejected_without_being_held():
+    lines = [line async for line in iter_lines(chunked("short\n" + "x" * 30 + "\nnext\n" + "y" * 12), max_line=8)]
+    assert lines[0] == "short" and lines[2] == "next"
+    assert [isinstance(line, ValueError) for line in lines] == [False, True, False, True]
+
+@pytest.mark.asyncio
+async def test_invalid_utf8_lines_are_rejected_without_ending_the_stream():
+    async def chunks():
+        yield b"email\na@example.com\n\xff\xfe@example.com\nb@example.com\n\xc3"
+    records = [(line, record) async for line, record in parse_records(chunks(), "csv")]
+    assert records[0] == (2, {"email": "a@example.com"}) and records[2] == (4, {"email": "b@example.com"})
+    assert [str(record) for _, record in records if isinstance(record, ValueError)] == ["Invalid UTF-8"] * 2
+
+def test_format_records_as_ndjson_and_csv():
+    Row = namedtuple("Row", ["id", "role", "created_at", "bio"])
+    Row._mapping = property(lambda self: self._asdict())
+    row = Row(uuid.UUID(int=1), UserRole.ADMIN, datetime(2024, 5, 1, tzinfo=timezone.utc), None)
+    assert json.loads(format_records([row], "ndjson")) == {
+        "id": str(uuid.UUID(int=1)), "role": "ADMIN", "created_at": "2024-05-01T00:00:00+00:00", "bio": None}
+    assert format_records([row], "csv", header=Row._fields) == (
+        f"id,role,created_at,bio\n{uuid.UUID(int=1)},ADMIN,2024-05-01T00:00:00+00:00,\n")
+    assert format_records([], "csv", header=["id"]) == "id\n"
+
+def test_format_records_neutralises_csv_formulas():
+    Row = namedtuple("Row", ["first_name", "bio", "score"])
+    Row._mapping = property(lambda self: self._asdict())
+    rows = [Row("=HYPERLINK(\"http://x\")", "@SUM(A1)", -1), Row("+1", "-2", None), Row("\tTab", "\rCR", 3), Row("Ann", "a=b", 0)]
+    lines = format_records(rows, "csv").split("\n")
+    assert lines[0] == "\"'=HYPERLINK(\"\"http://x\"\")\",'@SUM(A1),-1"
+    assert lines[1] == "'+1,'-2,"
+    assert lines[2] == "'\tTab,'\rCR,3"
+    assert lines[3] == "Ann,a=b,0"
+    # NDJSON is data, not a spreadsheet, and is left as it is
+    assert json.loads(format_records(rows[:1], "ndjson").splitlines()[0])["bio"] == "@SUM(A1)"
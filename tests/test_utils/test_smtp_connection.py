@@ -1,4 +1,5 @@
 import pytest
+import smtplib
 from unittest.mock import patch, MagicMock
 from app.utils.smtp_connection import SMTPClient
 
@@ -42,3 +43,19 @@ def test_send_email_failure(mock_smtp, smtp_client, caplog):
             smtp_client.send_email(subject, html_content, recipient)
 
     assert "Failed to send email: SMTP error" in caplog.text
+
+@patch("smtplib.SMTP")
+def test_send_emails_shares_one_connection(mock_smtp, smtp_client, caplog):
+    mock_server = MagicMock()
+    mock_server.sendmail.side_effect = [None, smtplib.SMTPRecipientsRefused({}), None]
+    mock_smtp.return_value.__enter__.return_value = mock_server
+    messages = [("Hi", "<p>Hi</p>", f"user{i}@example.com") for i in range(3)]
+
+    with caplog.at_level("ERROR"):
+        failed = smtp_client.send_emails(messages)
+
+    mock_smtp.assert_called_once_with("smtp.example.com", 587)
+    mock_server.login.assert_called_once()
+    assert mock_server.sendmail.call_count == 3
+    assert failed == ["user1@example.com"]
+    assert "Failed to send email to user1@example.com" in caplog.text
@@ -0,0 +1,56 @@
+import time
+import pytest
+from app.utils.token_cache import TokenCache
+
+def claims(expires_in=60, **extra):
+    return {"sub": "user", "role": "ADMIN", "exp": int(time.time()) + expires_in, **extra}
+
+def test_get_returns_cached_claims_and_counts():
+    cache = TokenCache(max_entries=10)
+    assert cache.get("token") is None
+    cache.put("token", claims())
+    assert cache.get("token")["sub"] == "user"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entries_expire_at_exp():
+    cache = TokenCache(max_entries=10)
+    cache.put("token", claims(expires_in=-1))
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+def test_tokens_without_exp_are_not_cached():
+    cache = TokenCache(max_entries=10)
+    cache.put("token", {"sub": "user", "role": "ADMIN"})
+    assert len(cache) == 0
+
+def test_cache_is_bounded_lru():
+    cache = TokenCache(max_entries=2)
+    cache.put("a", claims())
+    cache.put("b", claims())
+    cache.get("a")
+    cache.put("c", claims())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+def test_discard_where_drops_matching_entries():
+    cache = TokenCache(max_entries=10)
+    cache.put("a", claims(jti="1"))
+    cache.put("b", claims(jti="2"))
+    assert cache.discard_where(lambda c: c.get("jti") == "1") == 1
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+@pytest.mark.asyncio
+async def test_get_current_user_uses_cache(monkeypatch):
+    import app.dependencies as deps
+    cache = TokenCache(max_entries=10)
+    monkeypatch.setattr(deps, "token_cache", cache)
+    calls = []
+    def fake_decode(token):
+        calls.append(token)
+        return claims()
+    monkeypatch.setattr(deps, "decode_token", fake_decode)
+    assert await deps.get_current_user(token="cached") == {"user_id": "user", "role": "ADMIN"}
+    assert await deps.get_current_user(token="cached") == {"user_id": "user", "role": "ADMIN"}
+    assert calls == ["cached"]